@@ -1,38 +1,280 @@
-from flask import Flask, jsonify, request
-from flask_bcrypt import Bcrypt
+import os
+
+# --- Serving mode ---
+#   ASYNC_MODE=threading (default) -> gunicorn gthread worker; har request ek OS thread pakadti hai
+#   ASYNC_MODE=gevent              -> poora process cooperative greenlets par. pymysql pure Python hai,
+#                                     isliye patched sockets par har DB call aur har idle websocket sirf
+#                                     ek greenlet leta hai, thread nahi. Routes bilkul waise hi rehte hain.
+# Patch kisi bhi socket/threading wale import se pehle hona chahiye.
+ASYNC_MODE = os.environ.get('ASYNC_MODE', 'threading')
+if ASYNC_MODE == 'gevent':
+    from gevent import monkey
+    monkey.patch_all()
+
+from flask import Flask, jsonify, request, has_request_context, g
 from flask_cors import CORS
+from flask_socketio import SocketIO, join_room, emit, disconnect
+import socketio as socketio_lib
 
 import pymysql.cursors
 import sys
-import os
 import jwt
 import datetime
 from dbutils.pooled_db import PooledDB
 from functools import wraps
 import json
+import base64
+import hashlib
+import threading
+import time
+import atexit
+import hashing
+import db_config
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from concurrent.futures.process import BrokenProcessPool
+import queue
+import bisect
+import re
+import html
+from collections import OrderedDict, deque
 from decimal import Decimal
-from dateutil import parser
+from dateutil import parser, tz
+from flask.json.provider import DefaultJSONProvider
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 def get_db_connection():
     if pool is None:
         raise Exception("Database connect nahi hua hai!")
     return pool.connection()
+
+class ServiceBusy(Exception):
+    pass
+
+class PoolTimeout(ServiceBusy):
+    pass
+
+class HashingBusy(ServiceBusy):
+    pass
+
+class InvalidParams(Exception):
+    pass
+
+def error_response(e):
+    # Pool ya hashing workers khaali na hon to client ko turant 503 do, request thread ko atakne mat do
+    if isinstance(e, ServiceBusy):
+        return jsonify({"success": False, "message": "Server is busy, please retry."}), 503
+    if isinstance(e, InvalidParams):
+        return jsonify({"success": False, "message": str(e)}), 400
+    return jsonify({"success": False, "message": str(e)}), 500
  
-class CustomJSONEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime.datetime):
-            return obj.isoformat()
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super().default(obj)
+# --- JSON ---
+# Flask 2.3+ app.json_encoder ko ignore karta hai, isliye apna JSON provider hai. DictCursor rows
+# ke datetime/Decimal/bytes yahin handle hote hain; orjson installed ho to wahi use hota hai.
+# Bade results ke liye stream_rows (unbuffered cursor) hai; pehle se bani list ko "stream"
+# karne se memory nahi bachti, isliye jsonify hamesha ek hi body banata hai.
+JSON_STREAM_CHUNK = 200
+
+def json_default(obj):
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, datetime.timedelta):
+        return obj.total_seconds()
+    if isinstance(obj, (bytes, bytearray)):
+        try:
+            return obj.decode('utf-8')
+        except UnicodeDecodeError:
+            return base64.b64encode(obj).decode('ascii')
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps_bytes(obj):
+    if orjson is not None:
+        return orjson.dumps(obj, default=json_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=json_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def stream_json_array(items):
+    # Badi list ko chunks mein encode karo taaki poori JSON string ek saath memory mein na bane
+    yield b'['
+    first = True
+    chunk = []
+    for item in items:
+        chunk.append(dumps_bytes(item))
+        if len(chunk) >= JSON_STREAM_CHUNK:
+            yield (b'' if first else b',') + b','.join(chunk)
+            first, chunk = False, []
+    if chunk:
+        yield (b'' if first else b',') + b','.join(chunk)
+    yield b']'
+
+class FastJSONProvider(DefaultJSONProvider):
+    def dumps(self, obj, **kwargs):
+        # orjson fast path sirf bina options ke; sort_keys/indent jaise kwargs stdlib json se
+        # honour hote hain aur galat kwargs par json.dumps TypeError deta hai
+        if not kwargs:
+            return dumps_bytes(obj).decode('utf-8')
+        kwargs.setdefault('default', json_default)
+        kwargs.setdefault('ensure_ascii', False)
+        return json.dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        started = time.perf_counter()
+        body = dumps_bytes(obj)
+        note_request('json_ms', (time.perf_counter() - started) * 1000)
+        return self._app.response_class(body, mimetype=self.mimetype)
+
+class TTLCache:
+    # Chhota thread-safe LRU cache; har entry apne expiry ke saath rakhi jaati hai
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.data = OrderedDict()
+        # DB se fill karne wale ke liye generation: pop/update/clear clock badhate hain,
+        # taaki invalidation se pehle padha gaya purana data baad mein cache na ho
+        self.clock = 0
+        self.invalidated = OrderedDict()  # key -> clock jab aakhri baar invalidate hua
+        self.floor = 0  # clear() ya bhool gaye invalidations isse purane tokens reject karte hain
+
+    def get(self, key, default=None):
+        with self.lock:
+            item = self.data.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at <= time.time():
+                del self.data[key]
+                return default
+            self.data.move_to_end(key)
+            return value
+
+    def store(self, key, value, ttl):
+        # self.lock pakad kar hi bulao
+        self.data[key] = (value, time.time() + (self.ttl if ttl is None else ttl))
+        self.data.move_to_end(key)
+        while len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+
+    def invalidate(self, key):
+        # self.lock pakad kar hi bulao
+        self.clock += 1
+        self.invalidated[key] = self.clock
+        self.invalidated.move_to_end(key)
+        while len(self.invalidated) > self.maxsize:
+            _, generation = self.invalidated.popitem(last=False)
+            self.floor = max(self.floor, generation)
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.store(key, value, ttl)
+
+    def fill_token(self):
+        # DB read se PEHLE lo, phir set_if_fresh ko do
+        with self.lock:
+            return self.clock
+
+    def set_if_fresh(self, key, value, token, ttl=None):
+        # Token ke baad key invalidate hui to value purani ho sakti hai; cache mat karo
+        with self.lock:
+            if max(self.floor, self.invalidated.get(key, 0)) > token:
+                return False
+            self.store(key, value, ttl)
+            return True
+
+    def pop(self, key):
+        with self.lock:
+            self.invalidate(key)
+            item = self.data.pop(key, None)
+            return item[0] if item else None
+
+    def clear(self):
+        with self.lock:
+            self.clock += 1
+            self.floor = self.clock
+            self.invalidated.clear()
+            self.data.clear()
+
+    def update(self, key, fn):
+        # Maujood value ko lock ke andar badlo (read-modify-write race na ho); expiry wahi rehti hai
+        with self.lock:
+            self.invalidate(key)
+            item = self.data.get(key)
+            if item is None or item[1] <= time.time():
+                return None
+            value = fn(item[0])
+            self.data[key] = (value, item[1])
+            return value
+
+    def items(self):
+        # (key, value, expires_at) jo abhi expire nahi hue; snapshots ke liye
+        now = time.time()
+        with self.lock:
+            return [(key, value, expires_at) for key, (value, expires_at) in self.data.items() if expires_at > now]
 
 # --- App Setup ---
 app = Flask(__name__)
-app.json_encoder = CustomJSONEncoder
-bcrypt = Bcrypt(app)
+app.json = FastJSONProvider(app)
+
+# --- Socket.IO fan-out ---
+# Rooms by default sirf ek process ke andar hote hain. SOCKETIO_MESSAGE_QUEUE set karo to
+# saare workers/instances ek pub/sub backend se broadcast share karte hain:
+#   redis://host:6379/0 ya amqp://...  -> Flask-SocketIO ka built-in manager (redis/kombu package chahiye)
+#   local://                           -> in-process stand-in, dev aur benchmarks ke liye
+# Load balancer sticky sessions nahi deta (SOCKETIO_STICKY_SESSIONS=false) to long-polling
+# alag workers par toot jaata hai ("Invalid session"), isliye tab sirf websocket transport allow hota hai.
+# Ek container mein GUNICORN_WORKERS>1 ho to gunicorn client ko kabhi same worker par wapas nahi
+# bhejta, isliye wahan sticky sessions hamesha off maane jaate hain.
+SOCKETIO_MESSAGE_QUEUE = os.environ.get('SOCKETIO_MESSAGE_QUEUE')
+SOCKETIO_CHANNEL = os.environ.get('SOCKETIO_CHANNEL', 'nyayconnect-socketio')
+GUNICORN_WORKERS = int(os.environ.get('GUNICORN_WORKERS', 1))
+SOCKETIO_STICKY_SESSIONS = os.environ.get('SOCKETIO_STICKY_SESSIONS', 'true').lower() == 'true'
+if SOCKETIO_STICKY_SESSIONS and GUNICORN_WORKERS > 1:
+    print(f"⚠️ GUNICORN_WORKERS={GUNICORN_WORKERS}: workers ke beech sticky sessions nahi hote, sirf websocket transport allow hai.")
+    SOCKETIO_STICKY_SESSIONS = False
+
+class LocalPubSubManager(socketio_lib.PubSubManager):
+    # Ek process ke andar kai Socket.IO servers ko same bus par jodta hai,
+    # bilkul waise jaise Redis alag nodes ko jodta
+    name = 'local'
+    buses = {}
+    buses_lock = threading.Lock()
+
+    def __init__(self, channel='socketio', write_only=False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.inbox = queue.Queue()
+        with self.buses_lock:
+            self.buses.setdefault(channel, []).append(self.inbox)
+
+    def _publish(self, data):
+        message = self.json.dumps(data)
+        with self.buses_lock:
+            subscribers = list(self.buses.get(self.channel, ()))
+        for inbox in subscribers:
+            inbox.put(message)
+
+    def _listen(self):
+        while True:
+            yield self.inbox.get()
+
+def make_socketio(flask_app):
+    # async_mode explicit do: gevent installed ho to Flask-SocketIO khud use chun leta, bina patch ke
+    options = {'cors_allowed_origins': "*", 'async_mode': ASYNC_MODE}
+    if not SOCKETIO_STICKY_SESSIONS:
+        options['transports'] = ['websocket']
+    if SOCKETIO_MESSAGE_QUEUE and SOCKETIO_MESSAGE_QUEUE.startswith('local://'):
+        options['client_manager'] = LocalPubSubManager(channel=SOCKETIO_CHANNEL)
+    elif SOCKETIO_MESSAGE_QUEUE:
+        options['message_queue'] = SOCKETIO_MESSAGE_QUEUE
+        options['channel'] = SOCKETIO_CHANNEL
+    return SocketIO(flask_app, **options)
 
 # Socket.io Initialize (Isse real-time chat chalegi)
-socketio = SocketIO(app, cors_allowed_origins="*")
+socketio = make_socketio(app)
 
 # Final CORS Fix
 CORS(app, resources={
@@ -61,124 +303,1077 @@ def home():
     return jsonify({"message": "🚀 Backend is running!"})
 
 # ==================== DATABASE POOL START ====================
+# Pool settings env se aate hain. Checkout timeout ke baad request 503 pe fail hoti hai
+# (chupchaap block nahi hoti) aur har route ka wait time histogram mein record hota hai.
+#   DB_POOL_PING: 0 = kabhi nahi, 1 = checkout par, 2 = cursor banate waqt, 4 = query par, 7 = hamesha
+DB_POOL_MIN_CACHED = int(os.environ.get('DB_POOL_MIN_CACHED', 0))
+DB_POOL_MAX_CACHED = int(os.environ.get('DB_POOL_MAX_CACHED', 10))
+DB_POOL_MAX_CONNECTIONS = int(os.environ.get('DB_POOL_MAX_CONNECTIONS', 10))
+DB_POOL_IDLE_TIMEOUT = float(os.environ.get('DB_POOL_IDLE_TIMEOUT', 300))
+DB_POOL_PING = int(os.environ.get('DB_POOL_PING', 1))
+DB_POOL_CHECKOUT_TIMEOUT = float(os.environ.get('DB_POOL_CHECKOUT_TIMEOUT', 5))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+POOL_WAIT_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+def metrics_token_required(f):
+    # METRICS_TOKEN set ho to stats endpoints ke liye X-Metrics-Token header chahiye
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        if METRICS_TOKEN and request.headers.get('X-Metrics-Token') != METRICS_TOKEN:
+            return jsonify({'message': 'Forbidden'}), 403
+        return f(*args, **kwargs)
+    return decorated
+
+def current_route():
+    if has_request_context():
+        return request.endpoint or 'socketio'
+    return 'background'
+
+def new_histogram(buckets_ms):
+    return {'buckets': [0] * (len(buckets_ms) + 1), 'count': 0, 'sum_ms': 0.0}
+
+def observe(hist, buckets_ms, value_ms):
+    index = next((i for i, b in enumerate(buckets_ms) if value_ms <= b), len(buckets_ms))
+    hist['buckets'][index] += 1
+    hist['count'] += 1
+    hist['sum_ms'] += value_ms
+
+class InstrumentedPool(PooledDB):
+    def __init__(self, *args, **kwargs):
+        # PooledDB.__init__ mincached connections khud kholta hai, isliye counters pehle banao
+        max_connections = kwargs.get('maxconnections') or 0
+        self.checkout_timeout = kwargs.pop('checkout_timeout', DB_POOL_CHECKOUT_TIMEOUT)
+        self.min_cached = kwargs.get('mincached') or 0
+        if max_connections and (kwargs.get('maxcached') or 0) > max_connections:
+            kwargs['maxcached'] = max_connections
+        self.slots = threading.BoundedSemaphore(max_connections) if max_connections else None
+        self.stats_lock = threading.Lock()
+        self.counters = {'checkouts': 0, 'timeouts': 0, 'opened': 0, 'idle_evicted': 0}
+        self.wait_histograms = {}
+        super().__init__(*args, **kwargs)
+
+    def steady_connection(self):
+        with self.stats_lock:
+            self.counters['opened'] += 1
+        return super().steady_connection()
+
+    def connection(self, shareable=False):
+        started = time.perf_counter()
+        if self.slots and not self.slots.acquire(timeout=self.checkout_timeout):
+            with self.stats_lock:
+                self.counters['timeouts'] += 1
+            raise PoolTimeout(f"No database connection free after {self.checkout_timeout}s")
+        try:
+            self.evict_idle()
+            con = super().connection(shareable=False)
+        except Exception:
+            if self.slots: self.slots.release()
+            raise
+        wait_ms = (time.perf_counter() - started) * 1000
+        self.record_wait(current_route(), wait_ms)
+        note_request('pool_wait_ms', wait_ms)
+        return con
+
+    def cache(self, con):
+        # Connection pool mein wapas aaya; idle timeout isi waqt se ginte hain
+        con.idle_since = time.time()
+        try:
+            super().cache(con)
+        finally:
+            if self.slots: self.slots.release()
+
+    def evict_idle(self):
+        if not DB_POOL_IDLE_TIMEOUT: return
+        cutoff = time.time() - DB_POOL_IDLE_TIMEOUT
+        with self._lock:
+            stale = [c for c in self._idle_cache if getattr(c, 'idle_since', cutoff) < cutoff]
+            if len(self._idle_cache) - len(stale) < self.min_cached:
+                stale = stale[:max(0, len(self._idle_cache) - self.min_cached)]
+            for con in stale:
+                self._idle_cache.remove(con)
+        for con in stale:
+            try: con._close()
+            except Exception: pass
+        if stale:
+            with self.stats_lock:
+                self.counters['idle_evicted'] += len(stale)
+
+    def record_wait(self, route, wait_ms):
+        with self.stats_lock:
+            self.counters['checkouts'] += 1
+            hist = self.wait_histograms.get(route)
+            if hist is None:
+                hist = self.wait_histograms[route] = new_histogram(POOL_WAIT_BUCKETS_MS)
+            observe(hist, POOL_WAIT_BUCKETS_MS, wait_ms)
+
+    def stats(self):
+        with self._lock:
+            in_use, idle = self._connections, len(self._idle_cache)
+        with self.stats_lock:
+            return {
+                'max_connections': self._maxconnections, 'in_use': in_use, 'idle': idle,
+                **self.counters,
+                'wait_buckets_ms': list(POOL_WAIT_BUCKETS_MS) + ['+Inf'],
+                'wait_by_route': {route: dict(h, buckets=list(h['buckets'])) for route, h in self.wait_histograms.items()}
+            }
+
+# --- Query timing ---
+# Har cursor query ka time, count aur rows current request mein jodta hai. SLOW_QUERY_MS > 0 ho
+# to usse dheemi query ka SQL template (params ke bina, taaki user data log na ho) print hota hai.
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 0))
+REQUEST_TIMERS = ('db_ms', 'pool_wait_ms', 'hash_ms', 'json_ms')
+REQUEST_COUNTERS = ('queries', 'rows')
+
+def note_request(key, amount):
+    # Request ke bahar (background writer, streaming body, socket events) kuch jama nahi hota
+    if has_request_context() and 'request_timings' in g:
+        g.request_timings[key] += amount
+
+def log_slow_query(query, elapsed_ms):
+    # executemany multi-row INSERT ko bytearray bhejta hai; logging kabhi execute ko fail na kare
+    try:
+        if isinstance(query, (bytes, bytearray)):
+            query = bytes(query).decode('utf-8', errors='replace')
+        print(f"🐢 Slow query {elapsed_ms:.1f} ms [{current_route()}]: {' '.join(query.split())[:500]}")
+    except Exception as e:
+        print(f"⚠️ Slow query log failed ({elapsed_ms:.1f} ms): {e}")
+
+class TimedCursorMixin:
+    def execute(self, query, args=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, args)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            note_request('db_ms', elapsed_ms)
+            note_request('queries', 1)
+            note_request('rows', self.buffered_rows())
+            if SLOW_QUERY_MS and elapsed_ms >= SLOW_QUERY_MS:
+                log_slow_query(query, elapsed_ms)
+
+    def buffered_rows(self):
+        # UPDATE/INSERT ka rowcount affected rows hai, fetched nahi
+        return self.rowcount if self.description and self.rowcount > 0 else 0
+
+class TimedDictCursor(TimedCursorMixin, pymysql.cursors.DictCursor):
+    pass
+
+class TimedSSDictCursor(TimedCursorMixin, pymysql.cursors.SSDictCursor):
+    # Unbuffered cursor ka rowcount execute ke baad pata nahi hota, rows padhte waqt gino
+    def buffered_rows(self):
+        return 0
+
+    def read_next(self):
+        row = super().read_next()
+        if row is not None:
+            note_request('rows', 1)
+        return row
+
+# --- Read replicas ---
+# DB_REPLICA_HOST set ho to @read_replica wale routes replica pool se padhte hain. Baaki sab
+# (writes, background threads, socket events) primary par. Read-your-writes: jis user ne abhi
+# likha hai, ya jin resources ka version abhi bump hua hai, unke reads REPLICA_STICKY_SECONDS
+# tak primary par jaate hain. Replica checkout fail ho, ya checkout ke baad connection toote, to
+# request primary par chali jaati hai aur replica REPLICA_RETRY_SECONDS tak skip hota hai.
+# Process caches (dashboard, slots, user context) invalidation ke turant baad primary se bharte
+# hain (fill_from_primary), taaki replica lag poori TTL ke liye cache na ho jaaye.
+DB_REPLICA_HOST = os.environ.get('DB_REPLICA_HOST')
+DB_REPLICA_MAX_CONNECTIONS = int(os.environ.get('DB_REPLICA_MAX_CONNECTIONS', DB_POOL_MAX_CONNECTIONS))
+DB_REPLICA_CHECKOUT_TIMEOUT = float(os.environ.get('DB_REPLICA_CHECKOUT_TIMEOUT', 0.5))
+REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+REPLICA_RETRY_SECONDS = float(os.environ.get('REPLICA_RETRY_SECONDS', 30))
+
+class RoutingPool:
+    # Views sirf pool.connection() bulaate hain; primary ya replica ka faisla yahin hota hai
+    def __init__(self, primary, replica=None):
+        self.primary = primary
+        self.replica = replica
+        self.lock = threading.Lock()
+        self.replica_down_until = 0
+        self.counters = {'replica_checkouts': 0, 'sticky_reads': 0, 'replica_fallbacks': 0}
+        # user_id -> True jab tak uska write replica tak pahunch na gaya ho
+        self.recent_writers = TTLCache(maxsize=100000, ttl=REPLICA_STICKY_SECONDS)
+
+    def count(self, key):
+        with self.lock:
+            self.counters[key] += 1
+
+    def remember_writer(self, user_id):
+        if self.replica is not None and user_id is not None:
+            self.recent_writers.set(int(user_id), True)
+
+    def use_replica(self):
+        if self.replica is None or not has_request_context() or not g.get('db_read_only') or g.get('db_primary'):
+            return False
+        if time.time() < self.replica_down_until:
+            return False
+        if g.get('current_user_id') is not None and self.recent_writers.get(g.current_user_id):
+            self.count('sticky_reads')
+            return False
+        return True
+
+    def connection(self, shareable=False):
+        if self.use_replica():
+            try:
+                con = self.replica.connection()
+                self.count('replica_checkouts')
+                return ReplicaConnection(self, con)
+            except Exception as e:
+                self.count('replica_fallbacks')
+                # Pool bhara hai to sirf is request ko primary do; connect fail hua to replica ko kuch der chhodo
+                if not isinstance(e, PoolTimeout):
+                    self.replica_failed(e)
+        return self.primary.connection()
+
+    def replica_failed(self, e):
+        print(f"⚠️ Replica unavailable, reading from primary: {e}")
+        self.replica_down_until = time.time() + REPLICA_RETRY_SECONDS
+
+    def stats(self):
+        stats = self.primary.stats()
+        if self.replica is not None:
+            with self.lock:
+                stats['routing'] = dict(self.counters, replica_down=time.time() < self.replica_down_until)
+            stats['replica'] = self.replica.stats()
+        return stats
+
+# Client library ke connection-level error codes (2003 connect, 2006 gone away, 2013 lost, 2055 lost)
+REPLICA_CONNECTION_ERRORS = (2003, 2006, 2013, 2055)
+
+def is_connection_error(e):
+    return isinstance(e, pymysql.err.InterfaceError) or (
+        isinstance(e, pymysql.err.OperationalError) and bool(e.args) and e.args[0] in REPLICA_CONNECTION_ERRORS)
+
+class ReplicaConnection:
+    # Checkout ke baad replica connection toote to isi request ke liye primary par switch.
+    # Yahan sirf @read_replica routes ke reads aate hain, isliye query dobara chalana safe hai.
+    def __init__(self, routing, con):
+        self.routing, self.con, self.on_replica = routing, con, True
+
+    def __getattr__(self, name):
+        return getattr(self.con, name)
+
+    def cursor(self, *args, **kwargs):
+        return ReplicaCursor(self, args, kwargs)
+
+    def fail_over(self, e):
+        self.routing.count('replica_fallbacks')
+        self.routing.replica_failed(e)
+        try:
+            self.con.close()
+        except Exception:
+            pass
+        self.con, self.on_replica = self.routing.primary.connection(), False
+
+    def close(self):
+        self.con.close()
+
+class ReplicaCursor:
+    def __init__(self, connection, args, kwargs):
+        self.connection, self.args, self.kwargs = connection, args, kwargs
+        self.cursor = connection.con.cursor(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self.cursor, name)
+
+    def __iter__(self):
+        return iter(self.cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cursor.close()
+
+    def execute(self, query, args=None):
+        try:
+            return self.cursor.execute(query, args)
+        except Exception as e:
+            if not (self.connection.on_replica and is_connection_error(e)):
+                raise
+            self.connection.fail_over(e)
+            self.cursor = self.connection.con.cursor(*self.args, **self.kwargs)
+            return self.cursor.execute(query, args)
+
+def read_replica(f):
+    # Read-only route: iske DB reads replica par ja sakte hain
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        g.db_read_only = True
+        return f(*args, **kwargs)
+    return decorated
+
+def replica_params(params):
+    params = dict(params)
+    params.pop('unix_socket', None)
+    params.pop('host', None)
+    if DB_REPLICA_HOST.startswith('/cloudsql/'):
+        params['unix_socket'] = DB_REPLICA_HOST
+    else:
+        params['host'] = DB_REPLICA_HOST
+        params['port'] = int(os.environ.get('DB_REPLICA_PORT', params.get('port', 3306)))
+    return params
+
 pool = None
 try:
-    db_host_value = os.environ.get('DB_HOST')
-    
-    if db_host_value and db_host_value.startswith('/cloudsql/'):
-        conn_params = {
-            'unix_socket': db_host_value,
-            'user': os.environ.get('DB_USER'),
-            'password': os.environ.get('DB_PASSWORD'),
-            'database': os.environ.get('DB_NAME'),
-            'cursorclass': pymysql.cursors.DictCursor, 
-            'charset': 'utf8mb4'
-        }
-    else:
-        conn_params = {
-            'host': db_host_value or '127.0.0.1',
-            'port': int(os.environ.get('DB_PORT', 8889)),
-            'user': os.environ.get('DB_USER', 'root'),
-            'password': os.environ.get('DB_PASSWORD', 'root'),
-            'database': os.environ.get('DB_NAME', 'lawyer_app_db'),
-            'cursorclass': pymysql.cursors.DictCursor, 
-            'charset': 'utf8mb4'
-        }
+    conn_params = dict(db_config.connection_params(), cursorclass=TimedDictCursor)
 
-    pool = PooledDB(
+    primary_pool = InstrumentedPool(
         creator=pymysql, 
-        maxconnections=10, 
+        mincached=DB_POOL_MIN_CACHED,
+        maxcached=DB_POOL_MAX_CACHED,
+        maxconnections=DB_POOL_MAX_CONNECTIONS, 
         blocking=True,
+        ping=DB_POOL_PING,
         **conn_params
     )
-    print("✅ Database connection pool created successfully.")
+    replica_pool = None
+    if DB_REPLICA_HOST:
+        # mincached=0: replica down ho tab bhi app start ho jaaye
+        replica_pool = InstrumentedPool(
+            creator=pymysql,
+            maxcached=DB_POOL_MAX_CACHED,
+            maxconnections=DB_REPLICA_MAX_CONNECTIONS,
+            blocking=True,
+            ping=DB_POOL_PING,
+            checkout_timeout=DB_REPLICA_CHECKOUT_TIMEOUT,
+            **replica_params(conn_params)
+        )
+    pool = RoutingPool(primary_pool, replica_pool)
+    print("✅ Database connection pool created successfully." + (" (with read replica)" if replica_pool else ""))
 except Exception as e:
     print(f"⚠️ Database fail: {e}")
     pool = None 
 
+@app.errorhandler(ServiceBusy)
+def handle_service_busy(e):
+    return error_response(e)
+
+@app.route('/api/pool/stats', methods=['GET'])
+@metrics_token_required
+def get_pool_stats():
+    if pool is None: return jsonify({"success": False, "message": "Database pool not initialised."}), 503
+    return jsonify({"success": True, "pool": pool.stats()})
+
+# ==================== REQUEST METRICS ====================
+# Har route ka wall time aur DB time histogram, queries, rows, pool wait, bcrypt aur JSON time
+# jama hota hai, taaki p99 ka hissa MySQL / bcrypt / JSON mein baanta ja sake. /metrics
+# Prometheus text format deta hai; har response par Server-Timing header bhi jaata hai.
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+METRICS_PREFIX = 'nyayconnect'
+
+class RouteMetrics:
+    def __init__(self, buckets_ms):
+        self.buckets_ms = buckets_ms
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.responses = {}
+
+    def record(self, route, status, elapsed_ms, timings):
+        with self.lock:
+            entry = self.routes.get(route)
+            if entry is None:
+                entry = self.routes[route] = {
+                    'latency': new_histogram(self.buckets_ms), 'db': new_histogram(self.buckets_ms),
+                    **dict.fromkeys(REQUEST_TIMERS[1:], 0.0), **dict.fromkeys(REQUEST_COUNTERS, 0)
+                }
+            observe(entry['latency'], self.buckets_ms, elapsed_ms)
+            observe(entry['db'], self.buckets_ms, timings['db_ms'])
+            for key in REQUEST_TIMERS[1:] + REQUEST_COUNTERS:
+                entry[key] += timings[key]
+            self.responses[(route, status)] = self.responses.get((route, status), 0) + 1
+
+    def render(self):
+        with self.lock:
+            routes = {route: dict(e, latency=dict(e['latency'], buckets=list(e['latency']['buckets'])),
+                                  db=dict(e['db'], buckets=list(e['db']['buckets'])))
+                      for route, e in self.routes.items()}
+            responses = dict(self.responses)
+        lines = []
+
+        def metric(name, kind, help_text):
+            lines.append(f"# HELP {METRICS_PREFIX}_{name} {help_text}")
+            lines.append(f"# TYPE {METRICS_PREFIX}_{name} {kind}")
+
+        def histogram(name, labels, hist, buckets_ms):
+            cumulative = 0
+            for bound, count in zip(list(buckets_ms) + ['+Inf'], hist['buckets']):
+                cumulative += count
+                le = bound if bound == '+Inf' else bound / 1000
+                lines.append(f'{METRICS_PREFIX}_{name}_bucket{{{labels},le="{le}"}} {cumulative}')
+            lines.append(f'{METRICS_PREFIX}_{name}_sum{{{labels}}} {hist["sum_ms"] / 1000:.6f}')
+            lines.append(f'{METRICS_PREFIX}_{name}_count{{{labels}}} {hist["count"]}')
+
+        metric('http_responses_total', 'counter', 'Responses by route and status code.')
+        for (route, status), count in sorted(responses.items()):
+            lines.append(f'{METRICS_PREFIX}_http_responses_total{{route="{route}",status="{status}"}} {count}')
+        metric('http_request_duration_seconds', 'histogram', 'Wall time per request.')
+        for route, e in sorted(routes.items()):
+            histogram('http_request_duration_seconds', f'route="{route}"', e['latency'], self.buckets_ms)
+        metric('db_time_seconds', 'histogram', 'Time spent in MySQL queries per request.')
+        for route, e in sorted(routes.items()):
+            histogram('db_time_seconds', f'route="{route}"', e['db'], self.buckets_ms)
+        for key, name, help_text in (('queries', 'db_queries_total', 'Queries executed.'),
+                                     ('rows', 'db_rows_total', 'Rows fetched by buffered and streaming cursors.')):
+            metric(name, 'counter', help_text)
+            for route, e in sorted(routes.items()):
+                lines.append(f'{METRICS_PREFIX}_{name}{{route="{route}"}} {e[key]}')
+        for key, name, help_text in (('pool_wait_ms', 'pool_wait_seconds_total', 'Time spent waiting for a pooled connection.'),
+                                     ('hash_ms', 'password_hash_seconds_total', 'Time spent waiting on bcrypt workers.'),
+                                     ('json_ms', 'json_encode_seconds_total', 'Time spent encoding JSON responses.')):
+            metric(name, 'counter', help_text)
+            for route, e in sorted(routes.items()):
+                lines.append(f'{METRICS_PREFIX}_{name}{{route="{route}"}} {e[key] / 1000:.6f}')
+        return lines
+
+def pool_metric_lines():
+    if pool is None:
+        return []
+    stats = pool.stats()
+    pools = [('primary', stats)] + ([('replica', stats['replica'])] if stats.get('replica') else [])
+    lines = [f"# TYPE {METRICS_PREFIX}_db_pool_connections gauge"]
+    for name, pool_stats in pools:
+        for state in ('in_use', 'idle'):
+            lines.append(f'{METRICS_PREFIX}_db_pool_connections{{pool="{name}",state="{state}"}} {pool_stats[state]}')
+    for key in ('checkouts', 'timeouts', 'opened', 'idle_evicted'):
+        lines.append(f"# TYPE {METRICS_PREFIX}_db_pool_{key}_total counter")
+        for name, pool_stats in pools:
+            lines.append(f'{METRICS_PREFIX}_db_pool_{key}_total{{pool="{name}"}} {pool_stats[key]}')
+    for key, value in stats.get('routing', {}).items():
+        if key == 'replica_down':
+            lines.append(f"# TYPE {METRICS_PREFIX}_db_replica_down gauge")
+            lines.append(f"{METRICS_PREFIX}_db_replica_down {int(value)}")
+        else:
+            lines.append(f"# TYPE {METRICS_PREFIX}_db_{key}_total counter")
+            lines.append(f"{METRICS_PREFIX}_db_{key}_total {value}")
+    return lines
+
+route_metrics = RouteMetrics(LATENCY_BUCKETS_MS)
+
+@app.before_request
+def start_request_timer():
+    g.request_started = time.perf_counter()
+    g.request_timings = {**dict.fromkeys(REQUEST_TIMERS, 0.0), **dict.fromkeys(REQUEST_COUNTERS, 0)}
+
+@app.after_request
+def add_server_timing(response):
+    # Metrics teardown mein record hote hain (unhandled exception par after_request skip ho sakta hai)
+    if 'request_started' not in g:
+        return response
+    g.response_status = response.status_code
+    elapsed_ms = (time.perf_counter() - g.request_started) * 1000
+    timings = g.request_timings
+    response.headers['Server-Timing'] = ', '.join(
+        [f"total;dur={elapsed_ms:.1f}"] +
+        [f"{key[:-3]};dur={timings[key]:.1f}" for key in REQUEST_TIMERS if timings[key]]
+    )
+    return response
+
+@app.teardown_request
+def record_request_metrics(exc=None):
+    if 'request_started' not in g:
+        return
+    elapsed_ms = (time.perf_counter() - g.request_started) * 1000
+    status = 500 if exc is not None else g.get('response_status', 500)
+    # Unknown URLs ka endpoint None hota hai; path label mat banao warna series bekaabu ho jaati hain
+    route_metrics.record(request.endpoint or 'unmatched', status, elapsed_ms, g.request_timings)
+
+@app.after_request
+def remember_db_writer(response):
+    # Kamyaab write ke baad is user ke reads thodi der primary se (replica lag ke bawajood apna write dikhe)
+    if pool is not None and request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400:
+        pool.remember_writer(g.get('current_user_id'))
+    return response
+
+@app.route('/metrics', methods=['GET'])
+@metrics_token_required
+def get_metrics():
+    lines = route_metrics.render() + pool_metric_lines()
+    return app.response_class('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
 # --- Authentication Decorator ---
+# HS256 verify har request par dobara na ho, isliye verified tokens ek bounded LRU mein
+# rakhe jaate hain; entry token ke exp se pehle hi expire ho jaati hai.
+TOKEN_CACHE_SIZE = int(os.environ.get('TOKEN_CACHE_SIZE', 10000))
+TOKEN_CACHE_TTL = int(os.environ.get('TOKEN_CACHE_TTL', 300))
+USER_CONTEXT_TTL = int(os.environ.get('USER_CONTEXT_TTL', 300))
+token_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=TOKEN_CACHE_TTL)
+user_context_cache = TTLCache(maxsize=TOKEN_CACHE_SIZE, ttl=USER_CONTEXT_TTL)
+
+def get_bearer_token():
+    parts = request.headers.get('Authorization', '').split()
+    if len(parts) == 2 and parts[0].lower() == 'bearer':
+        return parts[1]
+    return None
+
+def verify_token(token):
+    # jwt errors caller tak jaate hain; cache hit par signature dobara check nahi hota
+    data = token_cache.get(token)
+    if data is not None:
+        return data
+    data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
+    ttl = TOKEN_CACHE_TTL
+    if 'exp' in data:
+        ttl = min(ttl, data['exp'] - time.time())
+    if ttl > 0:
+        token_cache.set(token, data, ttl=ttl)
+    return data
+
+def get_current_user():
+    # Name/Email/Role/LawyerProfileID ka cached context; sirf zarurat par DB se aata hai
+    if 'current_user' in g:
+        return g.current_user
+    user = user_context_cache.get(g.current_user_id)
+    if user is None:
+        fill_from_primary(('user', g.current_user_id))
+        token = user_context_cache.fill_token()
+        connection = pool.connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                SELECT u.UserID, u.Name, u.Email, u.Role, lp.ProfileID AS LawyerProfileID
+                FROM Users u LEFT JOIN LawyerProfiles lp ON u.UserID = lp.UserID WHERE u.UserID = %s
+                """, (g.current_user_id,))
+                user = cursor.fetchone()
+        finally:
+            connection.close()
+        if user: user_context_cache.set_if_fresh(g.current_user_id, user, token)
+    g.current_user = user
+    return user
+
+def invalidate_user_context(user_id):
+    user_context_cache.pop(user_id)
+    resource_versions.bump(('user', int(user_id)))
+
 def token_required(f):
     @wraps(f)
     def decorated(*args, **kwargs):
-        token = None
-        if 'Authorization' in request.headers:
-            token = request.headers['Authorization'].split(" ")[1]
+        token = get_bearer_token()
+        if not token and 'Authorization' in request.headers:
+            return jsonify({'message': 'Authorization header must be "Bearer <token>".'}), 401
         if not token: return jsonify({'message': 'Token is missing!'}), 401
         try:
-            data = jwt.decode(token, app.config['SECRET_KEY'], algorithms=["HS256"])
+            data = verify_token(token)
             kwargs['current_user_id'] = data['UserID']
             kwargs['current_user_role'] = data['Role']
-        except (jwt.ExpiredSignatureError, jwt.InvalidTokenError):
+        except (jwt.ExpiredSignatureError, jwt.InvalidTokenError, KeyError):
             return jsonify({'message': 'Token is invalid or has expired!'}), 401
+        g.current_user_id, g.current_user_role = data['UserID'], data['Role']
         return f(*args, **kwargs)
     return decorated
 
+# ==================== RESPONSE CACHE ====================
+# Har resource ka ek version counter hai jise write paths bump karte hain. ETag inhi versions
+# se banta hai, isliye unchanged data par 304 bina view chalaye (aur bina MySQL) milta hai,
+# aur same ETag wali body memory se serve hoti hai. Counters process-local hain, isliye
+# ETag mein RESPONSE_CACHE_TTL ka time bucket bhi hai: doosre worker ka write zyada se zyada
+# utni der tak stale rahega.
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 5000))
+RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 30))
+PUBLIC_CACHE_MAX_AGE = int(os.environ.get('PUBLIC_CACHE_MAX_AGE', 60))
+
+class ResourceVersions:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.versions = {}
+        self.bumped_at = {}
+
+    def get(self, keys):
+        with self.lock:
+            return [self.versions.get(key, 0) for key in keys]
+
+    def bump(self, *keys):
+        now = time.time()
+        with self.lock:
+            for key in keys:
+                self.versions[key] = self.versions.get(key, 0) + 1
+                self.bumped_at[key] = now
+
+    def bumped_within(self, keys, seconds):
+        cutoff = time.time() - seconds
+        with self.lock:
+            return any(self.bumped_at.get(key, 0) > cutoff for key in keys)
+
+resource_versions = ResourceVersions()
+
+def fill_from_primary(*keys):
+    # Process cache bharne wale reads: in keys ka invalidation REPLICA_STICKY_SECONDS se naya ho
+    # to replica (jo shayad abhi peeche hai) ki jagah primary se padho, warna purana data poori
+    # TTL tak cache rahega, doosre participant ke liye bhi
+    if has_request_context() and resource_versions.bumped_within(keys, REPLICA_STICKY_SECONDS):
+        g.db_primary = True
+
+response_cache = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
+
+def conditional_get(version_keys, public=False):
+    # version_keys(view kwargs) -> resource keys jinke versions is response ko define karte hain
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            keys = version_keys(**kwargs)
+            # Naye version ka response replica ke purane data se na bane (aur cache na ho)
+            if resource_versions.bumped_within(keys, REPLICA_STICKY_SECONDS):
+                g.db_primary = True
+            parts = [request.endpoint, request.query_string.decode(), sorted(request.view_args.items()),
+                     None if public else kwargs.get('current_user_id'), kwargs.get('current_user_role'),
+                     keys, resource_versions.get(keys), int(time.time() // RESPONSE_CACHE_TTL)]
+            etag = hashlib.sha1(repr(parts).encode()).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+            else:
+                cached = response_cache.get(etag)
+                if cached is not None:
+                    response = app.response_class(cached[0], status=cached[1], mimetype=cached[2])
+                else:
+                    response = app.make_response(f(*args, **kwargs))
+                    # Streams ko buffer/hash/cache nahi karna, warna poori body memory mein aa jaati hai
+                    if response.status_code != 200 or response.direct_passthrough or response.is_streamed:
+                        return response
+                    response_cache.set(etag, (response.get_data(), response.status_code, response.mimetype))
+            response.set_etag(etag)
+            if public:
+                response.cache_control.public = True
+                response.cache_control.max_age = PUBLIC_CACHE_MAX_AGE
+            else:
+                response.cache_control.private = True
+                response.cache_control.no_cache = True
+                response.vary.add('Authorization')
+            return response
+        return decorated
+    return decorator
+
 # ==================== SOCKET.IO CHAT EVENTS ====================
 
 # ==================== LIVE CHAT LOGIC ====================
+# --- Room map ---
+# (ClientID, LawyerID) -> RoomID aur RoomID -> (ClientID, LawyerID), dono process-local aur
+# bounded. Room ke participants kabhi badalte nahi, isliye lambi TTL safe hai. Chat open aur
+# join ke membership checks aam taur par yahin se ho jaate hain.
+ROOM_CACHE_SIZE = int(os.environ.get('ROOM_CACHE_SIZE', 50000))
+room_ids_cache = TTLCache(maxsize=ROOM_CACHE_SIZE, ttl=86400)
+room_participants_cache = TTLCache(maxsize=ROOM_CACHE_SIZE, ttl=86400)
+
+def remember_room(room_id, client_id, lawyer_id):
+    room_ids_cache.set((int(client_id), int(lawyer_id)), int(room_id))
+    room_participants_cache.set(int(room_id), (int(client_id), int(lawyer_id)))
+
+def room_participants(room_id):
+    # RoomID -> (ClientID, LawyerID)
+    room_id = int(room_id)
+    participants = room_participants_cache.get(room_id)
+    if participants is None:
+        connection = pool.connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT ClientID, LawyerID FROM ChatRooms WHERE RoomID = %s", (room_id,))
+                row = cursor.fetchone()
+        finally:
+            connection.close()
+        if not row: return None
+        remember_room(room_id, row['ClientID'], row['LawyerID'])
+        participants = (row['ClientID'], row['LawyerID'])
+    return participants
+
+def is_room_member(room_id, user_id):
+    participants = room_participants(room_id)
+    return bool(participants) and int(user_id) in participants
+
+def get_or_create_room_id(client_id, lawyer_id):
+    client_id, lawyer_id = int(client_id), int(lawyer_id)
+    room_id = room_ids_cache.get((client_id, lawyer_id))
+    if room_id is not None:
+        return room_id
+    connection = pool.connection()
+    try:
+        with connection.cursor() as cursor:
+            # Ek hi atomic statement: naya room banao, ya UNIQUE (ClientID, LawyerID) par
+            # LAST_INSERT_ID se maujooda RoomID lo. Concurrent opens ab race nahi karte.
+            cursor.execute(
+                "INSERT INTO ChatRooms (ClientID, LawyerID) VALUES (%s, %s) "
+                "ON DUPLICATE KEY UPDATE RoomID = LAST_INSERT_ID(RoomID)",
+                (client_id, lawyer_id))
+            room_id = cursor.lastrowid
+            # Affected rows: 1 = naya room insert hua, 0 = pehle se tha (value nahi badli;
+            # pymysql FOUND_ROWS flag nahi bhejta)
+            created = cursor.rowcount == 1
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        connection.close()
+    remember_room(room_id, client_id, lawyer_id)
+    if created:
+        # Room list sirf naya room banne par badalti hai; warna dono users ke ETags bekaar toot-te
+        resource_versions.bump(('rooms', client_id), ('rooms', lawyer_id))
+    return room_id
+
+# --- Socket auth aur rate limits ---
+# Connect par hi JWT check hota hai (auth={'token': ...}, ?token= ya Authorization header);
+# bina valid token ke connection refuse. Har sid ka user aur joined rooms yahin rehte hain,
+# isliye events client ke bheje user_id/sender_id par bharosa nahi karte. Token ka exp bhi
+# rakha jaata hai; uske baad har event par 'auth_expired' aur disconnect (naye token se
+# reconnect karo). Token buckets memory mein hain: per connection aur per (room, sender), taaki
+# ek member kai connections se doosre member ka hissa na kha sake. Flood DB pool ya
+# write-behind queue tak pahunchne se pehle reject hota hai.
+SOCKET_RATE = float(os.environ.get('SOCKET_RATE', 5))          # events/sec per connection
+SOCKET_BURST = float(os.environ.get('SOCKET_BURST', 20))
+ROOM_RATE = float(os.environ.get('ROOM_RATE', 10))             # messages/sec per (room, sender)
+ROOM_BURST = float(os.environ.get('ROOM_BURST', 40))
+MAX_MESSAGE_LENGTH = int(os.environ.get('MAX_MESSAGE_LENGTH', 5000))
+
+class TokenBuckets:
+    # key -> [tokens, last_refill]; har key ke liye sirf ek do-float list, lock poore map ka
+    def __init__(self, rate, burst, maxsize):
+        self.rate, self.burst, self.maxsize = rate, burst, maxsize
+        self.lock = threading.Lock()
+        self.buckets = OrderedDict()
+
+    def allow(self, key):
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                bucket = self.buckets[key] = [self.burst, now]
+                while len(self.buckets) > self.maxsize:
+                    self.buckets.popitem(last=False)
+            else:
+                bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+                bucket[1] = now
+                self.buckets.move_to_end(key)
+            if bucket[0] < 1:
+                return False
+            bucket[0] -= 1
+            return True
+
+    def discard(self, key):
+        with self.lock:
+            self.buckets.pop(key, None)
+
+connection_buckets = TokenBuckets(SOCKET_RATE, SOCKET_BURST, maxsize=100000)
+room_buckets = TokenBuckets(ROOM_RATE, ROOM_BURST, maxsize=ROOM_CACHE_SIZE * 2)
+socket_users = {}  # sid -> (user_id, role, joined room ids, token exp ya None)
+
+def socket_user():
+    user = socket_users.get(request.sid)
+    if user is not None and user[3] is not None and user[3] <= time.time():
+        socket_users.pop(request.sid, None)
+        emit('auth_expired', {"message": "Token has expired, reconnect with a new token."})
+        disconnect()
+        return None
+    return user
+
+def rate_limited(room_id=None):
+    user = socket_users.get(request.sid)
+    if not connection_buckets.allow(request.sid) or (room_id is not None and not room_buckets.allow((room_id, user and user[0]))):
+        emit('rate_limited', {"room_id": room_id, "message": "Too many events, slow down."})
+        return True
+    return False
+
+@socketio.on('connect')
+def handle_connect(auth=None):
+    token = (auth or {}).get('token') if isinstance(auth, dict) else None
+    token = token or request.args.get('token') or get_bearer_token()
+    try:
+        data = verify_token(token or '')
+        socket_users[request.sid] = (int(data['UserID']), data['Role'], set(), data.get('exp'))
+    except (jwt.ExpiredSignatureError, jwt.InvalidTokenError, KeyError, TypeError, ValueError):
+        raise socketio_lib.exceptions.ConnectionRefusedError('Token is invalid or has expired!')
+
+@socketio.on('disconnect')
+def handle_disconnect(*args):
+    socket_users.pop(request.sid, None)
+    connection_buckets.discard(request.sid)
+
+def can_use_room(user, room_id):
+    # Joined rooms pehle; warna cached participants se check, DB sirf cache miss par
+    if room_id in user[2]:
+        return True
+    if is_room_member(room_id, user[0]):
+        user[2].add(room_id)
+        return True
+    return False
+
 @socketio.on('join_room')
 def handle_join(data):
-    room = f"room_{data['room_id']}"
-    join_room(room)
+    user = socket_user()
+    room_id = (data or {}).get('room_id')
+    if user is None or rate_limited():
+        return
+    try:
+        room_id = int(room_id)
+        if not can_use_room(user, room_id):
+            emit('join_error', {"room_id": room_id, "message": "Room not found or access denied."})
+            return
+    except (TypeError, ValueError):
+        emit('join_error', {"room_id": room_id, "message": "Invalid room_id."})
+        return
+    join_room(f"room_{room_id}")
+
+# --- Chat write-behind ---
+# Har message par alag commit karne ki jagah messages queue mein jaate hain aur ek
+# background thread unhe batches mein likhta hai: ek multi-row INSERT aur har room ka
+# sirf ek LastMessage UPDATE per flush. Batch fail ho to rows ek ek karke likhi jaati hain:
+# kharab row (FK/data error) sirf khud reject hoti hai, baaki batch bach jaata hai. DB/connection
+# errors wale messages apne attempts ke hisaab se dobara queue mein jaate hain.
+#   CHAT_WRITE_MODE=async   -> turant broadcast, DB write peeche se (CHAT_FLUSH_RETRIES ke baad drop)
+#   CHAT_WRITE_MODE=durable -> commit hone ke baad hi broadcast; CHAT_DURABLE_RETRIES tak retry
+#                              (at-least-once, duplicate ho sakta hai). Ack timeout par message
+#                              queue mein hi rehta hai aur save hote hi writer broadcast karta hai.
+# receive_message payload: room_id, sender_id, message, MessageID. Durable mode mein MessageID
+# committed row ka ID hai (?after= cursor isi se aage badhao); async mode mein broadcast write se
+# pehle hota hai, isliye MessageID None rehta hai aur client ko REST delta se ID milti hai.
+CHAT_WRITE_MODE = os.environ.get('CHAT_WRITE_MODE', 'async')
+CHAT_FLUSH_SIZE = int(os.environ.get('CHAT_FLUSH_SIZE', 50))
+CHAT_FLUSH_INTERVAL = float(os.environ.get('CHAT_FLUSH_INTERVAL', 0.05))
+CHAT_FLUSH_RETRIES = int(os.environ.get('CHAT_FLUSH_RETRIES', 3))
+CHAT_DURABLE_RETRIES = int(os.environ.get('CHAT_DURABLE_RETRIES', 50))
+CHAT_ACK_TIMEOUT = float(os.environ.get('CHAT_ACK_TIMEOUT', 5))
+
+# Ye errors row ke data ki wajah se hain; dobara likhne se kuch nahi badlega
+REJECTED_ROW_ERRORS = (pymysql.err.IntegrityError, pymysql.err.DataError)
+
+class PendingMessage:
+    __slots__ = ('room_id', 'sender_id', 'text', 'done', 'saved', 'message_id', 'attempts', 'callbacks', 'lock')
+
+    def __init__(self, room_id, sender_id, text):
+        self.room_id, self.sender_id, self.text = room_id, sender_id, text
+        self.done = threading.Event()
+        self.saved = None
+        self.message_id = None  # commit ke baad Messages.MessageID
+        self.attempts = 0
+        self.callbacks = []
+        self.lock = threading.Lock()
+
+    def wait(self, timeout):
+        return self.done.wait(timeout)
+
+    def finish(self, saved):
+        with self.lock:
+            self.saved = saved
+            self.done.set()
+            callbacks, self.callbacks = self.callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"⚠️ Chat message callback failed: {e}")
+
+    def on_done(self, callback):
+        # Pehle hi finish ho chuka ho to turant bulao
+        with self.lock:
+            if not self.done.is_set():
+                self.callbacks.append(callback)
+                return
+        callback(self)
+
+class MessageWriter:
+    def __init__(self, flush_size, flush_interval, max_retries, durable):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.durable = durable
+        self.queue = deque()
+        self.cond = threading.Condition()
+        self.thread = None
+        self.stopping = False
+        self.id_step = None  # @@auto_increment_increment, pehli write par padha jaata hai
+
+    def start(self):
+        with self.cond:
+            if self.thread is None or not self.thread.is_alive():
+                self.stopping = False
+                self.thread = threading.Thread(target=self.run, name='chat-writer', daemon=True)
+                self.thread.start()
+
+    def submit(self, room_id, sender_id, text):
+        message = PendingMessage(room_id, sender_id, text)
+        self.start()
+        with self.cond:
+            self.queue.append(message)
+            self.cond.notify()
+        return message
+
+    def run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.queue or self.stopping)
+                # Pehla message aane ke baad interval tak batch bharne do
+                self.cond.wait_for(lambda: len(self.queue) >= self.flush_size or self.stopping, timeout=self.flush_interval)
+                batch = [self.queue.popleft() for _ in range(min(self.flush_size, len(self.queue)))]
+                if not batch and self.stopping:
+                    return
+            if batch:
+                self.flush(batch)
+
+    def flush(self, batch):
+        try:
+            self.write(batch)
+            for message in batch: message.finish(True)
+            return
+        except Exception as e:
+            print(f"❌ DATABASE ERROR (chat flush of {len(batch)}): {str(e)}")
+        retry = []
+        for message in batch:
+            if retry:
+                # DB hi down hai; baaki rows ko bhi bina try kiye retry mein daalo
+                retry.append(message)
+                continue
+            try:
+                self.write([message])
+                message.finish(True)
+            except REJECTED_ROW_ERRORS as e:
+                print(f"❌ Rejected chat message for room {message.room_id}: {str(e)}")
+                message.finish(False)
+            except Exception as e:
+                print(f"❌ DATABASE ERROR (chat row): {str(e)}")
+                retry.append(message)
+        if retry:
+            self.requeue(retry)
+
+    def requeue(self, messages):
+        limit = CHAT_DURABLE_RETRIES if self.durable else self.max_retries
+        for message in messages: message.attempts += 1
+        dropped = [m for m in messages if m.attempts > limit]
+        if dropped:
+            print(f"❌ Dropped {len(dropped)} chat messages after {limit} retries")
+            for message in dropped: message.finish(False)
+        retry = [m for m in messages if m.attempts <= limit]
+        if retry:
+            time.sleep(min(0.1 * 2 ** min(m.attempts for m in retry), 5))
+            with self.cond:
+                self.queue.extendleft(reversed(retry))
+
+    def write(self, batch):
+        room_params = room_update_params([(m.room_id, m.sender_id, m.text) for m in batch])
+        connection = pool.connection()
+        try:
+            with connection.cursor() as cursor:
+                if self.id_step is None:
+                    cursor.execute("SELECT @@auto_increment_increment AS step")
+                    row = cursor.fetchone()
+                    self.id_step = int(row['step']) if row else 1
+                # Ek hi multi-row INSERT statement (executemany bade batch ko kai statements mein tod
+                # sakta hai). Row count pehle se pata hai ("simple insert"), isliye InnoDB har lock
+                # mode mein iske IDs ek saath deta hai: lastrowid pehli row ka, baaki id_step ke gap par
+                cursor.execute("INSERT INTO Messages (RoomID, SenderID, MessageText) VALUES " + ', '.join(['(%s, %s, %s)'] * len(batch)),
+                               [v for m in batch for v in (m.room_id, m.sender_id, m.text)])
+                first_id = cursor.lastrowid
+                cursor.executemany(ROOM_UPDATE_SQL, room_params)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+        for i, message in enumerate(batch):
+            message.message_id = first_id + i * self.id_step
+        for params in room_params:
+            on_room_changed(params[-1])
+
+    def stop(self, timeout=10):
+        # Shutdown par queue mein bache messages flush karke hi niklo
+        with self.cond:
+            self.stopping = True
+            self.cond.notify_all()
+        if self.thread is not None:
+            self.thread.join(timeout)
+
+# Har room mein dono participants ka unread counter rakha jaata hai (ClientUnread/LawyerUnread),
+# taaki badges ke liye Messages scan na karna pade
+ROOM_UPDATE_SQL = """
+UPDATE ChatRooms SET LastMessage = %s, LastMessageTime = NOW(),
+       ClientUnread = ClientUnread + %s, LawyerUnread = LawyerUnread + %s
+WHERE RoomID = %s
+"""
+
+def room_update_params(messages):
+    # (room_id, sender_id, text) list -> har room ke liye ek UPDATE ke params
+    rooms = {}
+    for room_id, sender_id, text in messages:
+        entry = rooms.setdefault(room_id, [None, 0, 0])
+        entry[0] = text
+        participants = room_participants(room_id)
+        if participants:
+            client_id, lawyer_id = participants
+            if str(sender_id) == str(lawyer_id): entry[1] += 1
+            elif str(sender_id) == str(client_id): entry[2] += 1
+    return [(text, client_unread, lawyer_unread, room_id) for room_id, (text, client_unread, lawyer_unread) in rooms.items()]
+
+def on_room_changed(room_id):
+    try:
+        participants = room_participants(room_id)
+    except Exception as e:
+        print(f"⚠️ Room lookup failed for {room_id}: {e}")
+        return
+    if participants:
+        resource_versions.bump(*[('rooms', user_id) for user_id in participants])
+
+message_writer = MessageWriter(CHAT_FLUSH_SIZE, CHAT_FLUSH_INTERVAL, CHAT_FLUSH_RETRIES, CHAT_WRITE_MODE == 'durable')
+atexit.register(message_writer.stop)
 
 @socketio.on('send_message')
 def handle_send_message(data):
-    room_id = data.get('room_id')
-    sender_id = data.get('sender_id')
+    user = socket_user()
+    data = data or {}
     message_text = data.get('message')
-    room = f"room_{room_id}"
-
-    connection = None
     try:
-        connection = pool.connection()
-        with connection.cursor() as cursor:
-            # 1. Messages table mein save karo
-            sql_msg = "INSERT INTO Messages (RoomID, SenderID, MessageText) VALUES (%s, %s, %s)"
-            cursor.execute(sql_msg, (room_id, sender_id, message_text))
-            
-            # 2. ChatRooms table mein last message update karo
-            sql_room = "UPDATE ChatRooms SET LastMessage = %s, LastMessageTime = NOW() WHERE RoomID = %s"
-            cursor.execute(sql_room, (message_text, room_id))
-            
-            # 3. Commit karna bahut zaroori hai refresh fix karne ke liye
-            connection.commit()
-            print(f"✅ Success: Message saved for room {room_id}")
+        room_id = int(data.get('room_id'))
+    except (TypeError, ValueError):
+        emit('message_error', {"room_id": data.get('room_id'), "message": "Invalid room_id."})
+        return
+    if user is None or rate_limited(room_id):
+        return
+    if not isinstance(message_text, str) or not message_text.strip() or len(message_text) > MAX_MESSAGE_LENGTH:
+        emit('message_error', {"room_id": room_id, "message": "Message is empty or too long."})
+        return
+    try:
+        if not can_use_room(user, room_id):
+            emit('message_error', {"room_id": room_id, "message": "Room not found or access denied."})
+            return
+    except Exception as e:
+        emit('message_error', {"room_id": room_id, "message": str(e)})
+        return
+    # Sender hamesha connection ka user hai; client ke bheje baaki fields relay nahi hote
+    sender_id = user[0]
+    data = {"room_id": room_id, "sender_id": sender_id, "message": message_text, "MessageID": None}
+    room = f"room_{room_id}"
 
-        # ✅ Database mein save hone ke baad hi sabko bhejo
+    sid = request.sid
+    pending = message_writer.submit(room_id, sender_id, message_text)
+    if pool is not None: pool.remember_writer(sender_id)
+    if not message_writer.durable:
         emit('receive_message', data, room=room)
+        # Broadcast ho chuka hai; save na ho paaye to kam se kam sender ko batao
+        pending.on_done(lambda m: m.saved or socketio.emit('message_error', {"room_id": room_id, "message": "Message could not be saved."}, to=sid))
+        return
+    if not pending.wait(CHAT_ACK_TIMEOUT):
+        # Message abhi queue mein hai, fail nahi hua; save hote hi writer thread broadcast karega
+        emit('message_pending', {"room_id": room_id})
+    pending.on_done(lambda m: socketio.emit('receive_message', dict(data, MessageID=m.message_id), to=room) if m.saved else
+                    socketio.emit('message_error', {"room_id": room_id, "message": "Message could not be saved."}, to=sid))
 
-    except Exception as e:
-        print(f"❌ DATABASE ERROR: {str(e)}")
-        if connection:
-            connection.rollback()
-    finally:
-        if connection:
-            connection.close()
 @app.route('/api/chat/get_or_create_room', methods=['POST'])
 @token_required
 def get_or_create_room(current_user_id, current_user_role):
-    data = request.get_json()
-    lawyer_id = data.get('lawyerId')
-    connection = pool.connection()
+    data = request.get_json() or {}
     try:
-        with connection.cursor() as cursor:
-            # Check room exists
-            cursor.execute("SELECT RoomID FROM ChatRooms WHERE ClientID=%s AND LawyerID=%s", (current_user_id, lawyer_id))
-            room = cursor.fetchone()
-            if not room:
-                # Create new room
-                cursor.execute("INSERT INTO ChatRooms (ClientID, LawyerID) VALUES (%s, %s)", (current_user_id, lawyer_id))
-                connection.commit()
-                room_id = cursor.lastrowid
-            else:
-                room_id = room['RoomID']
+        lawyer_id = int(data.get('lawyerId'))
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "lawyerId is required."}), 400
+    try:
+        room_id = get_or_create_room_id(current_user_id, lawyer_id)
         return jsonify({"success": True, "room_id": room_id})
-    finally:
-        connection.close()
+    except Exception as e:
+        return error_response(e)
+
 # ==================== CHAT API ROUTES ====================
 
 @app.route('/api/chat/rooms', methods=['GET'])
+@read_replica
 @token_required
+@conditional_get(lambda current_user_id, **_: [('rooms', current_user_id), ('users',)])
 def get_chat_rooms(current_user_id, current_user_role):
     connection = None
     try:
@@ -186,13 +1381,13 @@ def get_chat_rooms(current_user_id, current_user_role):
         with connection.cursor() as cursor:
             if current_user_role == 'Lawyer':
                 query = """
-                SELECT cr.RoomID, u.Name as ClientName, cr.LastMessage, cr.LastMessageTime 
+                SELECT cr.RoomID, u.Name as ClientName, cr.LastMessage, cr.LastMessageTime, cr.LawyerUnread as UnreadCount
                 FROM ChatRooms cr JOIN Users u ON cr.ClientID = u.UserID 
                 WHERE cr.LawyerID = %s ORDER BY cr.LastMessageTime DESC
                 """
             else:
                 query = """
-                SELECT cr.RoomID, u.Name as LawyerName, cr.LastMessage, cr.LastMessageTime 
+                SELECT cr.RoomID, u.Name as LawyerName, cr.LastMessage, cr.LastMessageTime, cr.ClientUnread as UnreadCount
                 FROM ChatRooms cr JOIN Users u ON cr.LawyerID = u.UserID 
                 WHERE cr.ClientID = %s ORDER BY cr.LastMessageTime DESC
                 """
@@ -200,22 +1395,180 @@ def get_chat_rooms(current_user_id, current_user_role):
             rooms = cursor.fetchall()
         return jsonify({"success": True, "rooms": rooms})
     except Exception as e:
-        return jsonify({"success": False, "message": str(e)}), 500
+        return error_response(e)
+    finally:
+        if connection: connection.close()
+
+@app.route('/api/chat/read', methods=['POST'])
+@token_required
+def mark_rooms_read(current_user_id, current_user_role):
+    # Body: {"room_ids": [1, 2, 3]} -> caller ke liye in rooms ke saare messages read
+    connection = None
+    try:
+        data = request.get_json() or {}
+        try:
+            room_ids = sorted({int(r) for r in data.get('room_ids') or []})
+        except (TypeError, ValueError):
+            return jsonify({"success": False, "message": "room_ids must be a list of integers."}), 400
+        if not room_ids: return jsonify({"success": False, "message": "room_ids is required."}), 400
+        unread_column = 'LawyerUnread' if current_user_role == 'Lawyer' else 'ClientUnread'
+        member_column = 'LawyerID' if current_user_role == 'Lawyer' else 'ClientID'
+        placeholders = ', '.join(['%s'] * len(room_ids))
+        connection = pool.connection()
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT RoomID FROM ChatRooms WHERE RoomID IN ({placeholders}) AND {member_column} = %s",
+                           (*room_ids, current_user_id))
+            my_rooms = [row['RoomID'] for row in cursor.fetchall()]
+            if my_rooms:
+                placeholders = ', '.join(['%s'] * len(my_rooms))
+                cursor.execute(f"UPDATE ChatRooms SET {unread_column} = 0 WHERE RoomID IN ({placeholders})", my_rooms)
+                cursor.execute(f"UPDATE Messages SET IsRead = TRUE WHERE RoomID IN ({placeholders}) AND IsRead = FALSE AND SenderID != %s",
+                               (*my_rooms, current_user_id))
+        connection.commit()
+        if my_rooms: resource_versions.bump(('rooms', current_user_id))
+        return jsonify({"success": True, "room_ids": my_rooms})
+    except Exception as e:
+        if connection: connection.rollback()
+        return error_response(e)
     finally:
         if connection: connection.close()
 
+MESSAGES_PAGE_SIZE = 50
+MESSAGES_MAX_PAGE_SIZE = 200
+
+def get_page_limit(default, maximum):
+    limit = request.args.get('limit', default, type=int)
+    return max(1, min(limit, maximum))
+
 @app.route('/api/chat/messages/<int:room_id>', methods=['GET'])
+@read_replica
 @token_required
 def get_messages(current_user_id, current_user_role, room_id):
+    # Keyset paging on (RoomID, MessageID):
+    #   ?before=<MessageID>  -> older page (scroll up)
+    #   ?after=<MessageID>   -> newer messages (delta since last seen, reconnect)
+    #   no cursor            -> latest page
+    # Messages always come back oldest first.
+    before_id = request.args.get('before', type=int)
+    after_id = request.args.get('after', type=int)
+    if after_id is None:
+        after_id = request.args.get('since', type=int)
+    limit = get_page_limit(MESSAGES_PAGE_SIZE, MESSAGES_MAX_PAGE_SIZE)
     connection = None
     try:
+        if not is_room_member(room_id, current_user_id):
+            return jsonify({"success": False, "message": "Room not found or access denied."}), 404
         connection = pool.connection()
         with connection.cursor() as cursor:
-            cursor.execute("SELECT * FROM Messages WHERE RoomID = %s ORDER BY Timestamp ASC", (room_id,))
-            messages = cursor.fetchall()
-        return jsonify({"success": True, "messages": messages})
+            if after_id is not None:
+                cursor.execute("SELECT * FROM Messages WHERE RoomID = %s AND MessageID > %s ORDER BY MessageID ASC LIMIT %s",
+                               (room_id, after_id, limit + 1))
+                messages = list(cursor.fetchall())
+                has_more = len(messages) > limit
+                messages = messages[:limit]
+            else:
+                if before_id is not None:
+                    cursor.execute("SELECT * FROM Messages WHERE RoomID = %s AND MessageID < %s ORDER BY MessageID DESC LIMIT %s",
+                                   (room_id, before_id, limit + 1))
+                else:
+                    cursor.execute("SELECT * FROM Messages WHERE RoomID = %s ORDER BY MessageID DESC LIMIT %s",
+                                   (room_id, limit + 1))
+                messages = list(cursor.fetchall())
+                has_more = len(messages) > limit
+                messages = messages[:limit][::-1]
+        return jsonify({
+            "success": True, "messages": messages, "has_more": has_more,
+            "first_id": messages[0]['MessageID'] if messages else before_id,
+            "last_id": messages[-1]['MessageID'] if messages else after_id
+        })
     except Exception as e:
-        return jsonify({"success": False, "message": str(e)}), 500
+        return error_response(e)
+    finally:
+        if connection: connection.close()
+
+# --- Message search ---
+# Messages.MessageText par FULLTEXT index (migration 8) hai; InnoDB use har insert ke saath
+# khud update karta hai, isliye search index lookup hai, table scan nahi. Har term prefix match
+# hota hai (BOOLEAN MODE "+term*") aur results relevance se rank hote hain.
+SEARCH_PAGE_SIZE = 20
+SEARCH_MAX_PAGE_SIZE = 50
+SEARCH_MAX_OFFSET = 1000
+SEARCH_MAX_TERMS = 8
+# innodb_ft_min_token_size (default 3) se chhote terms index mein hote hi nahi
+SEARCH_MIN_TERM_LENGTH = int(os.environ.get('SEARCH_MIN_TERM_LENGTH', 3))
+SNIPPET_CONTEXT = 60
+
+def search_terms(query):
+    terms = []
+    for term in re.findall(r'\w+', query.lower()):
+        if len(term) >= SEARCH_MIN_TERM_LENGTH and term not in terms:
+            terms.append(term)
+    return terms[:SEARCH_MAX_TERMS]
+
+def highlight_snippet(text, terms):
+    # Pehle match ke aas-paas ka hissa; text HTML-escape hota hai, sirf <mark> tags hamare hain
+    pattern = re.compile('|'.join(re.escape(t) for t in terms), re.IGNORECASE)
+    first = pattern.search(text)
+    start = max(0, first.start() - SNIPPET_CONTEXT) if first else 0
+    end = min(len(text), (first.end() if first else 0) + SNIPPET_CONTEXT * 2)
+    window = text[start:end]
+    parts, last = [], 0
+    for match in pattern.finditer(window):
+        parts.append(html.escape(window[last:match.start()]))
+        parts.append(f"<mark>{html.escape(match.group())}</mark>")
+        last = match.end()
+    parts.append(html.escape(window[last:]))
+    return ('…' if start > 0 else '') + ''.join(parts) + ('…' if end < len(text) else '')
+
+@app.route('/api/chat/search', methods=['GET'])
+@read_replica
+@token_required
+def search_messages(current_user_id, current_user_role):
+    # ?q=<text>&room_id=<optional>&page=&limit=  -> sirf caller ke rooms mein, best match pehle
+    terms = search_terms(request.args.get('q', ''))
+    if not terms:
+        return jsonify({"success": False, "message": f"q needs at least one word of {SEARCH_MIN_TERM_LENGTH}+ characters."}), 400
+    room_id = request.args.get('room_id', type=int)
+    page = max(1, request.args.get('page', 1, type=int))
+    limit = get_page_limit(SEARCH_PAGE_SIZE, SEARCH_MAX_PAGE_SIZE)
+    offset = (page - 1) * limit
+    if offset > SEARCH_MAX_OFFSET:
+        return jsonify({"success": False, "message": "Page too deep; refine the search."}), 400
+    member_column, other_column = ('cr.LawyerID', 'cr.ClientID') if current_user_role == 'Lawyer' else ('cr.ClientID', 'cr.LawyerID')
+    against = ' '.join(f"+{t}*" for t in terms)
+    room_filter = " AND cr.RoomID = %s" if room_id is not None else ""
+    connection = None
+    try:
+        connection = pool.connection()
+        with connection.cursor() as cursor:
+            # Pehle caller ke rooms (member index se), phir MATCH sirf unhi RoomIDs par;
+            # ChatRooms/Users ka join full-text result par nahi chalta
+            cursor.execute(f"""
+            SELECT cr.RoomID, u.Name AS OtherPartyName
+            FROM ChatRooms cr JOIN Users u ON u.UserID = {other_column}
+            WHERE {member_column} = %s{room_filter}
+            """, [current_user_id] + ([room_id] if room_id is not None else []))
+            rooms = {row['RoomID']: row['OtherPartyName'] for row in cursor.fetchall()}
+            rows = []
+            if rooms:
+                placeholders = ', '.join(['%s'] * len(rooms))
+                cursor.execute(f"""
+                SELECT m.MessageID, m.RoomID, m.SenderID, m.MessageText, m.Timestamp,
+                       MATCH(m.MessageText) AGAINST (%s IN BOOLEAN MODE) AS Score
+                FROM Messages m
+                WHERE m.RoomID IN ({placeholders}) AND MATCH(m.MessageText) AGAINST (%s IN BOOLEAN MODE)
+                ORDER BY Score DESC, m.MessageID DESC LIMIT %s OFFSET %s
+                """, [against, *rooms, against, limit + 1, offset])
+                rows = list(cursor.fetchall())
+        has_more = len(rows) > limit
+        results = [{
+            "message_id": row['MessageID'], "room_id": row['RoomID'], "sender_id": row['SenderID'],
+            "other_party": rooms.get(row['RoomID']), "timestamp": row['Timestamp'], "score": row['Score'],
+            "snippet": highlight_snippet(row['MessageText'] or '', terms)
+        } for row in rows[:limit]]
+        return jsonify({"success": True, "results": results, "terms": terms, "page": page, "limit": limit, "has_more": has_more})
+    except Exception as e:
+        return error_response(e)
     finally:
         if connection: connection.close()
 
@@ -226,47 +1579,137 @@ def save_chat_message(current_user_id, current_user_role):
     try:
         data = request.get_json()
         room_id, msg_text = data.get('room_id'), data.get('message')
+        room_params = room_update_params([(room_id, current_user_id, msg_text)])
         connection = pool.connection()
         with connection.cursor() as cursor:
             cursor.execute("INSERT INTO Messages (RoomID, SenderID, MessageText) VALUES (%s, %s, %s)", 
                            (room_id, current_user_id, msg_text))
-            cursor.execute("UPDATE ChatRooms SET LastMessage = %s, LastMessageTime = NOW() WHERE RoomID = %s", 
-                           (msg_text, room_id))
+            cursor.execute(ROOM_UPDATE_SQL, room_params[0])
         connection.commit()
+        on_room_changed(room_id)
         return jsonify({"success": True})
     except Exception as e:
         if connection: connection.rollback()
-        return jsonify({"success": False, "message": str(e)}), 500
+        return error_response(e)
     finally:
         if connection: connection.close()
         
           
 
+# ==================== PASSWORD HASHING ====================
+# bcrypt CPU-heavy hai; gunicorn ke 8 threads par chalane se login spike baaki sab endpoints
+# ko rok deta hai. Isliye hashing alag process pool mein hoti hai, apni concurrency limit ke
+# saath, aur DB connection hashing se pehle chhod diya jaata hai.
+app.config['BCRYPT_LOG_ROUNDS'] = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(2, os.cpu_count() or 1)))
+PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', PASSWORD_HASH_WORKERS * 4))
+PASSWORD_HASH_WAIT = float(os.environ.get('PASSWORD_HASH_WAIT', 2))
+
+class PasswordHasher:
+    def __init__(self, workers, max_pending, wait):
+        self.workers = workers
+        self.wait = wait
+        self.slots = threading.BoundedSemaphore(max_pending)
+        self.lock = threading.Lock()
+        self.executor = None
+
+    def get_executor(self):
+        with self.lock:
+            if self.executor is None:
+                if ASYNC_MODE == 'gevent':
+                    # Patched process mein multiprocessing ka manager thread bharosemand nahi; bcrypt
+                    # GIL chhod deta hai, isliye gevent ke native thread pool kaafi hain
+                    from gevent.threadpool import ThreadPoolExecutor
+                    self.executor = ThreadPoolExecutor(max_workers=self.workers)
+                else:
+                    # Multi-threaded worker ko fork karne se child kisi thread ka pakda hua lock le kar
+                    # deadlock ho sakta hai; forkserver saaf process se fork karta hai
+                    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+                    self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context(start_method))
+            return self.executor
+
+    def run(self, fn, *args):
+        started = time.perf_counter()
+        if not self.slots.acquire(timeout=self.wait):
+            raise HashingBusy("Too many password hashing requests in flight")
+        try:
+            return self.get_executor().submit(fn, *args).result()
+        except BrokenProcessPool:
+            # Worker mar gaya to agli baar naya pool banega
+            with self.lock:
+                self.executor = None
+            raise
+        finally:
+            self.slots.release()
+            note_request('hash_ms', (time.perf_counter() - started) * 1000)
+
+    def hash(self, password):
+        return self.run(hashing.hash_password, password, app.config['BCRYPT_LOG_ROUNDS'])
+
+    def check(self, hashed_password, password):
+        return self.run(hashing.check_password, hashed_password, password)
+
+    def needs_rehash(self, hashed_password):
+        return hashing.hash_rounds(hashed_password) != app.config['BCRYPT_LOG_ROUNDS']
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+
+password_hasher = PasswordHasher(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_WAIT)
+atexit.register(password_hasher.shutdown)
+
+def rehash_password(user_id, password):
+    # Cost factor badla ho to login ke baad peeche se naya hash save karo
+    connection = None
+    try:
+        new_hash = password_hasher.hash(password)
+        connection = pool.connection()
+        with connection.cursor() as cursor:
+            cursor.execute("UPDATE Users SET Password = %s WHERE UserID = %s", (new_hash, user_id))
+        connection.commit()
+    except Exception as e:
+        print(f"⚠️ Password rehash failed for user {user_id}: {e}")
+    finally:
+        if connection: connection.close()
+
 # ==================== USER & AUTH ROUTES ====================
 
 @app.route('/api/register', methods=['POST'])
 def register_user():
     connection = None
     try:
+        data = request.get_json()
+        name, email, password, role = data.get('name'), data.get('email'), data.get('password'), data.get('role')
+        if not all([name, email, password, role]): return jsonify({"success": False, "message": "All fields are required."}), 400
+
         connection = pool.connection()
         with connection.cursor() as cursor:
-            data = request.get_json()
-            name, email, password, role = data.get('name'), data.get('email'), data.get('password'), data.get('role')
-            if not all([name, email, password, role]): return jsonify({"success": False, "message": "All fields are required."}), 400
-            
             cursor.execute("SELECT UserID FROM Users WHERE Email = %s", (email,))
-            if cursor.fetchone():
-                return jsonify({"success": False, "message": "Email already registered."}), 409
+            existing = cursor.fetchone()
+        connection.close()
+        connection = None
+        if existing:
+            return jsonify({"success": False, "message": "Email already registered."}), 409
 
-            hashed_password = bcrypt.generate_password_hash(password).decode('utf-8')
+        hashed_password = password_hasher.hash(password)
+        connection = pool.connection()
+        with connection.cursor() as cursor:
             query = "INSERT INTO Users (Name, Email, Password, Role) VALUES (%s, %s, %s, %s)"
             cursor.execute(query, (name, email, hashed_password, role))
             new_user_id = cursor.lastrowid
         connection.commit()
+        if role == 'Lawyer': on_lawyer_changed(new_user_id)
         return jsonify({"success": True, "message": "User registered successfully!", "userId": new_user_id}), 201
+    except pymysql.err.IntegrityError:
+        # Hashing ke dauraan kisi aur ne same email register kar liya
+        if connection: connection.rollback()
+        return jsonify({"success": False, "message": "Email already registered."}), 409
     except Exception as e:
         if connection: connection.rollback()
-        return jsonify({"success": False, "message": str(e)}), 500
+        return error_response(e)
     finally:
         if connection: connection.close()
 
@@ -274,18 +1717,22 @@ def register_user():
 def login_user():
     connection = None
     try:
+        data = request.get_json()
+        email, password = data.get('email'), data.get('password')
+        if not email or not password: return jsonify({"success": False, "message": "Email and password are required."}), 400
+
+        clean_email = email.strip()
         connection = pool.connection()
         with connection.cursor() as cursor:
-            data = request.get_json()
-            email, password = data.get('email'), data.get('password')
-            if not email or not password: return jsonify({"success": False, "message": "Email and password are required."}), 400
-            
-            clean_email = email.strip()
-            cursor.execute("SELECT * FROM Users WHERE Email = %s", (clean_email,))
+            cursor.execute("SELECT UserID, Role, Password FROM Users WHERE Email = %s", (clean_email,))
             user = cursor.fetchone()
-            
-        if not user or not bcrypt.check_password_hash(user['Password'], password): 
+        connection.close()
+        connection = None
+
+        if not user or not password_hasher.check(user['Password'], password): 
             return jsonify({"success": False, "message": "Invalid credentials."}), 401
+        if password_hasher.needs_rehash(user['Password']):
+            threading.Thread(target=rehash_password, args=(user['UserID'], password), daemon=True).start()
         
         payload = {
             'UserID': user['UserID'],
@@ -297,31 +1744,26 @@ def login_user():
         return jsonify({"success": True, "message": "Login successful!", "token": token, "role": user['Role'], "userId": user['UserID']})
         
     except Exception as e:
-        return jsonify({"success": False, "message": str(e)}), 500
+        return error_response(e)
     finally:
         if connection: connection.close()
 
 # ==================== USER PROFILE ROUTES ====================
 
 @app.route('/api/user/profile', methods=['GET'])
+@read_replica
 @token_required
 def get_user_profile(current_user_id, current_user_role):
-    connection = None
     try:
-        connection = pool.connection()
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT UserID, Name, Email, Role FROM Users WHERE UserID = %s", (current_user_id,))
-            user = cursor.fetchone()
-            if not user: return jsonify({"success": False, "message": "User not found"}), 404
-            user_data = {
-                "name": user['Name'], "email": user['Email'], "role": user['Role'],
-                "joinDate": 'January 2024', "userId": user['UserID']
-            }
+        user = get_current_user()
+        if not user: return jsonify({"success": False, "message": "User not found"}), 404
+        user_data = {
+            "name": user['Name'], "email": user['Email'], "role": user['Role'],
+            "joinDate": 'January 2024', "userId": user['UserID']
+        }
         return jsonify({"success": True, "user": user_data})
     except Exception as e:
-        return jsonify({"success": False, "message": str(e)}), 500
-    finally:
-        if connection: connection.close()
+        return error_response(e)
 
 @app.route('/api/user/profile', methods=['PUT'])
 @token_required
@@ -340,36 +1782,105 @@ def update_user_profile(current_user_id, current_user_role):
                     cursor.execute("UPDATE UserProfiles SET Phone = %s, Address = %s WHERE UserID = %s", (phone, address, current_user_id))
             except: pass
         connection.commit()
+        invalidate_user_context(current_user_id)
+        resource_versions.bump(('users',))
+        if current_user_role == 'Lawyer': on_lawyer_changed(current_user_id)
         return jsonify({"success": True, "message": "Profile updated successfully"})
     except Exception as e:
         if connection: connection.rollback()
-        return jsonify({"success": False, "message": str(e)}), 500
+        return error_response(e)
     finally:
         if connection: connection.close()
 
+# ==================== APPOINTMENT LISTING HELPERS ====================
+# Saare appointment listings ?from=&to=&status=Pending,Confirmed filters lete hain.
+# ?stream=ndjson ya ?stream=json par rows server-side cursor se ek ek karke bheje jaate hain,
+# isliye request ki memory history ke size ke saath nahi badhti.
+APPOINTMENT_STATUSES = ('Pending', 'Confirmed', 'Cancelled', 'Completed')
+
+def parse_datetime_param(name):
+    value = request.args.get(name)
+    if not value: return None
+    try:
+        parsed = to_app_time(parser.isoparse(value))
+    except ValueError:
+        raise InvalidParams(f"Invalid '{name}' date: {value}")
+    # Sirf date di ho to 'to' poora din include kare
+    if name == 'to' and len(value) == 10:
+        parsed += datetime.timedelta(days=1)
+    return parsed.strftime('%Y-%m-%d %H:%M:%S')
+
+def appointment_filters():
+    clauses, params = [], []
+    start, end = parse_datetime_param('from'), parse_datetime_param('to')
+    if start:
+        clauses.append("a.AppointmentDate >= %s")
+        params.append(start)
+    if end:
+        clauses.append("a.AppointmentDate < %s")
+        params.append(end)
+    statuses = [s.strip() for s in request.args.get('status', '').split(',') if s.strip()]
+    invalid = [s for s in statuses if s not in APPOINTMENT_STATUSES]
+    if invalid:
+        raise InvalidParams(f"Invalid status: {', '.join(invalid)}")
+    if statuses:
+        clauses.append(f"a.Status IN ({', '.join(['%s'] * len(statuses))})")
+        params.extend(statuses)
+    return ''.join(f" AND {c}" for c in clauses), params
+
+def stream_requested():
+    mode = request.args.get('stream')
+    if mode not in (None, 'ndjson', 'json'):
+        raise InvalidParams("stream must be 'ndjson' or 'json'")
+    return mode
+
+def stream_rows(mode, query, params, formatter=None):
+    connection = pool.connection()
+
+    def generate():
+        with connection.cursor(TimedSSDictCursor) as cursor:
+            cursor.execute(query, params)
+            rows = (formatter(row) if formatter else row for row in cursor)
+            if mode == 'ndjson':
+                for row in rows:
+                    yield dumps_bytes(row) + b'\n'
+            else:
+                yield from stream_json_array(rows)
+
+    mimetype = 'application/x-ndjson' if mode == 'ndjson' else 'application/json'
+    response = app.response_class(generate(), mimetype=mimetype, direct_passthrough=True)
+    # Client beech mein chala jaaye tab bhi connection pool mein wapas jaaye
+    response.call_on_close(connection.close)
+    return response
+
 # ==================== LAWYER SPECIFIC ROUTES ====================
 
 @app.route('/api/lawyer/appointments', methods=['GET'])
+@read_replica
 @token_required
 def get_lawyer_appointments(current_user_id, current_user_role):
     if current_user_role != 'Lawyer': return jsonify({"success": False, "message": "Access forbidden."}), 403
     connection = None
     try:
+        filters, filter_params = appointment_filters()
+        query = f"""
+        SELECT a.AppointmentID, a.AppointmentDate, a.Status, a.Notes, 
+               u.Name AS ClientName, u.Email AS ClientEmail, lp.ConsultationFee
+        FROM Appointments a 
+        JOIN Users u ON a.ClientID = u.UserID 
+        LEFT JOIN LawyerProfiles lp ON a.LawyerID = lp.UserID
+        WHERE a.LawyerID = %s{filters} ORDER BY a.AppointmentDate DESC
+        """
+        params = (current_user_id, *filter_params)
+        mode = stream_requested()
+        if mode: return stream_rows(mode, query, params)
         connection = pool.connection()
         with connection.cursor() as cursor:
-            query = """
-            SELECT a.AppointmentID, a.AppointmentDate, a.Status, a.Notes, 
-                   u.Name AS ClientName, u.Email AS ClientEmail, lp.ConsultationFee
-            FROM Appointments a 
-            JOIN Users u ON a.ClientID = u.UserID 
-            LEFT JOIN LawyerProfiles lp ON a.LawyerID = lp.UserID
-            WHERE a.LawyerID = %s ORDER BY a.AppointmentDate DESC
-            """
-            cursor.execute(query, (current_user_id,))
+            cursor.execute(query, params)
             appointments = cursor.fetchall()
         return jsonify({"success": True, "appointments": appointments})
     except Exception as e:
-        return jsonify({"success": False, "message": str(e)}), 500
+        return error_response(e)
     finally:
         if connection: connection.close()
 
@@ -379,30 +1890,21 @@ def my_lawyer_profile_handler(current_user_id, current_user_role):
     if current_user_role != 'Lawyer':
         return jsonify({"success": False, "message": "Access forbidden."}), 403
     
+    if request.method == 'GET':
+        # Apna profile hamesha primary se (saath mein public document bhi refresh); CreatedAt build ka time hai
+        try:
+            document = profile_documents.build(current_user_id)
+            if not document:
+                return jsonify({"success": False, "message": "User not found."}), 404
+            return app.response_class(document[1], mimetype='application/json')
+        except Exception as e:
+            return error_response(e)
+
     connection = None
     try:
         connection = pool.connection()
         with connection.cursor() as cursor:
-            if request.method == 'GET':
-                query = """
-                SELECT u.UserID, u.Name, u.Email, u.Role as UserType,
-                       lp.Bio, lp.Specializations, lp.Experience, 
-                       lp.ConsultationFee, lp.City
-                FROM Users u 
-                LEFT JOIN LawyerProfiles lp ON u.UserID = lp.UserID 
-                WHERE u.UserID = %s
-                """
-                cursor.execute(query, (current_user_id,))
-                profile = cursor.fetchone()
-                if not profile:
-                    cursor.execute("SELECT UserID, Name, Email, Role as UserType FROM Users WHERE UserID = %s", (current_user_id,))
-                    profile = cursor.fetchone()
-                if not profile:
-                    return jsonify({"success": False, "message": "User not found."}), 404
-                profile['CreatedAt'] = datetime.datetime.now()
-                return jsonify({"success": True, "profile": profile})
-
-            elif request.method == 'POST':
+            if request.method == 'POST':
                 data = request.get_json()
                 bio, specializations, experience, city, fee = data.get('bio'), data.get('specializations'), data.get('experience'), data.get('city'), data.get('consultationFee')
                 cursor.execute("SELECT UserID FROM LawyerProfiles WHERE UserID = %s", (current_user_id,))
@@ -414,86 +1916,290 @@ def my_lawyer_profile_handler(current_user_id, current_user_role):
                     params = (current_user_id, bio, specializations, experience, city, fee)
                 cursor.execute(query, params)
                 connection.commit()
+                on_lawyer_changed(current_user_id)
+                invalidate_dashboard_stats(current_user_id)
+                invalidate_user_context(current_user_id)
                 return jsonify({"success": True, "message": "Profile updated successfully!"}), 200
     except Exception as e:
         if connection: connection.rollback()
-        return jsonify({"success": False, "message": str(e)}), 500
+        return error_response(e)
     finally:
         if connection: connection.close()
 
 # ==================== APPOINTMENT HISTORY ROUTES ====================
 
+def format_history_row(appt):
+    return {
+        "id": appt['appointmentId'], "date": appt['date'].strftime('%Y-%m-%d') if appt['date'] else '',
+        "fee": float(appt['fee']) if appt['fee'] else 0, "status": appt['status'], "type": appt['type'],
+        "duration": appt['duration'], "lawyerName": appt.get('lawyerName'), "clientName": appt.get('clientName'),
+        "specialization": appt.get('specialization', 'General Law')
+    }
+
 @app.route('/api/appointment-history', methods=['GET'])
+@read_replica
 @token_required
+@conditional_get(lambda current_user_id, **_: [('appointments', current_user_id), ('lawyers',), ('users',)])
 def get_appointment_history(current_user_id, current_user_role):
     connection = None
     try:
+        filters, filter_params = appointment_filters()
+        if current_user_role == 'Client':
+            query = f"""
+            SELECT a.AppointmentID as id, CONCAT('APT-', a.AppointmentID) as appointmentId, a.AppointmentDate as date,
+                   'Consultation' as type, lp.ConsultationFee as fee, a.Status as status, u.Name as lawyerName,
+                   lp.Specializations as specialization, '30 mins' as duration
+            FROM Appointments a JOIN Users u ON a.LawyerID = u.UserID JOIN LawyerProfiles lp ON a.LawyerID = lp.UserID
+            WHERE a.ClientID = %s{filters} ORDER BY a.AppointmentDate DESC
+            """
+        else:
+            query = f"""
+            SELECT a.AppointmentID as id, CONCAT('APT-', a.AppointmentID) as appointmentId, a.AppointmentDate as date,
+                   'Legal Service' as type, lp.ConsultationFee as fee, a.Status as status, u.Name as clientName,
+                   lp.Specializations as specialization, '45 mins' as duration
+            FROM Appointments a JOIN Users u ON a.ClientID = u.UserID JOIN LawyerProfiles lp ON a.LawyerID = lp.UserID
+            WHERE a.LawyerID = %s{filters} ORDER BY a.AppointmentDate DESC
+            """
+        params = (current_user_id, *filter_params)
+        mode = stream_requested()
+        if mode: return stream_rows(mode, query, params, format_history_row)
         connection = pool.connection()
         with connection.cursor() as cursor:
-            if current_user_role == 'Client':
-                query = """
-                SELECT a.AppointmentID as id, CONCAT('APT-', a.AppointmentID) as appointmentId, a.AppointmentDate as date,
-                       'Consultation' as type, lp.ConsultationFee as fee, a.Status as status, u.Name as lawyerName,
-                       lp.Specializations as specialization, '30 mins' as duration
-                FROM Appointments a JOIN Users u ON a.LawyerID = u.UserID JOIN LawyerProfiles lp ON a.LawyerID = lp.UserID
-                WHERE a.ClientID = %s ORDER BY a.AppointmentDate DESC
-                """
-            else:
-                query = """
-                SELECT a.AppointmentID as id, CONCAT('APT-', a.AppointmentID) as appointmentId, a.AppointmentDate as date,
-                       'Legal Service' as type, lp.ConsultationFee as fee, a.Status as status, u.Name as clientName,
-                       lp.Specializations as specialization, '45 mins' as duration
-                FROM Appointments a JOIN Users u ON a.ClientID = u.UserID JOIN LawyerProfiles lp ON a.LawyerID = lp.UserID
-                WHERE a.LawyerID = %s ORDER BY a.AppointmentDate DESC
-                """
-            cursor.execute(query, (current_user_id,))
-            appointments = cursor.fetchall()
-            formatted_appointments = []
-            for appt in appointments:
-                formatted_appointments.append({
-                    "id": appt['appointmentId'], "date": appt['date'].strftime('%Y-%m-%d') if appt['date'] else '',
-                    "fee": float(appt['fee']) if appt['fee'] else 0, "status": appt['status'], "type": appt['type'],
-                    "duration": appt['duration'], "lawyerName": appt.get('lawyerName'), "clientName": appt.get('clientName'),
-                    "specialization": appt.get('specialization', 'General Law')
-                })
+            cursor.execute(query, params)
+            formatted_appointments = [format_history_row(appt) for appt in cursor.fetchall()]
         return jsonify({"success": True, "appointments": formatted_appointments})
     except Exception as e:
-        return jsonify({"success": False, "message": str(e)}), 500
+        return error_response(e)
     finally:
         if connection: connection.close()
 
+# ==================== LAWYER DIRECTORY INDEX ====================
+# /api/lawyers sabse busy public endpoint hai, isliye directory memory se serve hoti hai.
+# Profile writes sirf us lawyer ki entry refresh karte hain; TTL ke baad full reload
+# hota hai taaki doosre workers ke writes bhi dikh jaayein. Har sort order ki ranked list
+# ek baar banti hai aur sirf entry badalne par dobara; rating se sort karna bhi free hai.
+
+LAWYER_INDEX_TTL = int(os.environ.get('LAWYER_INDEX_TTL', 300))
+LAWYERS_PAGE_SIZE = 20
+LAWYERS_MAX_PAGE_SIZE = 100
+LAWYER_DIRECTORY_QUERY = """
+SELECT u.UserID, u.Name, lp.Bio, lp.Specializations, lp.Experience, lp.City, lp.ConsultationFee,
+       COALESCE(lr.ReviewCount, 0) AS ReviewCount, COALESCE(lr.RatingSum, 0) AS RatingSum
+FROM Users u LEFT JOIN LawyerProfiles lp ON u.UserID = lp.UserID LEFT JOIN LawyerRatings lr ON u.UserID = lr.LawyerID
+WHERE u.Role = 'Lawyer'
+"""
+LAWYER_LIST_FIELDS = ('UserID', 'Name', 'Specializations', 'City', 'ConsultationFee', 'ReviewCount')
+LAWYER_SORT_KEYS = {
+    'name': lambda e: (e['row']['Name'] or '').lower(),
+    'fee': lambda e: e['fee'] if e['fee'] is not None else float('inf'),
+    'city': lambda e: e['city'],
+    # Bina reviews wale lawyers sabse neeche (desc mein); barabar average par zyada reviews aage
+    'rating': lambda e: (e['row']['RatingAverage'] or 0, e['row']['ReviewCount']),
+}
+
+def rating_average(count, total):
+    return round(total / count, 2) if count else None
+
+class LawyerDirectory:
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.lock = threading.RLock()  # sirf in-memory maps ke liye; DB query iske bahar hoti hai
+        self.entries = {}
+        self.by_city = {}
+        self.ranked_cache = {}
+        self.loaded_at = None  # None = abhi tak kabhi load nahi hua
+        self.loading = None  # chal rahe full reload ka Event (single-flight)
+        self.seq = 0
+        self.loaded_seq = 0  # aakhri full reload ka seq
+        self.applied = {}  # user_id -> us refresh ka seq jo entries mein laga hai
+
+    def make_entry(self, row):
+        specializations = row.get('Specializations') or ''
+        return {
+            'row': {**{field: row.get(field) for field in LAWYER_LIST_FIELDS},
+                    'RatingAverage': rating_average(row.get('ReviewCount'), row.get('RatingSum'))},
+            'city': (row.get('City') or '').strip().lower(),
+            'specializations': [s.strip().lower() for s in specializations.split(',') if s.strip()],
+            'fee': float(row['ConsultationFee']) if row.get('ConsultationFee') is not None else None,
+            'text': f"{row.get('Bio') or ''} {specializations}".lower(),
+        }
+
+    def put(self, row):
+        self.put_entry(row['UserID'], self.make_entry(row))
+
+    def put_entry(self, user_id, entry):
+        self.remove(user_id)
+        self.ranked_cache = {}
+        self.entries[user_id] = entry
+        self.by_city.setdefault(entry['city'], set()).add(user_id)
+
+    def remove(self, user_id):
+        old = self.entries.pop(user_id, None)
+        if old:
+            self.ranked_cache = {}
+            ids = self.by_city.get(old['city'])
+            if ids:
+                ids.discard(user_id)
+                if not ids: del self.by_city[old['city']]
+
+    def next_seq(self):
+        # self.lock pakad kar hi bulao
+        self.seq += 1
+        return self.seq
+
+    def ensure_loaded(self):
+        # Ek hi thread reload karta hai; baaki purana data serve karte hain,
+        # ya pehli load ho rahi ho to uske khatam hone ka intezaar
+        while True:
+            with self.lock:
+                if self.loaded_at is not None and time.time() - self.loaded_at < self.ttl:
+                    return
+                loading = self.loading
+                if loading is None:
+                    loading = self.loading = threading.Event()
+                    seq = self.next_seq()
+                    break
+                if self.loaded_at is not None:
+                    return
+            loading.wait()
+        try:
+            connection = pool.connection()
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute(LAWYER_DIRECTORY_QUERY)
+                    rows = cursor.fetchall()
+            finally:
+                connection.close()
+            entries = {row['UserID']: self.make_entry(row) for row in rows}
+            with self.lock:
+                # Load ke dauran jo lawyers refresh hue unki nayi entry rakho, purani row nahi
+                newer = {user_id: self.entries.get(user_id) for user_id, applied in self.applied.items() if applied > seq}
+                self.entries, self.by_city, self.ranked_cache = {}, {}, {}
+                for user_id, entry in entries.items():
+                    if user_id not in newer:
+                        self.put_entry(user_id, entry)
+                for user_id, entry in newer.items():
+                    if entry: self.put_entry(user_id, entry)
+                self.applied = {user_id: self.applied[user_id] for user_id in newer}
+                self.loaded_seq = seq
+                self.loaded_at = time.time()
+        finally:
+            with self.lock:
+                self.loading = None
+            loading.set()
+
+    def refresh(self, user_id):
+        # Write ke baad sirf ek lawyer ki row dobara padho; baad mein shuru hua refresh jeetta hai
+        with self.lock:
+            if self.loaded_at is None:
+                return
+            seq = self.next_seq()
+        connection = None
+        try:
+            connection = pool.connection()
+            with connection.cursor() as cursor:
+                cursor.execute(LAWYER_DIRECTORY_QUERY + " AND u.UserID = %s", (user_id,))
+                row = cursor.fetchone()
+        except Exception as e:
+            # Refresh fail hua to agli request par full reload ho jaayega (tab tak purana data)
+            print(f"⚠️ Lawyer directory refresh failed: {e}")
+            with self.lock:
+                self.loaded_at = 0
+            return
+        finally:
+            if connection: connection.close()
+        with self.lock:
+            if max(self.loaded_seq, self.applied.get(user_id, 0)) > seq:
+                return
+            self.applied[user_id] = seq
+            if row: self.put(row)
+            else: self.remove(user_id)
+
+    def ranked(self, sort, order):
+        key = (sort if sort in LAWYER_SORT_KEYS else 'name', order == 'desc')
+        with self.lock:
+            ranked = self.ranked_cache.get(key)
+            if ranked is None:
+                ranked = self.ranked_cache[key] = sorted(self.entries.values(), key=LAWYER_SORT_KEYS[key[0]], reverse=key[1])
+            return ranked
+
+    def all(self, sort=None, order='asc'):
+        self.ensure_loaded()
+        if sort:
+            return [e['row'] for e in self.ranked(sort, order)]
+        with self.lock:
+            return [e['row'] for e in self.entries.values()]
+
+    def search(self, city=None, specialization=None, min_fee=None, max_fee=None, text=None,
+               sort='name', order='asc', page=1, limit=LAWYERS_PAGE_SIZE):
+        self.ensure_loaded()
+        # Ranked list pehle se sorted hai; filter order nahi badalta, isliye yahan sort nahi hota
+        candidates = self.ranked(sort, order)
+        with self.lock:
+            city_ids = self.by_city.get(city.strip().lower(), set()) if city else None
+        specialization = specialization.strip().lower() if specialization else None
+        text = text.strip().lower() if text else None
+        results = []
+        for e in candidates:
+            if city_ids is not None and e['row']['UserID'] not in city_ids: continue
+            if specialization and not any(specialization in s for s in e['specializations']): continue
+            if min_fee is not None and (e['fee'] is None or e['fee'] < min_fee): continue
+            if max_fee is not None and (e['fee'] is None or e['fee'] > max_fee): continue
+            if text and text not in e['text']: continue
+            results.append(e)
+        start = (page - 1) * limit
+        return [e['row'] for e in results[start:start + limit]], len(results)
+
+lawyer_directory = LawyerDirectory(LAWYER_INDEX_TTL)
+
+def on_lawyer_changed(user_id):
+    # Lawyer ka naam/profile badla: directory entry aur cached responses dono refresh
+    lawyer_directory.refresh(user_id)
+    profile_documents.rebuild(user_id)
+    resource_versions.bump(('lawyers',), ('lawyer', int(user_id)))
+
 # ==================== LAWYER & PROFILE ROUTES ====================
 
 @app.route('/api/lawyers', methods=['GET'])
+@read_replica
+@conditional_get(lambda **_: [('lawyers',)], public=True)
 def get_lawyers():
-    connection = None
+    # ?sort=rating|fee|name|city&order=asc|desc (rating ka default desc); sort na ho to purana order
+    sort = request.args.get('sort')
     try:
-        connection = pool.connection()
-        with connection.cursor() as cursor:
-            query = "SELECT u.UserID, u.Name, lp.Specializations, lp.City, lp.ConsultationFee FROM Users u LEFT JOIN LawyerProfiles lp ON u.UserID = lp.UserID WHERE u.Role = 'Lawyer'"
-            cursor.execute(query)
-            lawyers = cursor.fetchall()
-        return jsonify(lawyers)
+        return jsonify(lawyer_directory.all(sort, request.args.get('order', 'desc' if sort == 'rating' else 'asc')))
     except Exception as e:
-        return jsonify({"success": False, "message": str(e)}), 500
-    finally:
-        if connection: connection.close()
+        return error_response(e)
+
+@app.route('/api/lawyers/search', methods=['GET'])
+@read_replica
+@conditional_get(lambda **_: [('lawyers',)], public=True)
+def search_lawyers():
+    args = request.args
+    page = max(1, args.get('page', 1, type=int))
+    limit = get_page_limit(LAWYERS_PAGE_SIZE, LAWYERS_MAX_PAGE_SIZE)
+    try:
+        lawyers, total = lawyer_directory.search(
+            city=args.get('city'), specialization=args.get('specialization'),
+            min_fee=args.get('minFee', type=float), max_fee=args.get('maxFee', type=float),
+            text=args.get('q'), sort=args.get('sort', 'name'),
+            order=args.get('order', 'desc' if args.get('sort') == 'rating' else 'asc'),
+            page=page, limit=limit
+        )
+        return jsonify({"success": True, "lawyers": lawyers, "total": total, "page": page, "limit": limit})
+    except Exception as e:
+        return error_response(e)
 
 @app.route('/api/lawyers/<int:lawyer_id>', methods=['GET'])
+@read_replica
+@conditional_get(lambda lawyer_id: [('lawyer', lawyer_id)], public=True)
 def get_lawyer_profile(lawyer_id):
-    connection = None
     try:
-        connection = pool.connection()
-        with connection.cursor() as cursor:
-            query = "SELECT u.UserID, u.Name, u.Email, lp.Bio, lp.Specializations, lp.Experience, lp.ConsultationFee, lp.City FROM Users u LEFT JOIN LawyerProfiles lp ON u.UserID = lp.UserID WHERE u.UserID = %s AND u.Role = 'Lawyer'"
-            cursor.execute(query, (lawyer_id,))
-            lawyer = cursor.fetchone()
-        if lawyer: return jsonify(lawyer)
+        document = profile_documents.get(lawyer_id)
+        if document and document[0]: return app.response_class(document[0], mimetype='application/json')
         else: return jsonify({"success": False, "message": "Lawyer not found"}), 404
     except Exception as e:
-        return jsonify({"success": False, "message": str(e)}), 500
-    finally:
-        if connection: connection.close()
+        return error_response(e)
 
 @app.route('/api/lawyer-profile', methods=['POST', 'PUT'])
 @token_required
@@ -510,10 +2216,425 @@ def create_or_update_lawyer_profile(current_user_id, current_user_role):
             params = (current_user_id, bio, specializations, experience, city, fee, bio, specializations, experience, city, fee)
             cursor.execute(query, params)
         connection.commit()
+        on_lawyer_changed(current_user_id)
+        invalidate_dashboard_stats(current_user_id)
+        invalidate_user_context(current_user_id)
         return jsonify({"success": True, "message": "Profile updated successfully!"}), 201
     except Exception as e:
         if connection: connection.rollback()
-        return jsonify({"success": False, "message": str(e)}), 500
+        return error_response(e)
+    finally:
+        if connection: connection.close()
+
+# ==================== REVIEWS ====================
+# LawyerRatings har lawyer ka count, sum aur 1-5 star histogram rakhta hai. Review likhte waqt
+# usi transaction mein delta se update hota hai, isliye kisi request par AVG(Reviews) nahi chalta.
+# Ek client ek lawyer ka ek hi review rakhta hai; dobara bhejne par wahi review update hota hai.
+REVIEWS_PAGE_SIZE = 20
+REVIEWS_MAX_PAGE_SIZE = 100
+REVIEW_MAX_LENGTH = 2000
+RATING_COLUMNS = ', '.join(['COALESCE(lr.ReviewCount, 0) AS ReviewCount', 'COALESCE(lr.RatingSum, 0) AS RatingSum'] +
+                           [f"COALESCE(lr.Stars{n}, 0) AS Stars{n}" for n in range(1, 6)])
+
+def with_rating_summary(row):
+    # RatingSum/StarsN columns -> RatingAverage aur RatingHistogram
+    count, total = row.pop('ReviewCount'), row.pop('RatingSum')
+    row['RatingAverage'] = rating_average(count, total)
+    row['ReviewCount'] = count
+    row['RatingHistogram'] = {str(n): row.pop(f'Stars{n}') for n in range(1, 6)}
+    return row
+
+@app.route('/api/lawyers/<int:lawyer_id>/reviews', methods=['GET'])
+@read_replica
+@conditional_get(lambda lawyer_id: [('reviews', lawyer_id)], public=True)
+def get_lawyer_reviews(lawyer_id):
+    # Newest first; ?before=<ReviewID> se agla page
+    before_id = request.args.get('before', type=int)
+    limit = get_page_limit(REVIEWS_PAGE_SIZE, REVIEWS_MAX_PAGE_SIZE)
+    connection = None
+    try:
+        connection = pool.connection()
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT {RATING_COLUMNS} FROM Users u LEFT JOIN LawyerRatings lr ON u.UserID = lr.LawyerID WHERE u.UserID = %s AND u.Role = 'Lawyer'",
+                           (lawyer_id,))
+            summary = cursor.fetchone()
+            if not summary: return jsonify({"success": False, "message": "Lawyer not found"}), 404
+            if before_id is not None:
+                cursor.execute("""
+                SELECT r.ReviewID, r.Rating, r.Comment, r.CreatedAt, u.Name AS ClientName
+                FROM Reviews r JOIN Users u ON r.ClientID = u.UserID
+                WHERE r.LawyerID = %s AND r.ReviewID < %s ORDER BY r.ReviewID DESC LIMIT %s
+                """, (lawyer_id, before_id, limit + 1))
+            else:
+                cursor.execute("""
+                SELECT r.ReviewID, r.Rating, r.Comment, r.CreatedAt, u.Name AS ClientName
+                FROM Reviews r JOIN Users u ON r.ClientID = u.UserID
+                WHERE r.LawyerID = %s ORDER BY r.ReviewID DESC LIMIT %s
+                """, (lawyer_id, limit + 1))
+            reviews = list(cursor.fetchall())
+        has_more = len(reviews) > limit
+        reviews = reviews[:limit]
+        return jsonify({
+            "success": True, "rating": with_rating_summary(summary), "reviews": reviews, "has_more": has_more,
+            "last_id": reviews[-1]['ReviewID'] if reviews else before_id
+        })
+    except Exception as e:
+        return error_response(e)
+    finally:
+        if connection: connection.close()
+
+@app.route('/api/lawyers/<int:lawyer_id>/reviews', methods=['POST'])
+@token_required
+def submit_review(lawyer_id, current_user_id, current_user_role):
+    if current_user_role != 'Client': return jsonify({"success": False, "message": "Only clients can review lawyers."}), 403
+    data = request.get_json() or {}
+    try:
+        rating = int(data.get('rating'))
+    except (TypeError, ValueError):
+        rating = None
+    if rating not in range(1, 6): return jsonify({"success": False, "message": "rating must be an integer from 1 to 5."}), 400
+    comment = (data.get('comment') or '').strip()
+    if len(comment) > REVIEW_MAX_LENGTH:
+        return jsonify({"success": False, "message": f"comment must be at most {REVIEW_MAX_LENGTH} characters."}), 400
+    connection = None
+    try:
+        connection = pool.connection()
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT UserID FROM Users WHERE UserID = %s AND Role = 'Lawyer'", (lawyer_id,))
+            if not cursor.fetchone(): return jsonify({"success": False, "message": "Lawyer not found"}), 404
+            # Aggregate row lock: is lawyer ke review writes ek ek karke hote hain, delta kabhi nahi khota
+            cursor.execute("INSERT IGNORE INTO LawyerRatings (LawyerID) VALUES (%s)", (lawyer_id,))
+            cursor.execute("SELECT LawyerID FROM LawyerRatings WHERE LawyerID = %s FOR UPDATE", (lawyer_id,))
+            cursor.execute("SELECT ReviewID, Rating FROM Reviews WHERE LawyerID = %s AND ClientID = %s ORDER BY ReviewID LIMIT 1",
+                           (lawyer_id, current_user_id))
+            existing = cursor.fetchone()
+            old_rating = existing['Rating'] if existing and existing['Rating'] in range(1, 6) else None
+            if existing:
+                review_id = existing['ReviewID']
+                cursor.execute("UPDATE Reviews SET Rating = %s, Comment = %s, CreatedAt = NOW() WHERE ReviewID = %s",
+                               (rating, comment, review_id))
+            else:
+                cursor.execute("INSERT INTO Reviews (ClientID, LawyerID, Rating, Comment) VALUES (%s, %s, %s, %s)",
+                               (current_user_id, lawyer_id, rating, comment))
+                review_id = cursor.lastrowid
+            if old_rating is None:
+                cursor.execute(f"UPDATE LawyerRatings SET ReviewCount = ReviewCount + 1, RatingSum = RatingSum + %s, Stars{rating} = Stars{rating} + 1 WHERE LawyerID = %s",
+                               (rating, lawyer_id))
+            elif old_rating != rating:
+                cursor.execute(f"UPDATE LawyerRatings SET RatingSum = RatingSum + %s, Stars{rating} = Stars{rating} + 1, Stars{old_rating} = Stars{old_rating} - 1 WHERE LawyerID = %s",
+                               (rating - old_rating, lawyer_id))
+        connection.commit()
+        on_lawyer_changed(lawyer_id)
+        resource_versions.bump(('reviews', lawyer_id))
+        return jsonify({"success": True, "reviewId": review_id}), 200 if existing else 201
+    except Exception as e:
+        if connection: connection.rollback()
+        return error_response(e)
+    finally:
+        if connection: connection.close()
+
+# ==================== LAWYER PROFILE DOCUMENTS ====================
+# Public profile sabse zyada share hone wale links hain. Har lawyer ka profile ek query se padh
+# kar pehle hi JSON bytes mein encode hota hai aur /api/lawyers/<id> sirf cache lookup hai;
+# on_lawyer_changed (profile, naam, review writes) document turant dobara banata hai. Documents
+# hamesha primary se bante hain, taaki replica lag poori TTL tak cache na ho; TTL sirf doosre
+# workers ke writes ke liye hai. Lawyer ka apna /api/my-lawyer-profile har baar primary se
+# padha jaata hai (doosre worker par save kiya profile turant dikhe).
+# PROFILE_SNAPSHOT_PATH set ho to sirf cached lawyer IDs (hot set) file mein jaate hain; naya
+# instance startup par unhe primary se batch mein bana leta hai. File mein koi document/email
+# nahi hota, isliye kisi worker ka purana snapshot stale data warm nahi kar sakta.
+# Jo ID user hi nahi hai uska miss bhi PROFILE_MISS_TTL tak cache hota hai, taaki public
+# /api/lawyers/<id> par random IDs primary tak na pahunchein; naya lawyer on_lawyer_changed se turant dikhta hai.
+PROFILE_DOC_TTL = int(os.environ.get('PROFILE_DOC_TTL', 600))
+PROFILE_MISS_TTL = int(os.environ.get('PROFILE_MISS_TTL', 30))
+MISSING_PROFILE = (None, None)
+PROFILE_DOC_CACHE_SIZE = int(os.environ.get('PROFILE_DOC_CACHE_SIZE', 20000))
+PROFILE_SNAPSHOT_PATH = os.environ.get('PROFILE_SNAPSHOT_PATH')
+PROFILE_SNAPSHOT_INTERVAL = int(os.environ.get('PROFILE_SNAPSHOT_INTERVAL', 300))
+PROFILE_WARM_BATCH = 500
+
+LAWYER_PROFILE_QUERY = f"""
+SELECT u.UserID, u.Name, u.Email, u.Role, lp.Bio, lp.Specializations, lp.Experience,
+       lp.ConsultationFee, lp.City, {RATING_COLUMNS}
+FROM Users u
+LEFT JOIN LawyerProfiles lp ON u.UserID = lp.UserID
+LEFT JOIN LawyerRatings lr ON u.UserID = lr.LawyerID
+"""
+
+def profile_documents_for(row):
+    # Row -> (public bytes ya None, own bytes)
+    role = row.pop('Role')
+    own = {key: row[key] for key in ('UserID', 'Name', 'Email')}
+    own['UserType'] = role
+    own.update((key, row[key]) for key in ('Bio', 'Specializations', 'Experience', 'ConsultationFee', 'City'))
+    own['CreatedAt'] = datetime.datetime.now()
+    public = dumps_bytes(with_rating_summary(row)) if role == 'Lawyer' else None
+    return public, dumps_bytes({"success": True, "profile": own})
+
+class ProfileDocuments:
+    def __init__(self, maxsize, ttl, snapshot_path=None):
+        self.cache = TTLCache(maxsize=maxsize, ttl=ttl)  # user_id -> (public bytes ya None, own bytes)
+        self.snapshot_path = snapshot_path
+        self.snapshot_lock = threading.Lock()
+
+    def build_many(self, user_ids):
+        # Hamesha primary: replica se bana document TTL bhar purana reh sakta hai
+        user_ids = [int(user_id) for user_id in user_ids]
+        if not user_ids:
+            return {}
+        token = self.cache.fill_token()
+        connection = pool.primary.connection()
+        try:
+            with connection.cursor() as cursor:
+                placeholders = ', '.join(['%s'] * len(user_ids))
+                cursor.execute(f"{LAWYER_PROFILE_QUERY} WHERE u.UserID IN ({placeholders})", user_ids)
+                rows = cursor.fetchall()
+        finally:
+            connection.close()
+        documents = {}
+        for row in rows:
+            user_id = int(row['UserID'])
+            documents[user_id] = profile_documents_for(row)
+            self.cache.set_if_fresh(user_id, documents[user_id], token)
+        for user_id in user_ids:
+            if user_id not in documents:
+                self.cache.set_if_fresh(user_id, MISSING_PROFILE, token, ttl=PROFILE_MISS_TTL)
+        return documents
+
+    def build(self, user_id):
+        return self.build_many([user_id]).get(int(user_id))
+
+    def get(self, user_id):
+        # Cached miss MISSING_PROFILE hai (public None); registration on_lawyer_changed se use hata deta hai
+        document = self.cache.get(int(user_id))
+        return document if document is not None else self.build(user_id)
+
+    def rebuild(self, user_id):
+        # Pehle invalidate: is write se pehle shuru hua koi build apna purana document na likh de
+        self.cache.pop(int(user_id))
+        try:
+            self.build(user_id)
+        except Exception as e:
+            # Purana document serve na ho; agla view DB se banayega
+            print(f"⚠️ Profile document rebuild failed for {user_id}: {e}")
+
+    def save_snapshot(self):
+        if not self.snapshot_path:
+            return
+        user_ids = [user_id for user_id, document, _ in self.cache.items() if document[0] is not None]
+        with self.snapshot_lock:
+            temp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(user_ids, f)
+            os.replace(temp_path, self.snapshot_path)
+
+    def load_snapshot(self):
+        # Snapshot ke IDs ke documents primary se dobara banao
+        if not self.snapshot_path or not os.path.exists(self.snapshot_path):
+            return 0
+        try:
+            with open(self.snapshot_path, encoding='utf-8') as f:
+                user_ids = [int(user_id) for user_id in json.load(f)]
+        except (OSError, ValueError, TypeError) as e:
+            print(f"⚠️ Profile snapshot load failed: {e}")
+            return 0
+        loaded = 0
+        for i in range(0, len(user_ids), PROFILE_WARM_BATCH):
+            loaded += len(self.build_many(user_ids[i:i + PROFILE_WARM_BATCH]))
+        return loaded
+
+    def run_snapshots(self, interval):
+        while True:
+            time.sleep(interval)
+            try:
+                self.save_snapshot()
+            except Exception as e:
+                print(f"⚠️ Profile snapshot save failed: {e}")
+
+profile_documents = ProfileDocuments(PROFILE_DOC_CACHE_SIZE, PROFILE_DOC_TTL, PROFILE_SNAPSHOT_PATH)
+if PROFILE_SNAPSHOT_PATH and pool is not None:
+    try:
+        print(f"✅ Warmed {profile_documents.load_snapshot()} lawyer profile documents from snapshot.")
+    except Exception as e:
+        print(f"⚠️ Profile snapshot warm-up failed: {e}")
+    threading.Thread(target=profile_documents.run_snapshots, args=(PROFILE_SNAPSHOT_INTERVAL,), name='profile-snapshots', daemon=True).start()
+    atexit.register(profile_documents.save_snapshot)
+
+# ==================== AVAILABILITY ====================
+# Har lawyer ke working hours (LawyerWorkingHours, DayOfWeek 0 = Monday) aur active
+# appointments ke start times ki sorted list memory mein rehti hai. Free slots bisect se
+# nikalte hain, poora appointment scan nahi hota. Booking ka overlap check DB transaction
+# mein hota hai, isliye index thoda stale ho tab bhi double booking nahi hoti.
+APPOINTMENT_SLOT_MINUTES = int(os.environ.get('APPOINTMENT_SLOT_MINUTES', 30))
+APPOINTMENT_SLOT = datetime.timedelta(minutes=APPOINTMENT_SLOT_MINUTES)
+# Appointment times DB mein APP_TIMEZONE ki wall-clock time (naive DATETIME) hain, aur working hours
+# bhi usi timezone mein. Offset wale inputs (JS toISOString() ka "...Z") pehle APP_TIMEZONE mein
+# convert hote hain; bina offset wala input APP_TIMEZONE ka local time maana jaata hai.
+# Unset ho to server ka local timezone.
+APP_TIMEZONE_NAME = os.environ.get('APP_TIMEZONE')
+APP_TIMEZONE = tz.gettz(APP_TIMEZONE_NAME) if APP_TIMEZONE_NAME else tz.tzlocal()
+if APP_TIMEZONE is None:
+    raise RuntimeError(f"Unknown APP_TIMEZONE: {APP_TIMEZONE_NAME}")
+
+def app_now():
+    return datetime.datetime.now(APP_TIMEZONE).replace(tzinfo=None)
+
+def to_app_time(parsed):
+    # Aware datetime -> APP_TIMEZONE ka naive datetime; naive waisa hi (pehle se app time hai)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(APP_TIMEZONE).replace(tzinfo=None)
+    return parsed
+
+def parse_appointment_time(value):
+    # ISO string -> APP_TIMEZONE mein naive datetime, seconds tak
+    return to_app_time(parser.isoparse(value)).replace(microsecond=0)
+
+AVAILABILITY_MAX_DAYS = 31
+BOOKED_SLOTS_TTL = int(os.environ.get('BOOKED_SLOTS_TTL', 60))
+# Lawyer ne working hours set nahi kiye to Mon-Sat 10:00-18:00
+DEFAULT_WORKING_HOURS = [(day, datetime.time(10), datetime.time(18)) for day in range(6)]
+
+working_hours_cache = TTLCache(maxsize=10000, ttl=300)
+booked_slots_cache = TTLCache(maxsize=10000, ttl=BOOKED_SLOTS_TTL)
+
+def to_time(value):
+    # pymysql TIME columns ko timedelta deta hai
+    if isinstance(value, datetime.timedelta):
+        return (datetime.datetime.min + value).time()
+    return value
+
+def get_working_hours(lawyer_id):
+    hours = working_hours_cache.get(lawyer_id)
+    if hours is None:
+        fill_from_primary(('slots', int(lawyer_id)))
+        token = working_hours_cache.fill_token()
+        connection = pool.connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT DayOfWeek, StartTime, EndTime FROM LawyerWorkingHours WHERE LawyerID = %s ORDER BY DayOfWeek, StartTime", (lawyer_id,))
+                rows = cursor.fetchall()
+        finally:
+            connection.close()
+        hours = [(r['DayOfWeek'], to_time(r['StartTime']), to_time(r['EndTime'])) for r in rows] or DEFAULT_WORKING_HOURS
+        working_hours_cache.set_if_fresh(lawyer_id, hours, token)
+    return hours
+
+def get_booked_starts(lawyer_id):
+    starts = booked_slots_cache.get(lawyer_id)
+    if starts is None:
+        fill_from_primary(('slots', int(lawyer_id)))
+        token = booked_slots_cache.fill_token()
+        connection = pool.connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("""
+                SELECT AppointmentDate FROM Appointments
+                WHERE LawyerID = %s AND Status IN ('Pending', 'Confirmed') AND AppointmentDate >= %s
+                ORDER BY AppointmentDate
+                """, (lawyer_id, app_now() - APPOINTMENT_SLOT))
+                starts = [r['AppointmentDate'] for r in cursor.fetchall()]
+        finally:
+            connection.close()
+        booked_slots_cache.set_if_fresh(lawyer_id, starts, token)
+    return starts
+
+def invalidate_booked_slots(lawyer_id):
+    booked_slots_cache.pop(int(lawyer_id))
+    resource_versions.bump(('slots', int(lawyer_id)))
+
+def remember_booking(lawyer_id, start):
+    # Copy-on-write, taaki padhne wale threads ko aadhi-badli list na mile
+    resource_versions.bump(('slots', int(lawyer_id)))
+
+    def add(starts):
+        starts = list(starts)
+        bisect.insort(starts, start)
+        return starts
+    booked_slots_cache.update(int(lawyer_id), add)
+
+def booking_error(lawyer_id, start):
+    # Slot [start, start + SLOT) future mein aur lawyer ke kisi working-hours block ke andar ho
+    if start < app_now():
+        return "Appointment time must be in the future."
+    end = start + APPOINTMENT_SLOT
+    for weekday, open_time, close_time in get_working_hours(lawyer_id):
+        if weekday == start.weekday() and end.date() == start.date() and open_time <= start.time() and end.time() <= close_time:
+            return None
+    return "Appointment time is outside the lawyer's working hours."
+
+def slot_taken(starts, start):
+    # Booked slot [s, s + SLOT) aur [start, start + SLOT) overlap karte hain agar |s - start| < SLOT
+    i = bisect.bisect_right(starts, start - APPOINTMENT_SLOT)
+    return i < len(starts) and starts[i] < start + APPOINTMENT_SLOT
+
+def free_slots(lawyer_id, first_day, last_day):
+    hours = get_working_hours(lawyer_id)
+    starts = get_booked_starts(lawyer_id)
+    now = app_now()
+    slots = []
+    day = first_day
+    while day <= last_day:
+        for weekday, open_time, close_time in hours:
+            if weekday != day.weekday(): continue
+            slot_start = datetime.datetime.combine(day, open_time)
+            close_at = datetime.datetime.combine(day, close_time)
+            while slot_start + APPOINTMENT_SLOT <= close_at:
+                if slot_start >= now and not slot_taken(starts, slot_start):
+                    slots.append({"start": slot_start, "end": slot_start + APPOINTMENT_SLOT})
+                slot_start += APPOINTMENT_SLOT
+        day += datetime.timedelta(days=1)
+    return slots
+
+@app.route('/api/lawyers/<int:lawyer_id>/availability', methods=['GET'])
+@read_replica
+def get_lawyer_availability(lawyer_id):
+    try:
+        # Profile document cached hai, isliye ye check aam taur par DB tak nahi jaata
+        document = profile_documents.get(lawyer_id)
+        if not document or not document[0]:
+            return jsonify({"success": False, "message": "Lawyer not found"}), 404
+        today = app_now().date()
+        try:
+            first_day = parser.isoparse(request.args['from']).date() if request.args.get('from') else today
+            last_day = parser.isoparse(request.args['to']).date() if request.args.get('to') else first_day + datetime.timedelta(days=6)
+        except ValueError:
+            return jsonify({"success": False, "message": "from/to must be ISO dates."}), 400
+        if last_day < first_day or (last_day - first_day).days >= AVAILABILITY_MAX_DAYS:
+            return jsonify({"success": False, "message": f"Date range must be 1-{AVAILABILITY_MAX_DAYS} days."}), 400
+        return jsonify({"success": True, "slotMinutes": APPOINTMENT_SLOT_MINUTES, "slots": free_slots(lawyer_id, first_day, last_day)})
+    except Exception as e:
+        return error_response(e)
+
+@app.route('/api/lawyer/working-hours', methods=['GET', 'PUT'])
+@token_required
+def working_hours_handler(current_user_id, current_user_role):
+    if current_user_role != 'Lawyer': return jsonify({"success": False, "message": "Access forbidden."}), 403
+    connection = None
+    try:
+        if request.method == 'GET':
+            hours = get_working_hours(current_user_id)
+            return jsonify({"success": True, "hours": [{"day": d, "start": s.strftime('%H:%M'), "end": e.strftime('%H:%M')} for d, s, e in hours]})
+
+        data = request.get_json() or {}
+        try:
+            hours = [(int(h['day']), datetime.time.fromisoformat(h['start']), datetime.time.fromisoformat(h['end'])) for h in data.get('hours') or []]
+        except (KeyError, TypeError, ValueError):
+            return jsonify({"success": False, "message": "hours must be a list of {day, start, end}."}), 400
+        if any(not 0 <= d <= 6 or s >= e for d, s, e in hours):
+            return jsonify({"success": False, "message": "day must be 0-6 (Monday = 0) and start before end."}), 400
+        connection = pool.connection()
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM LawyerWorkingHours WHERE LawyerID = %s", (current_user_id,))
+            if hours:
+                cursor.executemany("INSERT INTO LawyerWorkingHours (LawyerID, DayOfWeek, StartTime, EndTime) VALUES (%s, %s, %s, %s)",
+                                   [(current_user_id, d, s, e) for d, s, e in hours])
+        connection.commit()
+        working_hours_cache.pop(current_user_id)
+        resource_versions.bump(('slots', current_user_id))
+        return jsonify({"success": True, "message": "Working hours updated."})
+    except Exception as e:
+        if connection: connection.rollback()
+        return error_response(e)
     finally:
         if connection: connection.close()
 
@@ -528,16 +2649,37 @@ def book_appointment(current_user_id, current_user_role):
         data = request.get_json()
         lawyer_id, appointment_date_iso, notes = data.get('lawyerId'), data.get('appointmentDate'), data.get('notes', '')
         if not lawyer_id or not appointment_date_iso: return jsonify({"success": False, "message": "Lawyer ID and appointment date are required."}), 400
-        mysql_datetime_str = parser.isoparse(appointment_date_iso).strftime('%Y-%m-%d %H:%M:%S')
+        start = parse_appointment_time(appointment_date_iso)
+        error = booking_error(int(lawyer_id), start)
+        if error: return jsonify({"success": False, "message": error}), 400
+        mysql_datetime_str = start.strftime('%Y-%m-%d %H:%M:%S')
         connection = pool.connection()
         with connection.cursor() as cursor:
+            # Lawyer ki row lock karke overlap check: same lawyer ki bookings ek ek karke hoti hain
+            cursor.execute("SELECT UserID FROM Users WHERE UserID = %s AND Role = 'Lawyer' FOR UPDATE", (lawyer_id,))
+            if not cursor.fetchone():
+                connection.rollback()
+                return jsonify({"success": False, "message": "Lawyer not found."}), 404
+            cursor.execute("""
+            SELECT AppointmentID FROM Appointments
+            WHERE LawyerID = %s AND Status IN ('Pending', 'Confirmed') AND AppointmentDate > %s AND AppointmentDate < %s
+            LIMIT 1
+            """, (lawyer_id, start - APPOINTMENT_SLOT, start + APPOINTMENT_SLOT))
+            if cursor.fetchone():
+                connection.rollback()
+                return jsonify({"success": False, "message": "This slot is already booked."}), 409
             query = "INSERT INTO Appointments (ClientID, LawyerID, AppointmentDate, Notes, Status) VALUES (%s, %s, %s, %s, %s)"
             cursor.execute(query, (current_user_id, lawyer_id, mysql_datetime_str, notes, 'Pending'))
+            appointment_id = cursor.lastrowid
+            events = record_appointment_changes(cursor, [(appointment_id, int(lawyer_id), current_user_id, start, None, 'Pending')])
         connection.commit()
-        return jsonify({"success": True, "message": "Appointment booked successfully."}), 201
+        remember_booking(int(lawyer_id), start)
+        on_appointments_changed(current_user_id, lawyer_id)
+        emit_user_events(events)
+        return jsonify({"success": True, "message": "Appointment booked successfully.", "appointmentId": appointment_id}), 201
     except Exception as e:
         if connection: connection.rollback()
-        return jsonify({"success": False, "message": str(e)}), 500
+        return error_response(e)
     finally:
         if connection: connection.close()
 
@@ -552,85 +2694,443 @@ def update_appointment_status(appointment_id, current_user_id, current_user_role
         if not new_status or new_status not in ['Confirmed', 'Cancelled', 'Completed']: return jsonify({"success": False, "message": "Invalid status provided."}), 400
         connection = pool.connection()
         with connection.cursor() as cursor:
-            cursor.execute("SELECT AppointmentID FROM Appointments WHERE AppointmentID = %s AND LawyerID = %s", (appointment_id, current_user_id))
-            if not cursor.fetchone(): return jsonify({"success": False, "message": "Appointment not found or you don't have permission."}), 404
+            # Row lock: previousStatus (aur uska stats delta) concurrent update ke saath double count na ho
+            cursor.execute("SELECT AppointmentID, ClientID, AppointmentDate, Status FROM Appointments WHERE AppointmentID = %s AND LawyerID = %s FOR UPDATE", (appointment_id, current_user_id))
+            appointment = cursor.fetchone()
+            if not appointment:
+                connection.rollback()
+                return jsonify({"success": False, "message": "Appointment not found or you don't have permission."}), 404
             cursor.execute("UPDATE Appointments SET Status = %s WHERE AppointmentID = %s", (new_status, appointment_id))
+            events = record_appointment_changes(cursor, [(appointment_id, current_user_id, appointment['ClientID'], appointment['AppointmentDate'], appointment['Status'], new_status)])
         connection.commit()
+        invalidate_booked_slots(current_user_id)
+        on_appointments_changed(current_user_id, appointment['ClientID'])
+        emit_user_events(events)
         return jsonify({"success": True, "message": "Appointment status updated."}), 200
     except Exception as e:
         if connection: connection.rollback()
-        return jsonify({"success": False, "message": str(e)}), 500
+        return error_response(e)
+    finally:
+        if connection: connection.close()
+
+# --- Batch appointments ---
+# Lawyer ki poori queue ya back-office sync ek request mein: ownership/lock ek IN (...) query se,
+# saare writes ek transaction mein, aur har item ka alag result. "atomic": true ho to ek bhi
+# item fail hone par kuch apply nahi hota (409).
+BATCH_MAX_ITEMS = int(os.environ.get('BATCH_MAX_ITEMS', 200))
+APPOINTMENT_UPDATE_STATUSES = ('Confirmed', 'Cancelled', 'Completed')
+
+def batch_items(data, key):
+    items = data.get(key)
+    if not isinstance(items, list) or not items:
+        raise InvalidParams(f"{key} must be a non-empty list.")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise InvalidParams(f"At most {BATCH_MAX_ITEMS} {key} per request.")
+    return items
+
+def batch_response(results, atomic):
+    failed = sum(1 for r in results if not r['success'])
+    body = {"success": failed == 0, "applied": 0 if atomic and failed else len(results) - failed, "failed": failed, "results": results}
+    return jsonify(body), 409 if atomic and failed else 200
+
+@app.route('/api/appointments/batch', methods=['PUT'])
+@token_required
+def update_appointment_statuses(current_user_id, current_user_role):
+    # Body: {"updates": [{"appointmentId": 1, "status": "Confirmed"}, ...], "atomic": false}
+    if current_user_role != 'Lawyer': return jsonify({"success": False, "message": "Only lawyers can update appointment status."}), 403
+    connection = None
+    try:
+        data = request.get_json() or {}
+        atomic = bool(data.get('atomic'))
+        results, wanted = [], {}
+        for item in batch_items(data, 'updates'):
+            try:
+                appointment_id, status = int(item.get('appointmentId')), item.get('status')
+            except (AttributeError, TypeError, ValueError):
+                results.append({"appointmentId": None, "success": False, "message": "appointmentId is required."})
+                continue
+            result = {"appointmentId": appointment_id, "status": status, "success": False}
+            if status not in APPOINTMENT_UPDATE_STATUSES: result['message'] = "Invalid status provided."
+            elif appointment_id in wanted: result['message'] = "Duplicate appointmentId in batch."
+            else: wanted[appointment_id] = status
+            results.append(result)
+
+        owned = {}
+        if wanted:
+            connection = pool.connection()
+            with connection.cursor() as cursor:
+                # Rows lock karo (sorted order, deadlock na ho): previous Status aur uska stats delta
+                # concurrent single/batch update ke saath double count na ho
+                placeholders = ', '.join(['%s'] * len(wanted))
+                cursor.execute(f"SELECT AppointmentID, ClientID, AppointmentDate, Status FROM Appointments WHERE LawyerID = %s AND AppointmentID IN ({placeholders}) ORDER BY AppointmentID FOR UPDATE",
+                               (current_user_id, *sorted(wanted)))
+                owned = {row['AppointmentID']: row for row in cursor.fetchall()}
+                for result in results:
+                    if 'message' not in result and result['appointmentId'] not in owned:
+                        result['message'] = "Appointment not found or you don't have permission."
+                apply = [(appointment_id, wanted[appointment_id]) for appointment_id in wanted if appointment_id in owned]
+                if apply and not (atomic and len(apply) < len(results)):
+                    # Ek hi UPDATE: har row ka status CASE se
+                    cases = ' '.join(['WHEN %s THEN %s'] * len(apply))
+                    placeholders = ', '.join(['%s'] * len(apply))
+                    cursor.execute(f"UPDATE Appointments SET Status = CASE AppointmentID {cases} END WHERE AppointmentID IN ({placeholders})",
+                                   (*[v for pair in apply for v in pair], *[appointment_id for appointment_id, _ in apply]))
+                    events = record_appointment_changes(cursor, [(appointment_id, current_user_id, owned[appointment_id]['ClientID'], owned[appointment_id]['AppointmentDate'],
+                                                                  owned[appointment_id]['Status'], status) for appointment_id, status in apply])
+                    connection.commit()
+                    for result in results:
+                        if 'message' not in result: result['success'] = True
+                    invalidate_booked_slots(current_user_id)
+                    on_appointments_changed(current_user_id, *{owned[appointment_id]['ClientID'] for appointment_id, _ in apply})
+                    emit_user_events(events)
+                else:
+                    connection.rollback()
+        for result in results:
+            if not result['success'] and 'message' not in result:
+                result['message'] = "Not applied: another item in this atomic batch failed."
+        return batch_response(results, atomic)
+    except Exception as e:
+        if connection: connection.rollback()
+        return error_response(e)
+    finally:
+        if connection: connection.close()
+
+@app.route('/api/appointments/batch', methods=['POST'])
+@token_required
+def book_appointments(current_user_id, current_user_role):
+    # Body: {"bookings": [{"lawyerId": 2, "appointmentDate": "...", "notes": ""}, ...], "atomic": false}
+    if current_user_role != 'Client': return jsonify({"success": False, "message": "Only clients can book appointments."}), 403
+    connection = None
+    try:
+        data = request.get_json() or {}
+        atomic = bool(data.get('atomic'))
+        results, wanted = [], []
+        for item in batch_items(data, 'bookings'):
+            result = {"lawyerId": item.get('lawyerId') if isinstance(item, dict) else None, "success": False}
+            try:
+                lawyer_id = int(item['lawyerId'])
+                start = parse_appointment_time(item['appointmentDate'])
+            except (KeyError, TypeError, ValueError):
+                result['message'] = "lawyerId and a valid ISO appointmentDate are required."
+            else:
+                result['message'] = booking_error(lawyer_id, start)
+                if result['message'] is None:
+                    del result['message']
+                    wanted.append((result, lawyer_id, start, item.get('notes', '')))
+            results.append(result)
+
+        booked = []
+        if wanted:
+            lawyer_ids = sorted({lawyer_id for _, lawyer_id, _, _ in wanted})
+            connection = pool.connection()
+            with connection.cursor() as cursor:
+                # Saare lawyers ki rows ek saath, sorted order mein lock (deadlock na ho)
+                placeholders = ', '.join(['%s'] * len(lawyer_ids))
+                cursor.execute(f"SELECT UserID FROM Users WHERE UserID IN ({placeholders}) AND Role = 'Lawyer' ORDER BY UserID FOR UPDATE",
+                               lawyer_ids)
+                lawyers = {row['UserID'] for row in cursor.fetchall()}
+                # Har booking ke aas-paas ki active appointments ek hi query mein
+                ranges = [(lawyer_id, start - APPOINTMENT_SLOT, start + APPOINTMENT_SLOT) for _, lawyer_id, start, _ in wanted if lawyer_id in lawyers]
+                taken = {}
+                if ranges:
+                    clauses = ' OR '.join(['(LawyerID = %s AND AppointmentDate > %s AND AppointmentDate < %s)'] * len(ranges))
+                    cursor.execute(f"SELECT LawyerID, AppointmentDate FROM Appointments WHERE Status IN ('Pending', 'Confirmed') AND ({clauses})",
+                                   [v for r in ranges for v in r])
+                    for row in cursor.fetchall():
+                        taken.setdefault(row['LawyerID'], []).append(row['AppointmentDate'])
+                    for starts in taken.values(): starts.sort()
+                for result, lawyer_id, start, notes in wanted:
+                    result['appointmentDate'] = start
+                    starts = taken.setdefault(lawyer_id, [])
+                    if lawyer_id not in lawyers: result['message'] = "Lawyer not found."
+                    elif slot_taken(starts, start): result['message'] = "This slot is already booked."
+                    else:
+                        # Isi batch ki agli bookings bhi is slot se takraayein
+                        bisect.insort(starts, start)
+                        booked.append((result, lawyer_id, start, notes))
+                if booked and not (atomic and len(booked) < len(results)):
+                    # Ek hi transaction mein row-by-row INSERT: har row ka apna lastrowid. Multi-row INSERT ke
+                    # IDs consecutive hone ki guarantee nahi (interleaved autoinc, statement splitting)
+                    for result, lawyer_id, start, notes in booked:
+                        cursor.execute("INSERT INTO Appointments (ClientID, LawyerID, AppointmentDate, Notes, Status) VALUES (%s, %s, %s, %s, %s)",
+                                       (current_user_id, lawyer_id, start.strftime('%Y-%m-%d %H:%M:%S'), notes, 'Pending'))
+                        result['appointmentId'] = cursor.lastrowid
+                    events = record_appointment_changes(cursor, [(result['appointmentId'], lawyer_id, current_user_id, start, None, 'Pending')
+                                                                 for result, lawyer_id, start, _ in booked])
+                    connection.commit()
+                    for result, lawyer_id, start, _ in booked:
+                        result['success'] = True
+                        remember_booking(lawyer_id, start)
+                    on_appointments_changed(current_user_id, *{lawyer_id for _, lawyer_id, _, _ in booked})
+                    emit_user_events(events)
+                else:
+                    connection.rollback()
+        for result in results:
+            if not result['success'] and 'message' not in result:
+                result['message'] = "Not applied: another item in this atomic batch failed."
+        return batch_response(results, atomic)
+    except Exception as e:
+        if connection: connection.rollback()
+        return error_response(e)
     finally:
         if connection: connection.close()
 
 @app.route('/api/my-appointments', methods=['GET'])
+@read_replica
 @token_required
+@conditional_get(lambda current_user_id, **_: [('appointments', current_user_id), ('lawyers',), ('users',)])
 def get_my_appointments(current_user_id, current_user_role):
     connection = None
     try:
+        filters, filter_params = appointment_filters()
+        if current_user_role == 'Client':
+            query = f"""
+            SELECT a.AppointmentID, a.AppointmentDate, a.Status, a.Notes, u.Name AS LawyerName,
+                   lp.ConsultationFee, lp.Specializations
+            FROM Appointments a JOIN Users u ON a.LawyerID = u.UserID LEFT JOIN LawyerProfiles lp ON a.LawyerID = lp.UserID
+            WHERE a.ClientID = %s{filters} ORDER BY a.AppointmentDate DESC
+            """
+        elif current_user_role == 'Lawyer':
+            query = f"""
+            SELECT a.AppointmentID, a.AppointmentDate, a.Status, a.Notes, u.Name AS ClientName, lp.ConsultationFee
+            FROM Appointments a JOIN Users u ON a.ClientID = u.UserID LEFT JOIN LawyerProfiles lp ON a.LawyerID = lp.UserID
+            WHERE a.LawyerID = %s{filters} ORDER BY a.AppointmentDate DESC
+            """
+        else: return jsonify({"success": False, "message": "Invalid user role."}), 400
+        params = (current_user_id, *filter_params)
+        mode = stream_requested()
+        if mode: return stream_rows(mode, query, params)
         connection = pool.connection()
         with connection.cursor() as cursor:
-            if current_user_role == 'Client':
-                query = """
-                SELECT a.AppointmentID, a.AppointmentDate, a.Status, a.Notes, u.Name AS LawyerName,
-                       lp.ConsultationFee, lp.Specializations
-                FROM Appointments a JOIN Users u ON a.LawyerID = u.UserID LEFT JOIN LawyerProfiles lp ON a.LawyerID = lp.UserID
-                WHERE a.ClientID = %s ORDER BY a.AppointmentDate DESC
-                """
-            elif current_user_role == 'Lawyer':
-                query = """
-                SELECT a.AppointmentID, a.AppointmentDate, a.Status, a.Notes, u.Name AS ClientName, lp.ConsultationFee
-                FROM Appointments a JOIN Users u ON a.ClientID = u.UserID LEFT JOIN LawyerProfiles lp ON a.LawyerID = lp.UserID
-                WHERE a.LawyerID = %s ORDER BY a.AppointmentDate DESC
-                """
-            else: return jsonify({"success": False, "message": "Invalid user role."}), 400
-            cursor.execute(query, (current_user_id,))
+            cursor.execute(query, params)
             appointments = cursor.fetchall()
         return jsonify(appointments)
     except Exception as e:
-        return jsonify({"success": False, "message": str(e)}), 500
+        return error_response(e)
     finally:
         if connection: connection.close()
 
 # ==================== DASHBOARD STATS ====================
 
+# Dashboard baar baar poll hota hai; stats user ke hisaab se cache hote hain aur
+# appointment/profile writes par invalidate hote hain. TTL doosre workers ke writes ke liye hai.
+dashboard_stats_cache = TTLCache(maxsize=10000, ttl=int(os.environ.get('DASHBOARD_STATS_TTL', 60)))
+
+def invalidate_dashboard_stats(*user_ids):
+    for user_id in user_ids:
+        if user_id is not None: dashboard_stats_cache.pop(int(user_id))
+    resource_versions.bump(*[('dashboard', int(user_id)) for user_id in user_ids if user_id is not None])
+
+def on_appointments_changed(*user_ids):
+    invalidate_dashboard_stats(*user_ids)
+    resource_versions.bump(*[('appointments', int(user_id)) for user_id in user_ids if user_id is not None])
+
 @app.route('/api/dashboard/stats', methods=['GET'])
+@read_replica
 @token_required
 def get_dashboard_stats(current_user_id, current_user_role):
+    stats = dashboard_stats_cache.get(current_user_id)
+    if stats is not None and stats['role'] == current_user_role:
+        return jsonify({"success": True, "stats": stats['stats']})
+    fill_from_primary(('dashboard', current_user_id))
+    token = dashboard_stats_cache.fill_token()
     connection = None
     try:
         connection = pool.connection()
         with connection.cursor() as cursor:
             if current_user_role == 'Lawyer':
-                cursor.execute("SELECT COUNT(*) as total_appointments FROM Appointments WHERE LawyerID = %s", (current_user_id,))
-                total_appointments = cursor.fetchone()['total_appointments']
-                cursor.execute("SELECT COUNT(*) as pending_appointments FROM Appointments WHERE LawyerID = %s AND Status = 'Pending'", (current_user_id,))
-                pending_appointments = cursor.fetchone()['pending_appointments']
-                cursor.execute("SELECT COUNT(*) as completed_appointments FROM Appointments WHERE LawyerID = %s AND Status = 'Completed'", (current_user_id,))
-                completed_appointments = cursor.fetchone()['completed_appointments']
-                cursor.execute("SELECT AVG(ConsultationFee) as avg_earning FROM LawyerProfiles WHERE UserID = %s", (current_user_id,))
-                avg_earning = cursor.fetchone()['avg_earning'] or 0
+                cursor.execute("""
+                SELECT COUNT(*) AS total_appointments,
+                       COALESCE(SUM(Status = 'Pending'), 0) AS pending_appointments,
+                       COALESCE(SUM(Status = 'Completed'), 0) AS completed_appointments,
+                       (SELECT ConsultationFee FROM LawyerProfiles WHERE UserID = %s) AS avg_earning
+                FROM Appointments WHERE LawyerID = %s
+                """, (current_user_id, current_user_id))
+                row = cursor.fetchone()
                 stats = {
-                    "totalAppointments": total_appointments, "pendingAppointments": pending_appointments,
-                    "completedAppointments": completed_appointments, "averageEarning": float(avg_earning)
+                    "totalAppointments": int(row['total_appointments']), "pendingAppointments": int(row['pending_appointments']),
+                    "completedAppointments": int(row['completed_appointments']), "averageEarning": float(row['avg_earning'] or 0)
                 }
             else:
-                cursor.execute("SELECT COUNT(*) as total_appointments FROM Appointments WHERE ClientID = %s", (current_user_id,))
-                total_appointments = cursor.fetchone()['total_appointments']
-                cursor.execute("SELECT COUNT(*) as upcoming_appointments FROM Appointments WHERE ClientID = %s AND Status = 'Confirmed'", (current_user_id,))
-                upcoming_appointments = cursor.fetchone()['upcoming_appointments']
-                cursor.execute("SELECT COUNT(*) as completed_appointments FROM Appointments WHERE ClientID = %s AND Status = 'Completed'", (current_user_id,))
-                completed_appointments = cursor.fetchone()['completed_appointments']
+                cursor.execute("""
+                SELECT COUNT(*) AS total_appointments,
+                       COALESCE(SUM(Status = 'Confirmed'), 0) AS upcoming_appointments,
+                       COALESCE(SUM(Status = 'Completed'), 0) AS completed_appointments
+                FROM Appointments WHERE ClientID = %s
+                """, (current_user_id,))
+                row = cursor.fetchone()
                 stats = {
-                    "totalConsultations": total_appointments, "upcomingConsultations": upcoming_appointments,
-                    "completedConsultations": completed_appointments
+                    "totalConsultations": int(row['total_appointments']), "upcomingConsultations": int(row['upcoming_appointments']),
+                    "completedConsultations": int(row['completed_appointments'])
                 }
+        dashboard_stats_cache.set_if_fresh(current_user_id, {'role': current_user_role, 'stats': stats}, token)
         return jsonify({"success": True, "stats": stats})
     except Exception as e:
-        return jsonify({"success": False, "message": str(e)}), 500
+        return error_response(e)
     finally:
         if connection: connection.close()
 
+# ==================== USER UPDATE CHANNELS ====================
+# Appointment aur dashboard ke changes polling ki jagah har user ke Socket.IO room
+# "user_<id>" par push hote hain. Authenticated connection 'subscribe_updates' {since} bhejta hai.
+# Events UserEvents table mein appointment write ke hi transaction mein likhe jaate hain aur har
+# user ka Seq UserEventSeq mein ek hi counter hai, isliye saare workers (SOCKETIO_MESSAGE_QUEUE ke saath) ek hi contiguous sequence
+# dete hain. Reconnect par since se aage ke events DB se replay hote hain; gap ho (backlog se
+# purana ya prune ho chuka) to 'resync_required' aata hai aur client ek baar REST se
+# stats/appointments dobara le leta hai. Live events seq se dedupe/order karo: alag requests ke
+# events thoda aage-peeche pahunch sakte hain, aur subscribe aur replay ke beech aaya event dono
+# raaston se aa sakta hai.
+USER_EVENTS_BACKLOG = int(os.environ.get('USER_EVENTS_BACKLOG', 100))
+USER_EVENTS_TTL = int(os.environ.get('USER_EVENTS_TTL', 3600))
+USER_EVENTS_PRUNE_INTERVAL = 60
+
+# Status -> dashboard stats ka kaunsa counter; total sirf naye appointment par badhta hai
+STATS_STATUS_KEYS = {
+    'Lawyer': ('totalAppointments', {'Pending': 'pendingAppointments', 'Completed': 'completedAppointments'}),
+    'Client': ('totalConsultations', {'Confirmed': 'upcomingConsultations', 'Completed': 'completedConsultations'}),
+}
+
+# Seq row lock leta hai aur LAST_INSERT_ID se naya last seq lautata hai
+USER_EVENT_SEQ_SQL = """
+INSERT INTO UserEventSeq (UserID, Seq) VALUES (%s, LAST_INSERT_ID(%s))
+ON DUPLICATE KEY UPDATE Seq = LAST_INSERT_ID(Seq + %s)
+"""
+
+class UserEventLog:
+    def __init__(self, backlog, ttl):
+        self.backlog = backlog
+        self.ttl = ttl
+        self.pruned_at = 0
+
+    def append(self, cursor, events):
+        # [(user_id, type, data)] -> [(user_id, event)]. Caller ke transaction (primary) ke cursor par:
+        # events aur Seq bump usi write ke saath commit/rollback hote hain, commit ke baad hi emit karo
+        by_user = {}
+        for user_id, event_type, data in events:
+            by_user.setdefault(int(user_id), []).append((event_type, data))
+        appended = []
+        # Users sorted order mein lock karo taaki do writers deadlock na karein
+        for user_id in sorted(by_user):
+            items = by_user[user_id]
+            cursor.execute(USER_EVENT_SEQ_SQL, (user_id, len(items), len(items)))
+            first = cursor.lastrowid - len(items) + 1
+            cursor.executemany("INSERT INTO UserEvents (UserID, Seq, EventType, Payload) VALUES (%s, %s, %s, %s)",
+                               [(user_id, first + i, event_type, dumps_bytes(data).decode('utf-8'))
+                                for i, (event_type, data) in enumerate(items)])
+            cursor.execute("DELETE FROM UserEvents WHERE UserID = %s AND Seq <= %s",
+                           (user_id, first + len(items) - 1 - self.backlog))
+            appended += [(user_id, {'seq': first + i, 'type': event_type, 'data': data})
+                         for i, (event_type, data) in enumerate(items)]
+        return appended
+
+    def prune(self):
+        # TTL se purane events, har USER_EVENTS_PRUNE_INTERVAL mein ek baar; write ke transaction se bahar
+        if time.time() - self.pruned_at <= USER_EVENTS_PRUNE_INTERVAL:
+            return
+        self.pruned_at = time.time()
+        connection = pool.primary.connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("DELETE FROM UserEvents WHERE CreatedAt < NOW() - INTERVAL %s SECOND LIMIT 1000", (self.ttl,))
+            connection.commit()
+        finally:
+            connection.close()
+
+    def current(self, user_id):
+        connection = pool.primary.connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT Seq FROM UserEventSeq WHERE UserID = %s", (user_id,))
+                row = cursor.fetchone()
+        finally:
+            connection.close()
+        return row['Seq'] if row else 0
+
+    def since(self, user_id, seq):
+        # since ke baad ke events; None matlab beech ke events ab nahi hain, resync karo
+        seq = max(0, seq)
+        last = self.current(user_id)
+        if seq >= last:
+            return [] if seq == last else None
+        connection = pool.primary.connection()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT Seq, EventType, Payload FROM UserEvents WHERE UserID = %s AND Seq > %s ORDER BY Seq LIMIT %s",
+                               (user_id, seq, self.backlog))
+                rows = cursor.fetchall()
+        finally:
+            connection.close()
+        if not rows or rows[0]['Seq'] != seq + 1 or rows[-1]['Seq'] < last:
+            return None
+        return [{'seq': row['Seq'], 'type': row['EventType'], 'data': json.loads(row['Payload'])} for row in rows]
+
+user_events = UserEventLog(USER_EVENTS_BACKLOG, USER_EVENTS_TTL)
+
+def stats_delta(role, old_status, new_status):
+    total_key, status_keys = STATS_STATUS_KEYS[role]
+    delta = {total_key: 1} if old_status is None else {}
+    if old_status in status_keys:
+        delta[status_keys[old_status]] = delta.get(status_keys[old_status], 0) - 1
+    if new_status in status_keys:
+        delta[status_keys[new_status]] = delta.get(status_keys[new_status], 0) + 1
+    return {key: value for key, value in delta.items() if value}
+
+def record_appointment_changes(cursor, changes):
+    # changes: [(appointment_id, lawyer_id, client_id, date, old_status, new_status)]
+    # Appointment write ke transaction ke andar bulao: event fail hua to write bhi rollback, warna
+    # client ka Seq aage nahi badhta aur replay mein gap (resync) kabhi dikhta hi nahi.
+    # Lautaye events commit ke baad emit_user_events ko do.
+    events = []
+    for appointment_id, lawyer_id, client_id, date, old_status, new_status in changes:
+        appointment = {
+            "appointmentId": appointment_id, "lawyerId": int(lawyer_id), "clientId": int(client_id),
+            "appointmentDate": date.isoformat() if isinstance(date, datetime.datetime) else date,
+            "status": new_status, "previousStatus": old_status,
+        }
+        event_type = 'appointment_created' if old_status is None else 'appointment_status'
+        for user_id, role in ((client_id, 'Client'), (lawyer_id, 'Lawyer')):
+            events.append((user_id, event_type, appointment))
+            delta = stats_delta(role, old_status, new_status)
+            if delta: events.append((user_id, 'stats_delta', delta))
+    return user_events.append(cursor, events)
+
+def emit_user_events(appended):
+    # Events DB mein commit ho chuke hain; emit chhoot bhi jaaye to reconnect par replay milega
+    try:
+        for user_id, event in appended:
+            socketio.emit('user_event', event, to=f"user_{user_id}")
+    except Exception as e:
+        print(f"⚠️ User event push failed: {e}")
+    try:
+        user_events.prune()
+    except Exception as e:
+        print(f"⚠️ User event prune failed: {e}")
+
+@socketio.on('subscribe_updates')
+def handle_subscribe_updates(data):
+    # Identity connect-time JWT se aati hai (socket_users)
+    data = data or {}
+    user = socket_user()
+    if user is None or rate_limited():
+        return
+    user_id = user[0]
+    try:
+        since = max(0, int(data.get('since') or 0))
+    except (TypeError, ValueError):
+        since = 0
+    join_room(f"user_{user_id}")
+    try:
+        missed = user_events.since(user_id, since)
+        if missed is None:
+            emit('resync_required', {"seq": user_events.current(user_id)})
+            return
+    except Exception as e:
+        emit('subscribe_error', {"message": str(e)})
+        return
+    for event in missed:
+        emit('user_event', event)
+    emit('subscribed', {"seq": missed[-1]['seq'] if missed else since})
+
 # --- RUN THE APP ---
 if __name__ == '__main__':
     # Real-time ke liye ab socketio.run use karenge
@@ -0,0 +1,510 @@
+import argparse
+import datetime
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+
+import create_tables
+import db_config
+import hashing
+
+# Load test / benchmark. Synthetic data (lawyers, clients, appointments, rooms, messages) seed
+# karta hai, phir app.py ke saare routes aur Socket.IO 'send_message' ko ek weighted traffic
+# mix par chalata hai. Har route ka throughput aur p50/p95/p99 JSON baseline mein save hota hai,
+# taaki har performance change ko pehle aur baad ke numbers se compare kiya ja sake.
+#
+#   python benchmark.py seed --lawyers 200 --clients 2000 --reset
+#   python benchmark.py run --concurrency 16 --duration 30 --out bench/before.json
+#   python benchmark.py run --base-url http://localhost:8080 --concurrency 32 --out bench/after.json
+#   python benchmark.py compare bench/before.json bench/after.json --threshold 10
+#
+# App ki queries MySQL-specific hain (ON DUPLICATE KEY, FOR UPDATE, information_schema), isliye
+# SQLite stand-in nahi chalega. Local MySQL/MariaDB kaafi hai, e.g.
+#   docker run -d -p 8889:3306 -e MARIADB_ROOT_PASSWORD=root -e MARIADB_DATABASE=lawyer_app_bench mariadb:11
+# DB_* env wahi hain jo app.py aur create_tables.py lete hain. Bina --base-url ke app isi process
+# mein Flask/Socket.IO test clients se chalti hai (network aur gunicorn ke bina).
+# Socket.IO rate limits (SOCKET_RATE/SOCKET_BURST, ROOM_RATE/ROOM_BURST) load test ke liye app
+# process mein badha do, warna 'send_message' ke zyada events memory mein hi reject ho jaate hain.
+
+SEED_PASSWORD = 'benchmark-password'
+BENCH_EMAIL_DOMAIN = 'bench.nyayconnect.test'
+CITIES = ['Delhi', 'Mumbai', 'Bengaluru', 'Chennai', 'Kolkata', 'Hyderabad', 'Pune', 'Jaipur', 'Lucknow', 'Ahmedabad']
+SPECIALIZATIONS = ['Criminal Law', 'Family Law', 'Corporate Law', 'Property Law', 'Tax Law',
+                   'Labour Law', 'Cyber Law', 'Consumer Law', 'Immigration Law', 'Intellectual Property']
+INSERT_BATCH = 1000
+
+# ==================== SEED ====================
+
+def insert_many(cursor, query, rows):
+    for i in range(0, len(rows), INSERT_BATCH):
+        cursor.executemany(query, rows[i:i + INSERT_BATCH])
+
+def reset_tables(cursor, database):
+    # Galti se asli DB saaf na ho jaaye
+    if 'bench' not in database.lower():
+        raise SystemExit(f"--reset sirf benchmark databases par chalta hai (DB_NAME mein 'bench' chahiye, mila '{database}')")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 0")
+    for table in ('UserEvents', 'UserEventSeq', 'Messages', 'ChatRooms', 'LawyerRatings', 'Reviews', 'Appointments',
+                  'LawyerWorkingHours', 'LawyerProfiles', 'Users'):
+        cursor.execute(f"TRUNCATE TABLE {table}")
+    cursor.execute("SET FOREIGN_KEY_CHECKS = 1")
+
+def seed(args):
+    rng = random.Random(args.seed)
+    conn = db_config.connect()
+    try:
+        create_tables.migrate_up(conn)
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT DATABASE()")
+            database = cursor.fetchone()[0]
+            if args.reset:
+                reset_tables(cursor, database)
+            cursor.execute("SELECT COUNT(*) FROM Users WHERE Email LIKE %s", (f"%@{BENCH_EMAIL_DOMAIN}",))
+            if cursor.fetchone()[0]:
+                raise SystemExit("Benchmark data pehle se hai; dobara seed karne ke liye --reset do")
+
+            print(f"Seeding {args.lawyers} lawyers, {args.clients} clients...")
+            # Sabka ek hi password hash: bcrypt ek baar chalta hai, login route phir bhi asli check karta hai
+            password = hashing.hash_password(SEED_PASSWORD, args.bcrypt_rounds)
+            users = [(f"Lawyer {i}", f"lawyer{i}@{BENCH_EMAIL_DOMAIN}", password, 'Lawyer') for i in range(args.lawyers)]
+            users += [(f"Client {i}", f"client{i}@{BENCH_EMAIL_DOMAIN}", password, 'Client') for i in range(args.clients)]
+            insert_many(cursor, "INSERT INTO Users (Name, Email, Password, Role) VALUES (%s, %s, %s, %s)", users)
+            cursor.execute("SELECT UserID, Role FROM Users WHERE Email LIKE %s ORDER BY UserID", (f"%@{BENCH_EMAIL_DOMAIN}",))
+            rows = cursor.fetchall()
+            lawyer_ids = [user_id for user_id, role in rows if role == 'Lawyer']
+            client_ids = [user_id for user_id, role in rows if role == 'Client']
+
+            insert_many(cursor, """
+            INSERT INTO LawyerProfiles (UserID, Bio, Specializations, Experience, City, ConsultationFee)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            """, [(lawyer_id, f"Advocate with a practice in {rng.choice(CITIES)}.",
+                   ', '.join(rng.sample(SPECIALIZATIONS, rng.randint(1, 3))), f"{rng.randint(1, 30)} years",
+                   rng.choice(CITIES), rng.randrange(500, 10001, 100)) for lawyer_id in lawyer_ids])
+            # Monday-Friday 09:00-17:00
+            insert_many(cursor, "INSERT INTO LawyerWorkingHours (LawyerID, DayOfWeek, StartTime, EndTime) VALUES (%s, %s, %s, %s)",
+                        [(lawyer_id, day, '09:00', '17:00') for lawyer_id in lawyer_ids for day in range(5)])
+
+            print(f"Seeding {args.clients * args.appointments} appointments...")
+            today = datetime.datetime.combine(datetime.date.today(), datetime.time(9))
+            appointments = []
+            for client_id in client_ids:
+                for _ in range(args.appointments):
+                    start = today + datetime.timedelta(days=rng.randint(-90, 30), minutes=30 * rng.randrange(16))
+                    status = rng.choice(['Pending', 'Confirmed']) if start > today else rng.choice(['Completed', 'Cancelled'])
+                    appointments.append((client_id, rng.choice(lawyer_ids), start, 'Benchmark appointment', status))
+            insert_many(cursor, "INSERT INTO Appointments (ClientID, LawyerID, AppointmentDate, Notes, Status) VALUES (%s, %s, %s, %s, %s)",
+                        appointments)
+
+            print(f"Seeding {args.clients * args.reviews} reviews...")
+            reviews = [(client_id, lawyer_id, rng.choices(range(1, 6), weights=(1, 1, 3, 6, 8))[0], 'Benchmark review')
+                       for client_id in client_ids for lawyer_id in rng.sample(lawyer_ids, min(args.reviews, len(lawyer_ids)))]
+            insert_many(cursor, "INSERT INTO Reviews (ClientID, LawyerID, Rating, Comment) VALUES (%s, %s, %s, %s)", reviews)
+            create_tables.review_aggregates_up(cursor)
+
+            print(f"Seeding {args.clients * args.rooms} rooms x {args.messages} messages...")
+            now = datetime.datetime.now().replace(microsecond=0)
+            rooms = []
+            for client_id in client_ids:
+                for lawyer_id in rng.sample(lawyer_ids, min(args.rooms, len(lawyer_ids))):
+                    rooms.append((client_id, lawyer_id, f"Message {args.messages - 1}", now - datetime.timedelta(minutes=rng.randint(0, 10000)),
+                                  rng.randint(0, 5), rng.randint(0, 5)))
+            insert_many(cursor, """
+            INSERT INTO ChatRooms (ClientID, LawyerID, LastMessage, LastMessageTime, ClientUnread, LawyerUnread)
+            VALUES (%s, %s, %s, %s, %s, %s)
+            """, rooms)
+            cursor.execute("SELECT RoomID, ClientID, LawyerID, LastMessageTime FROM ChatRooms")
+            for room_id, client_id, lawyer_id, last_time in cursor.fetchall():
+                insert_many(cursor, "INSERT INTO Messages (RoomID, SenderID, MessageText, Timestamp, IsRead) VALUES (%s, %s, %s, %s, %s)",
+                            [(room_id, client_id if i % 2 == 0 else lawyer_id, f"Message {i}",
+                              last_time - datetime.timedelta(minutes=args.messages - i), i < args.messages - 5)
+                             for i in range(args.messages)])
+        conn.commit()
+        print("✅ Seed done.")
+    finally:
+        conn.close()
+
+# ==================== DRIVERS ====================
+
+class InProcessDriver:
+    # Har worker thread ka apna Flask aur Socket.IO test client
+    name = 'in-process'
+
+    def __init__(self):
+        import app as app_module
+        self.app_module = app_module
+        self.local = threading.local()
+
+    def client(self):
+        if not hasattr(self.local, 'client'):
+            self.local.client = self.app_module.app.test_client()
+        return self.local.client
+
+    def request(self, method, path, token=None, body=None):
+        headers = {'Authorization': f'Bearer {token}'} if token else {}
+        response = self.client().open(path, method=method, headers=headers, json=body)
+        try:
+            return response.status_code, response.get_json(silent=True)
+        finally:
+            response.close()
+
+    def send_message(self, token, data):
+        sockets = self.local.__dict__.setdefault('sockets', {})
+        if token not in sockets:
+            sockets[token] = self.app_module.socketio.test_client(self.app_module.app, flask_test_client=self.client(), auth={'token': token})
+        sockets[token].emit('send_message', data, callback=True)
+        return 200
+
+class HttpDriver:
+    # Chalta hua server (gunicorn) ko HTTP aur Socket.IO client se maaro
+    name = 'http'
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self.local = threading.local()
+
+    def request(self, method, path, token=None, body=None):
+        headers = {'Content-Type': 'application/json'}
+        if token: headers['Authorization'] = f'Bearer {token}'
+        data = json.dumps(body).encode('utf-8') if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, headers=headers, method=method)
+        try:
+            with urllib.request.urlopen(req, timeout=30) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        try:
+            return status, json.loads(payload)
+        except ValueError:
+            return status, None
+
+    def send_message(self, token, data):
+        # python-socketio client ke liye 'python-socketio[client]' chahiye
+        import socketio
+        sockets = self.local.__dict__.setdefault('sockets', {})
+        if token not in sockets:
+            client = socketio.Client()
+            client.connect(self.base_url, transports=['websocket'], auth={'token': token})
+            sockets[token] = client
+        sockets[token].call('send_message', data, timeout=30)
+        return 200
+
+    def close(self):
+        for client in self.local.__dict__.get('sockets', {}).values():
+            client.disconnect()
+
+# ==================== TRAFFIC MIX ====================
+
+class Context:
+    # Warm-up mein login karke tokens, rooms, lawyers aur appointments jama karta hai
+    def __init__(self, driver, users, rng):
+        self.clients, self.lawyers = [], []
+        for role, bucket in (('client', self.clients), ('lawyer', self.lawyers)):
+            for i in range(users):
+                status, data = driver.request('POST', '/api/login', body={'email': f"{role}{i}@{BENCH_EMAIL_DOMAIN}", 'password': SEED_PASSWORD})
+                if status == 200:
+                    bucket.append({'id': data['userId'], 'token': data['token'], 'rooms': [], 'appointments': []})
+        if not self.clients or not self.lawyers:
+            raise SystemExit("Login fail hua; pehle 'python benchmark.py seed' chalao")
+        for user in self.clients + self.lawyers:
+            status, data = driver.request('GET', '/api/chat/rooms', user['token'])
+            user['rooms'] = [room['RoomID'] for room in (data or {}).get('rooms', [])]
+        for user in self.lawyers:
+            status, data = driver.request('GET', '/api/lawyer/appointments', user['token'])
+            user['appointments'] = [a['AppointmentID'] for a in (data or {}).get('appointments', [])]
+        status, data = driver.request('GET', '/api/lawyers')
+        self.lawyer_ids = [lawyer['UserID'] for lawyer in data or []] or [user['id'] for user in self.lawyers]
+        self.rng = rng
+
+def with_rooms(users, rng):
+    return rng.choice([u for u in users if u['rooms']] or users)
+
+def next_weekday_slot(rng):
+    day = datetime.date.today() + datetime.timedelta(days=rng.randint(1, 30))
+    while day.weekday() > 4:
+        day += datetime.timedelta(days=1)
+    return datetime.datetime.combine(day, datetime.time(9)) + datetime.timedelta(minutes=30 * rng.randrange(16))
+
+# (name, weight, fn(ctx, rng, driver) -> status). Weights roughly production ka read-heavy mix hain.
+def scenarios():
+    def get(path_fn, role=None):
+        def run(ctx, rng, driver):
+            user = rng.choice(getattr(ctx, role)) if role else None
+            return driver.request('GET', path_fn(ctx, rng, user), user and user['token'])[0]
+        return run
+
+    def chat_messages(ctx, rng, driver):
+        user = with_rooms(ctx.clients + ctx.lawyers, rng)
+        room_id = rng.choice(user['rooms']) if user['rooms'] else 0
+        return driver.request('GET', f"/api/chat/messages/{room_id}?limit=50", user['token'])[0]
+
+    def chat_search(ctx, rng, driver):
+        user = rng.choice(ctx.clients + ctx.lawyers)
+        return driver.request('GET', f"/api/chat/search?q=message+{rng.randint(0, 39)}", user['token'])[0]
+
+    def chat_send(ctx, rng, driver):
+        user = with_rooms(ctx.clients, rng)
+        room_id = rng.choice(user['rooms']) if user['rooms'] else 0
+        return driver.request('POST', '/api/chat/send', user['token'], {'room_id': room_id, 'message': f"bench {uuid.uuid4().hex[:8]}"})[0]
+
+    def socket_send(ctx, rng, driver):
+        user = with_rooms(ctx.clients + ctx.lawyers, rng)
+        room_id = rng.choice(user['rooms']) if user['rooms'] else 0
+        return driver.send_message(user['token'], {'room_id': room_id, 'sender_id': user['id'], 'message': f"bench {uuid.uuid4().hex[:8]}"})
+
+    def chat_read(ctx, rng, driver):
+        user = with_rooms(ctx.clients + ctx.lawyers, rng)
+        return driver.request('POST', '/api/chat/read', user['token'], {'room_ids': user['rooms'][:5] or [0]})[0]
+
+    def get_or_create_room(ctx, rng, driver):
+        user = rng.choice(ctx.clients)
+        return driver.request('POST', '/api/chat/get_or_create_room', user['token'], {'lawyerId': rng.choice(ctx.lawyer_ids)})[0]
+
+    def book(ctx, rng, driver):
+        user = rng.choice(ctx.clients)
+        body = {'lawyerId': rng.choice(ctx.lawyer_ids), 'appointmentDate': next_weekday_slot(rng).isoformat(), 'notes': 'bench'}
+        return driver.request('POST', '/api/appointments', user['token'], body)[0]
+
+    def update_status(ctx, rng, driver):
+        user = rng.choice([u for u in ctx.lawyers if u['appointments']] or ctx.lawyers)
+        appointment_id = rng.choice(user['appointments']) if user['appointments'] else 0
+        return driver.request('PUT', f"/api/appointments/{appointment_id}", user['token'], {'status': rng.choice(['Confirmed', 'Completed'])})[0]
+
+    def update_statuses(ctx, rng, driver):
+        user = rng.choice([u for u in ctx.lawyers if u['appointments']] or ctx.lawyers)
+        updates = [{'appointmentId': a, 'status': rng.choice(['Confirmed', 'Completed'])} for a in rng.sample(user['appointments'], min(10, len(user['appointments'])))]
+        return driver.request('PUT', '/api/appointments/batch', user['token'], {'updates': updates or [{'appointmentId': 0, 'status': 'Confirmed'}]})[0]
+
+    def book_many(ctx, rng, driver):
+        user = rng.choice(ctx.clients)
+        bookings = [{'lawyerId': rng.choice(ctx.lawyer_ids), 'appointmentDate': next_weekday_slot(rng).isoformat()} for _ in range(5)]
+        return driver.request('POST', '/api/appointments/batch', user['token'], {'bookings': bookings})[0]
+
+    def update_profile(ctx, rng, driver):
+        user = rng.choice(ctx.clients + ctx.lawyers)
+        return driver.request('PUT', '/api/user/profile', user['token'], {'name': f"Bench User {user['id']}"})[0]
+
+    def update_lawyer_profile(ctx, rng, driver):
+        user = rng.choice(ctx.lawyers)
+        body = {'bio': 'Updated by benchmark.', 'specializations': rng.choice(SPECIALIZATIONS), 'experience': '10 years',
+                'city': rng.choice(CITIES), 'consultationFee': rng.randrange(500, 10001, 100)}
+        return driver.request('PUT', '/api/lawyer-profile', user['token'], body)[0]
+
+    def my_lawyer_profile_post(ctx, rng, driver):
+        user = rng.choice(ctx.lawyers)
+        body = {'bio': 'Updated by benchmark.', 'specializations': rng.choice(SPECIALIZATIONS), 'experience': '12 years',
+                'city': rng.choice(CITIES), 'consultationFee': rng.randrange(500, 10001, 100)}
+        return driver.request('POST', '/api/my-lawyer-profile', user['token'], body)[0]
+
+    def working_hours_put(ctx, rng, driver):
+        user = rng.choice(ctx.lawyers)
+        body = {'hours': [{'day': day, 'start': '09:00', 'end': '17:00'} for day in range(5)]}
+        return driver.request('PUT', '/api/lawyer/working-hours', user['token'], body)[0]
+
+    def submit_review(ctx, rng, driver):
+        user = rng.choice(ctx.clients)
+        body = {'rating': rng.randint(1, 5), 'comment': 'Benchmark review'}
+        return driver.request('POST', f"/api/lawyers/{rng.choice(ctx.lawyer_ids)}/reviews", user['token'], body)[0]
+
+    def login(ctx, rng, driver):
+        return driver.request('POST', '/api/login', body={'email': f"client{rng.randrange(len(ctx.clients))}@{BENCH_EMAIL_DOMAIN}", 'password': SEED_PASSWORD})[0]
+
+    def register(ctx, rng, driver):
+        body = {'name': 'Bench Signup', 'email': f"signup-{uuid.uuid4().hex}@{BENCH_EMAIL_DOMAIN}", 'password': SEED_PASSWORD, 'role': 'Client'}
+        return driver.request('POST', '/api/register', body=body)[0]
+
+    return [
+        ('GET /', 1, get(lambda ctx, rng, user: '/')),
+        ('GET /test', 1, get(lambda ctx, rng, user: '/test')),
+        ('GET /api/lawyers', 10, get(lambda ctx, rng, user: '/api/lawyers')),
+        ('GET /api/lawyers/search', 8, get(lambda ctx, rng, user: f"/api/lawyers/search?city={rng.choice(CITIES)}&sort=fee&limit=20")),
+        ('GET /api/lawyers?sort=rating', 4, get(lambda ctx, rng, user: '/api/lawyers?sort=rating')),
+        ('GET /api/lawyers/<id>/reviews', 4, get(lambda ctx, rng, user: f"/api/lawyers/{rng.choice(ctx.lawyer_ids)}/reviews")),
+        ('POST /api/lawyers/<id>/reviews', 1, submit_review),
+        ('GET /api/lawyers/<id>', 8, get(lambda ctx, rng, user: f"/api/lawyers/{rng.choice(ctx.lawyer_ids)}")),
+        ('GET /api/lawyers/<id>/availability', 6, get(lambda ctx, rng, user: f"/api/lawyers/{rng.choice(ctx.lawyer_ids)}/availability")),
+        ('GET /api/user/profile', 5, get(lambda ctx, rng, user: '/api/user/profile', 'clients')),
+        ('GET /api/my-appointments', 8, get(lambda ctx, rng, user: '/api/my-appointments', 'clients')),
+        ('GET /api/lawyer/appointments', 4, get(lambda ctx, rng, user: '/api/lawyer/appointments', 'lawyers')),
+        ('GET /api/appointment-history', 3, get(lambda ctx, rng, user: '/api/appointment-history', 'clients')),
+        ('GET /api/dashboard/stats', 6, get(lambda ctx, rng, user: '/api/dashboard/stats', 'lawyers')),
+        ('GET /api/my-lawyer-profile', 2, get(lambda ctx, rng, user: '/api/my-lawyer-profile', 'lawyers')),
+        ('GET /api/lawyer/working-hours', 1, get(lambda ctx, rng, user: '/api/lawyer/working-hours', 'lawyers')),
+        ('GET /api/chat/rooms', 8, get(lambda ctx, rng, user: '/api/chat/rooms', 'clients')),
+        ('GET /api/chat/messages/<id>', 10, chat_messages),
+        ('GET /api/chat/search', 2, chat_search),
+        ('POST /api/chat/send', 3, chat_send),
+        ('socket send_message', 8, socket_send),
+        ('POST /api/chat/read', 3, chat_read),
+        ('POST /api/chat/get_or_create_room', 2, get_or_create_room),
+        ('POST /api/appointments', 2, book),
+        ('PUT /api/appointments/<id>', 1, update_status),
+        ('PUT /api/appointments/batch', 0.5, update_statuses),
+        ('POST /api/appointments/batch', 0.5, book_many),
+        ('PUT /api/user/profile', 1, update_profile),
+        ('PUT /api/lawyer-profile', 0.5, update_lawyer_profile),
+        ('POST /api/my-lawyer-profile', 0.5, my_lawyer_profile_post),
+        ('PUT /api/lawyer/working-hours', 0.5, working_hours_put),
+        ('POST /api/login', 1, login),
+        ('POST /api/register', 0.5, register),
+        ('GET /api/pool/stats', 0.5, get(lambda ctx, rng, user: '/api/pool/stats')),
+        ('GET /metrics', 0.5, get(lambda ctx, rng, user: '/metrics')),
+    ]
+
+# ==================== RUN ====================
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(samples, elapsed):
+    latencies = sorted(ms for ms, _ in samples)
+    statuses = {}
+    for _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': len(samples),
+        'rps': round(len(samples) / elapsed, 2) if elapsed else 0,
+        'errors': sum(1 for _, status in samples if status == 'error' or status >= 500),
+        'statuses': statuses,
+        **{f'p{p}_ms': round(percentile(latencies, p), 2) if latencies else None for p in (50, 95, 99)},
+        'max_ms': round(latencies[-1], 2) if latencies else None,
+    }
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run(args):
+    if args.only:
+        mix = [s for s in scenarios() if any(part in s[0] for part in args.only.split(','))]
+        if not mix: raise SystemExit(f"--only '{args.only}' se koi scenario match nahi hua")
+    else:
+        mix = scenarios()
+    driver = HttpDriver(args.base_url) if args.base_url else InProcessDriver()
+    context = Context(driver, args.users, random.Random(args.seed))
+    names, weights, fns = zip(*mix)
+    results = {name: [] for name in names}
+    results_lock = threading.Lock()
+    started = time.perf_counter()
+    measure_from = started + args.warmup
+    deadline = measure_from + args.duration
+
+    def worker(worker_id):
+        rng = random.Random(f"{args.seed}-{worker_id}")
+        local = []
+        while True:
+            now = time.perf_counter()
+            if now >= deadline: break
+            index = rng.choices(range(len(fns)), weights=weights)[0]
+            try:
+                status = fns[index](context, rng, driver)
+            except Exception as e:
+                if args.verbose: print(f"⚠️ {names[index]}: {e}")
+                status = 'error'
+            if now >= measure_from:
+                local.append((names[index], (time.perf_counter() - now) * 1000, status))
+        with results_lock:
+            for name, ms, status in local:
+                results[name].append((ms, status))
+        if hasattr(driver, 'close'): driver.close()
+
+    print(f"Running {len(mix)} scenarios, {args.concurrency} workers, {args.warmup}s warm-up + {args.duration}s ({driver.name})...")
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(args.concurrency)]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = args.duration
+
+    report = {
+        'meta': {
+            'timestamp': datetime.datetime.now().isoformat(timespec='seconds'), 'commit': git_commit(),
+            'driver': driver.name, 'base_url': args.base_url, 'concurrency': args.concurrency,
+            'duration_s': args.duration, 'warmup_s': args.warmup, 'seed': args.seed, 'users': args.users,
+            'python': sys.version.split()[0],
+        },
+        'total': summarize([sample for samples in results.values() for sample in samples], elapsed),
+        'routes': {name: summarize(samples, elapsed) for name, samples in results.items() if samples},
+    }
+    print_report(report)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.out}")
+
+def print_report(report):
+    print(f"\n{'route':<40} {'req':>7} {'rps':>8} {'err':>5} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for name, r in sorted(report['routes'].items()) + [('TOTAL', report['total'])]:
+        print(f"{name:<40} {r['requests']:>7} {r['rps']:>8} {r['errors']:>5} {r['p50_ms']:>8} {r['p95_ms']:>8} {r['p99_ms']:>8}")
+
+# ==================== COMPARE ====================
+
+def compare(args):
+    with open(args.baseline) as f: before = json.load(f)
+    with open(args.current) as f: after = json.load(f)
+    regressions = []
+    print(f"{'route':<40} {'metric':>6} {'before':>9} {'after':>9} {'change':>8}")
+    routes = sorted(set(before['routes']) & set(after['routes'])) + ['TOTAL']
+    for name in routes:
+        old = before['total'] if name == 'TOTAL' else before['routes'][name]
+        new = after['total'] if name == 'TOTAL' else after['routes'][name]
+        for metric in ('rps', 'p50_ms', 'p95_ms', 'p99_ms'):
+            if not old.get(metric) or new.get(metric) is None: continue
+            change = (new[metric] - old[metric]) / old[metric] * 100
+            # rps ka girna aur latency ka badhna dono regression hain
+            worse = -change if metric == 'rps' else change
+            flag = ' ⚠️' if worse > args.threshold else ''
+            if flag: regressions.append((name, metric, change))
+            print(f"{name:<40} {metric:>6} {old[metric]:>9} {new[metric]:>9} {change:>+7.1f}%{flag}")
+    if regressions:
+        print(f"\n❌ {len(regressions)} metrics {args.threshold}% se zyada kharab hue")
+        raise SystemExit(1)
+    print("\n✅ Koi regression nahi")
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="NyayConnect load test and benchmark")
+    commands = arg_parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser('seed', help="synthetic dataset DB mein daalo")
+    seed_parser.add_argument('--lawyers', type=int, default=200)
+    seed_parser.add_argument('--clients', type=int, default=2000)
+    seed_parser.add_argument('--appointments', type=int, default=5, help="har client ke appointments")
+    seed_parser.add_argument('--reviews', type=int, default=1, help="har client ke reviews")
+    seed_parser.add_argument('--rooms', type=int, default=3, help="har client ke chat rooms")
+    seed_parser.add_argument('--messages', type=int, default=40, help="har room ke messages")
+    seed_parser.add_argument('--bcrypt-rounds', type=int, default=int(os.environ.get('BCRYPT_LOG_ROUNDS', 12)))
+    seed_parser.add_argument('--seed', type=int, default=42)
+    seed_parser.add_argument('--reset', action='store_true', help="pehle saari tables khaali karo (sirf *bench* DB)")
+
+    run_parser = commands.add_parser('run', help="traffic mix chalao aur latency report karo")
+    run_parser.add_argument('--base-url', help="chalta hua server; na do to app isi process mein chalti hai")
+    run_parser.add_argument('--concurrency', type=int, default=8)
+    run_parser.add_argument('--duration', type=float, default=30)
+    run_parser.add_argument('--warmup', type=float, default=5)
+    run_parser.add_argument('--users', type=int, default=50, help="har role ke kitne seeded users login karein")
+    run_parser.add_argument('--only', help="comma-separated scenario name fragments, e.g. 'chat,lawyers'")
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--out', help="JSON baseline file")
+    run_parser.add_argument('--verbose', action='store_true')
+
+    compare_parser = commands.add_parser('compare', help="do baselines compare karo")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=10, help="itne % se kharab ho to exit 1")
+
+    args = arg_parser.parse_args()
+    {'seed': seed, 'run': run, 'compare': compare}[args.command](args)
+
+if __name__ == "__main__":
+    main()
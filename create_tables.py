@@ -1,111 +1,502 @@
 import pymysql
 import os
+import re
+import ast
+import argparse
+import db_config
 
-def create():
+# Schema migrations. Har migration ka ek version, up() aur down() hai; applied versions
+# schema_version table mein rehte hain. Steps idempotent hain (IF NOT EXISTS / information_schema
+# checks), isliye purane create_tables.py se bani DB par bhi safely chalte hain.
+#
+#   python create_tables.py                 -> saari pending migrations apply
+#   python create_tables.py up --to 4       -> version 4 tak
+#   python create_tables.py down --to 3     -> version 3 tak wapas
+#   python create_tables.py status
+#   python create_tables.py up --dry-run    -> SQL print karo + app.py ki har query ka EXPLAIN
+#
+# Credentials env se aate hain (db_config.py): DB_HOST, DB_PORT, DB_USER, DB_PASSWORD, DB_NAME, DB_SSL
+
+APP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app.py')
+
+def get_connection():
+    return db_config.connect()
+
+class DryRunCursor:
+    # Schema badalne wale statements sirf print hote hain; information_schema checks chalte hain
+    def __init__(self, cursor):
+        self.cursor = cursor
+
+    def execute(self, sql, params=None):
+        if sql.lstrip().upper().startswith('SELECT'):
+            return self.cursor.execute(sql, params)
+        print(' '.join(sql.split()) + ';')
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+def index_exists(cursor, table, index_name):
+    cursor.execute("""
+    SELECT COUNT(*) FROM information_schema.statistics
+    WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+    """, (table, index_name))
+    return cursor.fetchone()[0] > 0
+
+def column_exists(cursor, table, column):
+    cursor.execute("""
+    SELECT COUNT(*) FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    return cursor.fetchone()[0] > 0
+
+def add_index(cursor, table, index_name, columns, kind=''):
+    # CREATE TABLE IF NOT EXISTS purani tables ko touch nahi karta, isliye index alag se add karo
+    # kind: '' ya 'UNIQUE' / 'FULLTEXT'
+    if not index_exists(cursor, table, index_name):
+        cursor.execute(f"CREATE {kind + ' ' if kind else ''}INDEX {index_name} ON {table} ({columns})")
+        print(f"Index {index_name} created on {table}.")
+
+def drop_index(cursor, table, index_name):
+    if index_exists(cursor, table, index_name):
+        cursor.execute(f"DROP INDEX {index_name} ON {table}")
+        print(f"Index {index_name} dropped from {table}.")
+
+def add_column(cursor, table, column, definition):
+    if not column_exists(cursor, table, column):
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+        print(f"Column {column} added to {table}.")
+
+def drop_column(cursor, table, column):
+    if column_exists(cursor, table, column):
+        cursor.execute(f"ALTER TABLE {table} DROP COLUMN {column}")
+        print(f"Column {column} dropped from {table}.")
+
+# ==================== MIGRATIONS ====================
+
+def initial_schema_up(cursor):
+    # 1. Users Table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Users (
+        UserID INT AUTO_INCREMENT PRIMARY KEY,
+        Name VARCHAR(255) NOT NULL,
+        Email VARCHAR(255) UNIQUE NOT NULL,
+        Password VARCHAR(255) NOT NULL,
+        Role ENUM('Client', 'Lawyer') NOT NULL
+    );
+    """)
+
+    # 2. Lawyer Profiles Table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS LawyerProfiles (
+        ProfileID INT AUTO_INCREMENT PRIMARY KEY,
+        UserID INT UNIQUE,
+        Bio TEXT,
+        Specializations VARCHAR(255),
+        Experience VARCHAR(100),
+        City VARCHAR(100),
+        ConsultationFee DECIMAL(10, 2),
+        FOREIGN KEY (UserID) REFERENCES Users(UserID) ON DELETE CASCADE
+    );
+    """)
+
+    # 3. Appointments Table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Appointments (
+        AppointmentID INT AUTO_INCREMENT PRIMARY KEY,
+        ClientID INT,
+        LawyerID INT,
+        AppointmentDate DATETIME NOT NULL,
+        Notes TEXT,
+        Status ENUM('Pending', 'Confirmed', 'Cancelled', 'Completed') DEFAULT 'Pending',
+        FOREIGN KEY (ClientID) REFERENCES Users(UserID),
+        FOREIGN KEY (LawyerID) REFERENCES Users(UserID)
+    );
+    """)
+
+    # 4. Reviews Table
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Reviews (
+        ReviewID INT AUTO_INCREMENT PRIMARY KEY,
+        ClientID INT,
+        LawyerID INT,
+        Rating INT CHECK (Rating >= 1 AND Rating <= 5),
+        Comment TEXT,
+        CreatedAt DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (ClientID) REFERENCES Users(UserID),
+        FOREIGN KEY (LawyerID) REFERENCES Users(UserID)
+    );
+    """)
+
+    # 5. ChatRooms Table
+    # (Ise Messages se pehle rakha hai taaki RoomID reference ho sake)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS ChatRooms (
+        RoomID INT AUTO_INCREMENT PRIMARY KEY,
+        ClientID INT NOT NULL,
+        LawyerID INT NOT NULL,
+        CreatedAt DATETIME DEFAULT CURRENT_TIMESTAMP,
+        LastMessage TEXT,
+        LastMessageTime DATETIME,
+        UNIQUE KEY (ClientID, LawyerID),
+        FOREIGN KEY (ClientID) REFERENCES Users(UserID),
+        FOREIGN KEY (LawyerID) REFERENCES Users(UserID)
+    );
+    """)
+
+    # 6. Messages Table (FINAL VERSION with RoomID)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS Messages (
+        MessageID INT AUTO_INCREMENT PRIMARY KEY,
+        RoomID INT NOT NULL,
+        SenderID INT NOT NULL,
+        MessageText TEXT NOT NULL,
+        Timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+        IsRead BOOLEAN DEFAULT FALSE,
+        FOREIGN KEY (RoomID) REFERENCES ChatRooms(RoomID) ON DELETE CASCADE,
+        FOREIGN KEY (SenderID) REFERENCES Users(UserID)
+    );
+    """)
+
+def initial_schema_down(cursor):
+    for table in ('Messages', 'ChatRooms', 'Reviews', 'Appointments', 'LawyerProfiles', 'Users'):
+        cursor.execute(f"DROP TABLE IF EXISTS {table}")
+
+def message_paging_up(cursor):
+    add_index(cursor, "Messages", "idx_messages_room_message", "RoomID, MessageID")
+
+def message_paging_down(cursor):
+    drop_index(cursor, "Messages", "idx_messages_room_message")
+
+def dashboard_indexes_up(cursor):
+    add_index(cursor, "Appointments", "idx_appointments_lawyer_status", "LawyerID, Status")
+    add_index(cursor, "Appointments", "idx_appointments_client_status", "ClientID, Status")
+
+def dashboard_indexes_down(cursor):
+    drop_index(cursor, "Appointments", "idx_appointments_lawyer_status")
+    drop_index(cursor, "Appointments", "idx_appointments_client_status")
+
+def unread_counters_up(cursor):
+    add_column(cursor, "ChatRooms", "ClientUnread", "INT NOT NULL DEFAULT 0")
+    add_column(cursor, "ChatRooms", "LawyerUnread", "INT NOT NULL DEFAULT 0")
+    add_index(cursor, "Messages", "idx_messages_room_unread", "RoomID, IsRead")
+    add_index(cursor, "ChatRooms", "idx_chatrooms_lawyer_time", "LawyerID, LastMessageTime")
+    add_index(cursor, "ChatRooms", "idx_chatrooms_client_time", "ClientID, LastMessageTime")
+
+def unread_counters_down(cursor):
+    drop_index(cursor, "ChatRooms", "idx_chatrooms_client_time")
+    drop_index(cursor, "ChatRooms", "idx_chatrooms_lawyer_time")
+    drop_index(cursor, "Messages", "idx_messages_room_unread")
+    drop_column(cursor, "ChatRooms", "LawyerUnread")
+    drop_column(cursor, "ChatRooms", "ClientUnread")
+
+def working_hours_up(cursor):
+    # DayOfWeek: 0 = Monday ... 6 = Sunday
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS LawyerWorkingHours (
+        ID INT AUTO_INCREMENT PRIMARY KEY,
+        LawyerID INT NOT NULL,
+        DayOfWeek TINYINT NOT NULL,
+        StartTime TIME NOT NULL,
+        EndTime TIME NOT NULL,
+        INDEX idx_working_hours_lawyer (LawyerID, DayOfWeek),
+        FOREIGN KEY (LawyerID) REFERENCES Users(UserID) ON DELETE CASCADE
+    );
+    """)
+    add_index(cursor, "Appointments", "idx_appointments_lawyer_date", "LawyerID, AppointmentDate")
+
+def working_hours_down(cursor):
+    drop_index(cursor, "Appointments", "idx_appointments_lawyer_date")
+    cursor.execute("DROP TABLE IF EXISTS LawyerWorkingHours")
+
+def listing_indexes_up(cursor):
+    # Appointment listings (ClientID + ORDER BY AppointmentDate), messages by time,
+    # aur directory ka Role = 'Lawyer' filter
+    add_index(cursor, "Appointments", "idx_appointments_client_date", "ClientID, AppointmentDate")
+    add_index(cursor, "Messages", "idx_messages_room_time", "RoomID, Timestamp")
+    add_index(cursor, "Users", "idx_users_role", "Role")
+
+def listing_indexes_down(cursor):
+    drop_index(cursor, "Users", "idx_users_role")
+    drop_index(cursor, "Messages", "idx_messages_room_time")
+    drop_index(cursor, "Appointments", "idx_appointments_client_date")
+
+def review_aggregates_up(cursor):
+    # Har lawyer ke ratings ka chalta hua hisaab; app review likhte waqt delta se update karti hai
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS LawyerRatings (
+        LawyerID INT PRIMARY KEY,
+        ReviewCount INT NOT NULL DEFAULT 0,
+        RatingSum INT NOT NULL DEFAULT 0,
+        Stars1 INT NOT NULL DEFAULT 0,
+        Stars2 INT NOT NULL DEFAULT 0,
+        Stars3 INT NOT NULL DEFAULT 0,
+        Stars4 INT NOT NULL DEFAULT 0,
+        Stars5 INT NOT NULL DEFAULT 0,
+        FOREIGN KEY (LawyerID) REFERENCES Users(UserID) ON DELETE CASCADE
+    );
+    """)
+    add_index(cursor, "Reviews", "idx_reviews_lawyer_review", "LawyerID, ReviewID")
+    add_index(cursor, "Reviews", "idx_reviews_lawyer_client", "LawyerID, ClientID")
+    # Pehle se maujood reviews se backfill
+    cursor.execute("""
+    INSERT INTO LawyerRatings (LawyerID, ReviewCount, RatingSum, Stars1, Stars2, Stars3, Stars4, Stars5)
+    SELECT LawyerID, COUNT(*), SUM(Rating), SUM(Rating = 1), SUM(Rating = 2), SUM(Rating = 3), SUM(Rating = 4), SUM(Rating = 5)
+    FROM Reviews WHERE LawyerID IS NOT NULL AND Rating BETWEEN 1 AND 5 GROUP BY LawyerID
+    ON DUPLICATE KEY UPDATE ReviewCount = VALUES(ReviewCount), RatingSum = VALUES(RatingSum), Stars1 = VALUES(Stars1),
+        Stars2 = VALUES(Stars2), Stars3 = VALUES(Stars3), Stars4 = VALUES(Stars4), Stars5 = VALUES(Stars5)
+    """)
+
+def review_aggregates_down(cursor):
+    cursor.execute("DROP TABLE IF EXISTS LawyerRatings")
+    drop_index(cursor, "Reviews", "idx_reviews_lawyer_client")
+    drop_index(cursor, "Reviews", "idx_reviews_lawyer_review")
+
+def chat_search_up(cursor):
+    # /api/chat/search ke liye; InnoDB har insert ke saath index update karta hai
+    add_index(cursor, "Messages", "ft_messages_text", "MessageText", kind='FULLTEXT')
+
+def chat_search_down(cursor):
+    drop_index(cursor, "Messages", "ft_messages_text")
+
+def user_events_up(cursor):
+    # Socket.IO push events ka shared log: har user ka ek contiguous Seq, saare workers/instances ka ek hi
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS UserEventSeq (
+        UserID INT PRIMARY KEY,
+        Seq BIGINT NOT NULL DEFAULT 0,
+        FOREIGN KEY (UserID) REFERENCES Users(UserID) ON DELETE CASCADE
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS UserEvents (
+        UserID INT NOT NULL,
+        Seq BIGINT NOT NULL,
+        EventType VARCHAR(50) NOT NULL,
+        Payload TEXT NOT NULL,
+        CreatedAt TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (UserID, Seq),
+        INDEX idx_user_events_created (CreatedAt),
+        FOREIGN KEY (UserID) REFERENCES Users(UserID) ON DELETE CASCADE
+    );
+    """)
+
+def user_events_down(cursor):
+    cursor.execute("DROP TABLE IF EXISTS UserEvents")
+    cursor.execute("DROP TABLE IF EXISTS UserEventSeq")
+
+MIGRATIONS = [
+    (1, 'initial_schema', initial_schema_up, initial_schema_down),
+    (2, 'message_paging', message_paging_up, message_paging_down),
+    (3, 'dashboard_indexes', dashboard_indexes_up, dashboard_indexes_down),
+    (4, 'unread_counters', unread_counters_up, unread_counters_down),
+    (5, 'working_hours', working_hours_up, working_hours_down),
+    (6, 'listing_indexes', listing_indexes_up, listing_indexes_down),
+    (7, 'review_aggregates', review_aggregates_up, review_aggregates_down),
+    (8, 'chat_search', chat_search_up, chat_search_down),
+    (9, 'user_events', user_events_up, user_events_down),
+]
+
+# ==================== RUNNER ====================
+
+def ensure_version_table(cursor):
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        Version INT PRIMARY KEY,
+        Name VARCHAR(255) NOT NULL,
+        AppliedAt DATETIME DEFAULT CURRENT_TIMESTAMP
+    );
+    """)
+
+def applied_versions(cursor):
+    cursor.execute("SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = DATABASE() AND table_name = 'schema_version'")
+    if cursor.fetchone()[0] == 0:
+        return set()
+    cursor.execute("SELECT Version FROM schema_version")
+    return {row[0] for row in cursor.fetchall()}
+
+def migrate_up(conn, target=None, dry_run=False):
+    # MySQL mein DDL auto-commit hota hai, isliye har migration ke baad hi version record hota hai
+    with conn.cursor() as cursor:
+        done = applied_versions(cursor)
+        runner = DryRunCursor(cursor) if dry_run else cursor
+        if not dry_run: ensure_version_table(cursor)
+        for version, name, up, _ in MIGRATIONS:
+            if version in done or (target is not None and version > target):
+                continue
+            print(f"--> {version} {name}")
+            up(runner)
+            if not dry_run:
+                cursor.execute("INSERT INTO schema_version (Version, Name) VALUES (%s, %s)", (version, name))
+                conn.commit()
+
+def migrate_down(conn, target, dry_run=False):
+    with conn.cursor() as cursor:
+        done = applied_versions(cursor)
+        runner = DryRunCursor(cursor) if dry_run else cursor
+        for version, name, _, down in reversed(MIGRATIONS):
+            if version not in done or version <= target:
+                continue
+            print(f"<-- {version} {name}")
+            down(runner)
+            if not dry_run:
+                cursor.execute("DELETE FROM schema_version WHERE Version = %s", (version,))
+                conn.commit()
+
+def show_status(conn):
+    with conn.cursor() as cursor:
+        done = applied_versions(cursor)
+    for version, name, _, _ in MIGRATIONS:
+        print(f"[{'x' if version in done else ' '}] {version} {name}")
+
+# ==================== EXPLAIN (dry-run) ====================
+
+SQL_PATTERN = re.compile(r'^\s*(SELECT\b.*\bFROM\b|UPDATE\b.*\bSET\b|DELETE\s+FROM\b)', re.IGNORECASE | re.DOTALL)
+
+# Runtime data se bante f-string hisse jinka koi static roop nahi; EXPLAIN ke liye ek representative value
+EXPLAIN_STANDINS = {
+    'filters': '',      # appointment_filters() ke optional AND clauses; khaali = bina filter wala plan
+    'rating': '5',      # Stars{rating} -> Stars5
+    'old_rating': '4',
+}
+
+class Unresolved(Exception):
+    pass
+
+def sample_value(node, scope):
+    # Expression ka ek representative SQL string: constants, module constants, "a if c else b" (pehli
+    # branch), sep.join([item] * n) (ek item) aur in sab se bane f-strings / + concatenation
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    if isinstance(node, ast.IfExp):
+        return sample_value(node.body, scope)
+    if isinstance(node, ast.Name):
+        if node.id in scope:
+            return scope[node.id]
+        raise Unresolved(node.id)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Add):
+        return sample_value(node.left, scope) + sample_value(node.right, scope)
+    if isinstance(node, ast.BinOp) and isinstance(node.op, ast.Mult) and isinstance(node.left, ast.List) and len(node.left.elts) == 1:
+        return sample_value(node.left.elts[0], scope)
+    if (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == 'join'
+            and isinstance(node.func.value, ast.Constant) and len(node.args) == 1):
+        return sample_value(node.args[0], scope)
+    if isinstance(node, ast.JoinedStr):
+        sql = ''
+        for part in node.values:
+            if isinstance(part, ast.Constant):
+                sql += part.value
+                continue
+            try:
+                sql += sample_value(part.value, scope)
+            except Unresolved:
+                # IN (...) ki placeholder list
+                if not sql.rstrip().endswith('('):
+                    raise
+                sql += '%s'
+        return sql
+    raise Unresolved(ast.unparse(node))
+
+def assigned_samples(statements, scope, evaluate=False):
+    # name = ... aur a, b = (x, y) if c else (p, q) jaise assignments se sample values.
+    # evaluate: module-level constants (jaise RATING_COLUMNS) jo sirf strings/range se bante hain, eval karo
+    scope = dict(scope)
+    for node in statements:
+        if not isinstance(node, ast.Assign) or len(node.targets) != 1:
+            continue
+        target, value = node.targets[0], node.value
+        if isinstance(value, ast.IfExp):
+            value = value.body
+        pairs = [(target, value)]
+        if isinstance(target, ast.Tuple) and isinstance(value, ast.Tuple) and len(target.elts) == len(value.elts):
+            pairs = list(zip(target.elts, value.elts))
+        for name, expr in pairs:
+            if isinstance(name, ast.Name):
+                try:
+                    scope[name.id] = sample_value(expr, scope)
+                except Unresolved:
+                    if evaluate:
+                        try:
+                            value = eval(compile(ast.Expression(expr), APP_FILE, 'eval'), {**scope, '__builtins__': {'range': range}})
+                        except Exception:
+                            continue
+                        if isinstance(value, str):
+                            scope[name.id] = value
+    return scope
+
+def app_queries():
+    # app.py ki SQL strings: (lineno, sql ya None, kyun explain nahi ho sakti). f-string ke {..} hisse
+    # module constants, function ke apne assignments ya EXPLAIN_STANDINS se bharte hain
+    with open(APP_FILE) as f:
+        tree = ast.parse(f.read())
+    module_scope = assigned_samples(tree.body, {}, evaluate=True)
+    scopes = [(tree, module_scope)] + [(node, assigned_samples(ast.walk(node), {**module_scope, **EXPLAIN_STANDINS}))
+                                       for node in ast.walk(tree) if isinstance(node, ast.FunctionDef)]
+    owner = {}
+    for scope_node, scope in scopes:
+        for node in ast.walk(scope_node):
+            owner[id(node)] = scope  # andar wala function baad mein aata hai, wahi jeetta hai
+    # Badi expression (f-string / concatenation) ke andar ke tukde alag se nahi chahiye
+    parts = {id(child) for node in ast.walk(tree) if isinstance(node, (ast.JoinedStr, ast.BinOp))
+             for child in ast.walk(node) if child is not node}
+    for node in ast.walk(tree):
+        if id(node) in parts or not isinstance(node, (ast.Constant, ast.JoinedStr, ast.BinOp)):
+            continue
+        if isinstance(node, ast.Constant) and not isinstance(node.value, str):
+            continue
+        static = ' '.join(n.value for n in ast.walk(node) if isinstance(n, ast.Constant) and isinstance(n.value, str))
+        try:
+            sql = sample_value(node, owner[id(node)])
+        except Unresolved as e:
+            if SQL_PATTERN.match(static):
+                yield node.lineno, None, f"{e} ka static roop nahi"
+            continue
+        if SQL_PATTERN.match(sql):
+            yield node.lineno, ' '.join(sql.split()), None
+
+def explain_queries(conn):
+    with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+        for lineno, sql, reason in sorted(app_queries(), key=lambda q: q[0]):
+            if sql is None:
+                print(f"\n-- app.py:{lineno}\n   not explainable: {reason}")
+                continue
+            # Placeholders ki jagah 1; plan dekhne ke liye kaafi hai
+            print(f"\n-- app.py:{lineno}\n{sql}")
+            try:
+                cursor.execute('EXPLAIN ' + sql.replace('%s', '1'))
+                for row in cursor.fetchall():
+                    print(f"   table={row.get('table')} type={row.get('type')} key={row.get('key')} "
+                          f"rows={row.get('rows')} extra={row.get('Extra')}")
+            except pymysql.MySQLError as e:
+                print(f"   EXPLAIN failed: {e}")
+    conn.rollback()
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="NyayConnect schema migrations")
+    arg_parser.add_argument('command', nargs='?', default='up', choices=['up', 'down', 'status'])
+    arg_parser.add_argument('--to', type=int, help="target version (down ke liye zaroori)")
+    arg_parser.add_argument('--dry-run', action='store_true', help="kuch apply mat karo, SQL aur EXPLAIN print karo")
+    args = arg_parser.parse_args()
+    if args.command == 'down' and args.to is None:
+        arg_parser.error("down ke liye --to VERSION do")
+
+    conn = None
     try:
-        # Connection details
-        conn = pymysql.connect(
-            host="nyayconnect.mysql.database.azure.com",
-            user="ujjwal",
-            password="Rinku78@", 
-            database="lawyer_app_db",
-            ssl_verify_cert=True
-        )
-        
-        with conn.cursor() as cursor:
-            print("Connecting to database...")
-            
-            # 1. Users Table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Users (
-                UserID INT AUTO_INCREMENT PRIMARY KEY,
-                Name VARCHAR(255) NOT NULL,
-                Email VARCHAR(255) UNIQUE NOT NULL,
-                Password VARCHAR(255) NOT NULL,
-                Role ENUM('Client', 'Lawyer') NOT NULL
-            );
-            """)
-            
-            # 2. Lawyer Profiles Table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS LawyerProfiles (
-                ProfileID INT AUTO_INCREMENT PRIMARY KEY,
-                UserID INT UNIQUE,
-                Bio TEXT,
-                Specializations VARCHAR(255),
-                Experience VARCHAR(100),
-                City VARCHAR(100),
-                ConsultationFee DECIMAL(10, 2),
-                FOREIGN KEY (UserID) REFERENCES Users(UserID) ON DELETE CASCADE
-            );
-            """)
-            
-            # 3. Appointments Table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Appointments (
-                AppointmentID INT AUTO_INCREMENT PRIMARY KEY,
-                ClientID INT,
-                LawyerID INT,
-                AppointmentDate DATETIME NOT NULL,
-                Notes TEXT,
-                Status ENUM('Pending', 'Confirmed', 'Cancelled', 'Completed') DEFAULT 'Pending',
-                FOREIGN KEY (ClientID) REFERENCES Users(UserID),
-                FOREIGN KEY (LawyerID) REFERENCES Users(UserID)
-            );
-            """)
-
-            # 4. Reviews Table
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Reviews (
-                ReviewID INT AUTO_INCREMENT PRIMARY KEY,
-                ClientID INT,
-                LawyerID INT,
-                Rating INT CHECK (Rating >= 1 AND Rating <= 5),
-                Comment TEXT,
-                CreatedAt DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (ClientID) REFERENCES Users(UserID),
-                FOREIGN KEY (LawyerID) REFERENCES Users(UserID)
-            );
-            """)
-
-            # 5. ChatRooms Table 
-            # (Ise Messages se pehle rakha hai taaki RoomID reference ho sake)
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS ChatRooms (
-                RoomID INT AUTO_INCREMENT PRIMARY KEY,
-                ClientID INT NOT NULL,
-                LawyerID INT NOT NULL,
-                CreatedAt DATETIME DEFAULT CURRENT_TIMESTAMP,
-                LastMessage TEXT,
-                LastMessageTime DATETIME,
-                UNIQUE KEY (ClientID, LawyerID),
-                FOREIGN KEY (ClientID) REFERENCES Users(UserID),
-                FOREIGN KEY (LawyerID) REFERENCES Users(UserID)
-            );
-            """)
-
-            # 6. Messages Table (FINAL VERSION with RoomID)
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS Messages (
-                MessageID INT AUTO_INCREMENT PRIMARY KEY,
-                RoomID INT NOT NULL,
-                SenderID INT NOT NULL,
-                MessageText TEXT NOT NULL,
-                Timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                IsRead BOOLEAN DEFAULT FALSE,
-                FOREIGN KEY (RoomID) REFERENCES ChatRooms(RoomID) ON DELETE CASCADE,
-                FOREIGN KEY (SenderID) REFERENCES Users(UserID)
-            );
-            """)
-            
-            conn.commit()
-            print("✅ Mubarak ho bhai! ChatRooms aur Messages ke saath script ready hai.")
-            
+        print("Connecting to database...")
+        conn = get_connection()
+        if args.command == 'status':
+            show_status(conn)
+        elif args.command == 'down':
+            migrate_down(conn, args.to, dry_run=args.dry_run)
+        else:
+            migrate_up(conn, args.to, dry_run=args.dry_run)
+        if args.dry_run:
+            explain_queries(conn)
+        print("✅ Migrations done.")
     except Exception as e:
         print(f"❌ Error aaya hai bhai: {e}")
+        raise SystemExit(1)
     finally:
-        if 'conn' in locals():
-            conn.close()
+        if conn: conn.close()
 
 if __name__ == "__main__":
-    create()
\ No newline at end of file
+    main()
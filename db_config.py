@@ -0,0 +1,30 @@
+import os
+
+import pymysql
+
+# app.py, create_tables.py aur benchmark.py ek hi env se ek hi server se baat karte hain.
+# Is module mein sirf settings hain (Flask/pool/migrations nahi), isliye kahin se bhi import karna sasta hai.
+#   DB_HOST     -> host, ya Cloud SQL ke liye /cloudsql/<instance> unix socket
+#   DB_PORT, DB_USER, DB_PASSWORD, DB_NAME
+#   DB_SSL=true -> server certificate verify karo
+DEFAULT_DB_PORT = 8889
+
+def connection_params():
+    params = {
+        'user': os.environ.get('DB_USER', 'root'),
+        'password': os.environ.get('DB_PASSWORD', 'root'),
+        'database': os.environ.get('DB_NAME', 'lawyer_app_db'),
+        'charset': 'utf8mb4',
+    }
+    db_host = os.environ.get('DB_HOST')
+    if db_host and db_host.startswith('/cloudsql/'):
+        params['unix_socket'] = db_host
+    else:
+        params['host'] = db_host or '127.0.0.1'
+        params['port'] = int(os.environ.get('DB_PORT', DEFAULT_DB_PORT))
+    if os.environ.get('DB_SSL', '').lower() == 'true':
+        params['ssl_verify_cert'] = True
+    return params
+
+def connect(**overrides):
+    return pymysql.connect(**dict(connection_params(), **overrides))
@@ -0,0 +1,26 @@
+import bcrypt
+
+# Ye functions process pool ke workers mein chalte hain, isliye yahan app.py import
+# nahi hota (warna har worker Flask app, DB pool aur Socket.IO bana dega).
+
+BCRYPT_MAX_BYTES = 72
+
+def _encode(password):
+    # bcrypt sirf pehle 72 bytes dekhta hai; naya bcrypt lamba password reject karta hai
+    return password.encode('utf-8')[:BCRYPT_MAX_BYTES]
+
+def hash_password(password, rounds):
+    return bcrypt.hashpw(_encode(password), bcrypt.gensalt(rounds)).decode('utf-8')
+
+def check_password(hashed_password, password):
+    try:
+        return bcrypt.checkpw(_encode(password), hashed_password.encode('utf-8'))
+    except ValueError:
+        return False
+
+def hash_rounds(hashed_password):
+    # "$2b$12$..." -> 12
+    try:
+        return int(hashed_password.split('$')[2])
+    except (IndexError, ValueError, AttributeError):
+        return None
@@ -0,0 +1,108 @@
+import os
+import sys
+import time
+
+import jwt
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module
+
+
+class FakeCursor:
+    # handler(sql, params) -> rows; SQL whitespace collapse karke diya jaata hai
+    def __init__(self, db):
+        self.db = db
+        self.rows = []
+        self.rowcount = 0
+        self.lastrowid = None
+
+    def execute(self, sql, params=None):
+        sql = ' '.join(sql.split())
+        self.db.log.append((sql, params))
+        result = self.db.handler(sql, params)
+        if isinstance(result, int):
+            self.rows, self.lastrowid = [], result
+        else:
+            self.rows = list(result or [])
+        self.rowcount = len(self.rows)
+        return self.rowcount
+
+    def executemany(self, sql, seq):
+        for params in seq:
+            self.execute(sql, params)
+
+    def fetchone(self):
+        return self.rows.pop(0) if self.rows else None
+
+    def fetchall(self):
+        rows, self.rows = self.rows, []
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self, *args, **kwargs):
+        return FakeCursor(self.db)
+
+    def begin(self):
+        pass
+
+    def commit(self):
+        self.db.log.append(('COMMIT', None))
+
+    def rollback(self):
+        self.db.log.append(('ROLLBACK', None))
+
+    def close(self):
+        pass
+
+
+class FakePool:
+    def __init__(self, handler=None):
+        self.handler = handler or (lambda sql, params: [])
+        self.log = []
+
+    def connection(self, shareable=False):
+        return FakeConnection(self)
+
+    def queries(self, prefix=''):
+        return [sql for sql, _ in self.log if sql.startswith(prefix)]
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    # fake_db(handler, replica=None) -> primary FakePool; app.pool ek RoutingPool ban jaata hai
+    def install(handler=None, replica=None):
+        primary = FakePool(handler)
+        monkeypatch.setattr(app_module, 'pool', app_module.RoutingPool(primary, replica))
+        return primary
+    return install
+
+
+@pytest.fixture
+def make_token():
+    def make(user_id, role='Client', expires_in=3600):
+        payload = {'UserID': user_id, 'Role': role, 'exp': int(time.time()) + expires_in}
+        return jwt.encode(payload, app_module.app.config['SECRET_KEY'], algorithm='HS256')
+    return make
+
+
+@pytest.fixture
+def client():
+    return app_module.app.test_client()
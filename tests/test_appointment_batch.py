@@ -0,0 +1,148 @@
+import datetime
+
+import pytest
+
+import app as app_module
+
+MONDAY = datetime.date(2030, 1, 7)
+LAWYER, CLIENT = 2, 7
+
+
+def at(hour, minute=0):
+    return datetime.datetime.combine(MONDAY, datetime.time(hour, minute))
+
+
+class AppointmentTables:
+    # Sirf batch routes ki queries: lawyer ki appointments, Users, aur UserEventSeq
+    def __init__(self, appointments=(), taken=()):
+        self.appointments = {row['AppointmentID']: row for row in appointments}
+        self.taken = list(taken)
+        self.seqs = {}
+        self.next_id = 100
+
+    def __call__(self, sql, params):
+        if sql.startswith('SELECT AppointmentID, ClientID, AppointmentDate, Status FROM Appointments'):
+            lawyer_id, *ids = params
+            return [self.appointments[i] for i in sorted(ids) if i in self.appointments and self.appointments[i]['LawyerID'] == lawyer_id]
+        if sql.startswith('SELECT UserID FROM Users'):
+            return [{'UserID': user_id} for user_id in params if user_id == LAWYER]
+        if sql.startswith('SELECT LawyerID, AppointmentDate FROM Appointments'):
+            return [{'LawyerID': LAWYER, 'AppointmentDate': start} for start in self.taken]
+        if sql.startswith('INSERT INTO Appointments'):
+            self.next_id += 1
+            return self.next_id
+        if sql.startswith('INSERT INTO UserEventSeq'):
+            user_id, _, count = params
+            self.seqs[user_id] = self.seqs.get(user_id, 0) + count
+            return self.seqs[user_id]
+        return []
+
+
+def appointment(appointment_id, lawyer_id=LAWYER, status='Pending'):
+    return {'AppointmentID': appointment_id, 'LawyerID': lawyer_id, 'ClientID': CLIENT, 'AppointmentDate': at(10), 'Status': status}
+
+
+@pytest.fixture
+def lawyer(monkeypatch):
+    monkeypatch.setattr(app_module, 'get_working_hours', lambda lawyer_id: app_module.DEFAULT_WORKING_HOURS)
+    monkeypatch.setattr(app_module, 'get_booked_starts', lambda lawyer_id: [])
+    monkeypatch.setattr(app_module, 'app_now', lambda: at(8) - datetime.timedelta(days=1))
+
+
+def put(client, make_token, updates, atomic=False):
+    headers = {'Authorization': f'Bearer {make_token(LAWYER, role="Lawyer")}'}
+    return client.put('/api/appointments/batch', json={'updates': updates, 'atomic': atomic}, headers=headers)
+
+
+def post(client, make_token, bookings, atomic=False):
+    headers = {'Authorization': f'Bearer {make_token(CLIENT)}'}
+    return client.post('/api/appointments/batch', json={'bookings': bookings, 'atomic': atomic}, headers=headers)
+
+
+def test_status_batch_locks_owned_rows(client, fake_db, make_token):
+    db = fake_db(AppointmentTables([appointment(1), appointment(2)]))
+
+    response = put(client, make_token, [{'appointmentId': 2, 'status': 'Confirmed'}, {'appointmentId': 1, 'status': 'Cancelled'}])
+
+    assert response.status_code == 200 and response.json['applied'] == 2
+    select, params = next((sql, params) for sql, params in db.log if sql.startswith('SELECT AppointmentID'))
+    assert select.endswith('ORDER BY AppointmentID FOR UPDATE') and params == (LAWYER, 1, 2)
+    assert len(db.queries('UPDATE Appointments')) == 1
+
+
+def test_status_batch_applies_valid_items_and_reports_the_rest(client, fake_db, make_token):
+    db = fake_db(AppointmentTables([appointment(1), appointment(3, lawyer_id=9)]))
+
+    response = put(client, make_token, [
+        {'appointmentId': 1, 'status': 'Confirmed'},
+        {'appointmentId': 1, 'status': 'Completed'},
+        {'appointmentId': 3, 'status': 'Confirmed'},
+        {'appointmentId': 4, 'status': 'Pending'},
+        {'status': 'Confirmed'},
+    ])
+
+    body = response.json
+    assert response.status_code == 200 and not body['success']
+    assert (body['applied'], body['failed']) == (1, 4)
+    assert [r['success'] for r in body['results']] == [True, False, False, False, False]
+    assert [r.get('message') for r in body['results'][1:]] == [
+        "Duplicate appointmentId in batch.",
+        "Appointment not found or you don't have permission.",
+        "Invalid status provided.",
+        "appointmentId is required.",
+    ]
+    sql, params = next((sql, params) for sql, params in db.log if sql.startswith('UPDATE Appointments'))
+    assert params == (1, 'Confirmed', 1)
+
+
+def test_atomic_status_batch_applies_nothing_on_failure(client, fake_db, make_token):
+    db = fake_db(AppointmentTables([appointment(1)]))
+
+    response = put(client, make_token, [{'appointmentId': 1, 'status': 'Confirmed'}, {'appointmentId': 3, 'status': 'Confirmed'}], atomic=True)
+
+    assert response.status_code == 409
+    assert response.json['applied'] == 0
+    assert response.json['results'][0]['message'] == "Not applied: another item in this atomic batch failed."
+    assert db.queries('UPDATE') == [] and db.queries('INSERT') == []
+    assert db.queries('COMMIT') == [] and db.queries('ROLLBACK')
+
+
+def test_status_events_are_written_before_commit(client, fake_db, make_token):
+    db = fake_db(AppointmentTables([appointment(1)]))
+
+    assert put(client, make_token, [{'appointmentId': 1, 'status': 'Confirmed'}], atomic=True).status_code == 200
+
+    order = [sql.split(' (')[0] for sql, _ in db.log]
+    assert order.index('INSERT INTO UserEvents') < order.index('COMMIT')
+
+
+def test_bookings_in_one_batch_cannot_overlap(client, fake_db, make_token, lawyer):
+    db = fake_db(AppointmentTables(taken=[at(14)]))
+
+    response = post(client, make_token, [
+        {'lawyerId': LAWYER, 'appointmentDate': '2030-01-07T10:00:00'},
+        {'lawyerId': LAWYER, 'appointmentDate': '2030-01-07T10:15:00'},
+        {'lawyerId': LAWYER, 'appointmentDate': '2030-01-07T10:30:00'},
+        {'lawyerId': LAWYER, 'appointmentDate': '2030-01-07T14:00:00'},
+    ])
+
+    results = response.json['results']
+    assert response.status_code == 200 and response.json['applied'] == 2
+    assert [r['success'] for r in results] == [True, False, True, False]
+    assert results[1]['message'] == results[3]['message'] == "This slot is already booked."
+    # Har row ka apna lastrowid
+    assert [r.get('appointmentId') for r in results] == [101, None, 102, None]
+    assert len(db.queries('INSERT INTO Appointments')) == 2
+
+
+def test_atomic_booking_batch_is_409_and_inserts_nothing(client, fake_db, make_token, lawyer):
+    db = fake_db(AppointmentTables())
+
+    response = post(client, make_token, [
+        {'lawyerId': LAWYER, 'appointmentDate': '2030-01-07T10:00:00'},
+        {'lawyerId': 5, 'appointmentDate': '2030-01-07T11:00:00'},
+    ], atomic=True)
+
+    assert response.status_code == 409 and response.json['applied'] == 0
+    assert response.json['results'][1]['message'] == "Lawyer not found."
+    assert db.queries('INSERT') == [] and db.queries('COMMIT') == [] and db.queries('ROLLBACK')
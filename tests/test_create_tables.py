@@ -0,0 +1,22 @@
+import re
+
+import create_tables
+
+
+def test_every_app_query_is_explainable():
+    queries = list(create_tables.app_queries())
+    assert queries
+    assert [(lineno, reason) for lineno, sql, reason in queries if sql is None] == []
+
+
+def test_interpolations_are_filled_not_dropped():
+    # Khaali {..} se bane tukde: "SELECT FROM", ", FROM", "AND = %s", "SET = 0", "= WHERE"
+    broken = re.compile(r'SELECT FROM|, FROM|\b(AND|WHERE|SET) =|= WHERE|IN \(\)')
+    for lineno, sql, _ in create_tables.app_queries():
+        assert not broken.search(sql), f"app.py:{lineno}: {sql}"
+
+
+def test_shared_query_constants_are_resolved():
+    sqls = [sql for _, sql, _ in create_tables.app_queries()]
+    assert any(sql.endswith('WHERE u.UserID IN (%s)') and 'Stars5' in sql for sql in sqls)
+    assert any(sql.endswith("WHERE u.Role = 'Lawyer' AND u.UserID = %s") for sql in sqls)
@@ -0,0 +1,145 @@
+import threading
+
+import pytest
+
+import app as app_module
+
+
+class LawyerTables:
+    # LAWYER_DIRECTORY_QUERY ka fake: full reload aur single-lawyer refresh alag gate par ruk sakte hain
+    def __init__(self):
+        self.fees = {1: 100, 2: 200}
+        self.full_calls = 0
+        self.full_gate, self.full_entered = threading.Event(), threading.Event()
+        self.refresh_gate, self.refresh_entered = threading.Event(), threading.Event()
+        self.full_gate.set()
+        self.refresh_gate.set()
+        self.refresh_error = None
+
+    def row(self, user_id):
+        return {'UserID': user_id, 'Name': f'Lawyer {user_id}', 'City': 'Delhi', 'Specializations': 'Tax',
+                'ConsultationFee': self.fees[user_id], 'ReviewCount': 0, 'RatingSum': 0, 'Bio': ''}
+
+    def __call__(self, sql, params):
+        if sql.endswith('AND u.UserID = %s'):
+            if self.refresh_error: raise self.refresh_error
+            rows = [self.row(params[0])] if params[0] in self.fees else []
+            gate = self.refresh_gate
+            self.refresh_entered.set()
+            assert gate.wait(5)
+            return rows
+        if 'FROM Users u' in sql:
+            self.full_calls += 1
+            rows = [self.row(user_id) for user_id in sorted(self.fees)]
+            self.full_entered.set()
+            assert self.full_gate.wait(5)
+            return rows
+        return []
+
+
+@pytest.fixture
+def tables(fake_db):
+    tables = LawyerTables()
+    fake_db(tables)
+    return tables
+
+
+@pytest.fixture
+def directory(tables):
+    return app_module.LawyerDirectory(ttl=60)
+
+
+def fees(directory):
+    return {row['UserID']: row['ConsultationFee'] for row in directory.all()}
+
+
+def start(target, *args):
+    thread = threading.Thread(target=target, args=args)
+    thread.start()
+    return thread
+
+
+def test_concurrent_first_loads_run_one_query_outside_the_lock(tables, directory):
+    tables.full_gate.clear()
+    threads = [start(directory.ensure_loaded) for _ in range(5)]
+    assert tables.full_entered.wait(5)
+
+    # DB I/O ke dauran lock free hai
+    assert directory.lock.acquire(timeout=1)
+    directory.lock.release()
+    tables.full_gate.set()
+    for thread in threads: thread.join(5)
+
+    assert tables.full_calls == 1
+    assert fees(directory) == {1: 100, 2: 200}
+
+
+def test_stale_entries_are_served_during_reload(tables, directory):
+    directory.ensure_loaded()
+    directory.loaded_at = 0
+    tables.fees[1] = 150
+    tables.full_gate.clear()
+    tables.full_entered.clear()
+    reload = start(directory.ensure_loaded)
+    assert tables.full_entered.wait(5)
+
+    assert fees(directory) == {1: 100, 2: 200}
+    tables.full_gate.set()
+    reload.join(5)
+    assert fees(directory) == {1: 150, 2: 200} and tables.full_calls == 2
+
+
+def test_refresh_during_reload_survives_the_swap(tables, directory):
+    directory.ensure_loaded()
+    directory.loaded_at = 0
+    tables.full_gate.clear()
+    tables.full_entered.clear()
+    reload = start(directory.ensure_loaded)
+    assert tables.full_entered.wait(5)
+
+    # Reload ki row (fee 100) refresh (fee 999) se pehle padhi gayi thi
+    tables.fees[1] = 999
+    directory.refresh(1)
+    tables.fees[1] = 100
+    tables.full_gate.set()
+    reload.join(5)
+
+    assert fees(directory)[1] == 999
+
+
+def test_older_refresh_does_not_overwrite_newer(tables, directory):
+    directory.ensure_loaded()
+    tables.fees[1] = 300
+    older_gate = tables.refresh_gate = threading.Event()
+    tables.refresh_entered.clear()
+    older = start(directory.refresh, 1)
+    assert tables.refresh_entered.wait(5)
+
+    tables.fees[1] = 400
+    tables.refresh_gate = threading.Event()
+    tables.refresh_gate.set()
+    directory.refresh(1)
+    assert fees(directory)[1] == 400
+
+    # Pehle shuru hua refresh (fee 300 padh chuka) ab khatam hota hai
+    older_gate.set()
+    older.join(5)
+    assert fees(directory)[1] == 400
+
+
+def test_refresh_removes_lawyer_that_is_gone(tables, directory):
+    directory.ensure_loaded()
+    del tables.fees[2]
+    directory.refresh(2)
+    assert fees(directory) == {1: 100}
+
+
+def test_failed_refresh_forces_full_reload(tables, directory):
+    directory.ensure_loaded()
+    tables.fees[1] = 500
+    tables.refresh_error = RuntimeError('connection lost')
+
+    directory.refresh(1)
+
+    assert directory.loaded_at == 0
+    assert fees(directory) == {1: 500, 2: 200} and tables.full_calls == 2
@@ -0,0 +1,128 @@
+import pymysql
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def rooms(monkeypatch):
+    monkeypatch.setattr(app_module, 'room_participants', lambda room_id: (7, 2))
+    monkeypatch.setattr(app_module, 'on_room_changed', lambda room_id: None)
+
+
+def messages(*room_ids):
+    return [app_module.PendingMessage(room_id, 7, f'message {i}') for i, room_id in enumerate(room_ids)]
+
+
+def test_rejected_row_fails_alone(fake_db, rooms):
+    def handler(sql, params):
+        if sql.startswith('INSERT INTO Messages'):
+            if 99 in params[0::3]:
+                raise pymysql.err.IntegrityError(1452, 'foreign key')
+            return 500
+    db = fake_db(handler)
+    batch = messages(5, 99, 5)
+
+    app_module.MessageWriter(10, 0.01, 2, False).flush(batch)
+
+    assert [m.saved for m in batch] == [True, False, True]
+    assert all(m.done.is_set() for m in batch)
+    assert db.queries('COMMIT') == ['COMMIT', 'COMMIT']
+
+
+def test_outage_requeues_whole_batch_in_order(fake_db, rooms, monkeypatch):
+    def handler(sql, params):
+        if sql.startswith('INSERT INTO Messages'):
+            raise pymysql.err.OperationalError(2003, 'down')
+    db = fake_db(handler)
+    monkeypatch.setattr(app_module.time, 'sleep', lambda seconds: None)
+    writer = app_module.MessageWriter(10, 0.01, 2, False)
+    batch = messages(5, 6, 7)
+
+    writer.flush(batch)
+
+    # Connection error par baaki rows alag alag try nahi hoti
+    assert len(db.queries('INSERT INTO Messages')) == 2
+    assert list(writer.queue) == batch
+    assert [m.attempts for m in batch] == [1, 1, 1]
+    assert not any(m.done.is_set() for m in batch)
+
+
+def test_gives_up_after_max_retries(fake_db, rooms, monkeypatch):
+    monkeypatch.setattr(app_module.time, 'sleep', lambda seconds: None)
+    writer = app_module.MessageWriter(10, 0.01, 1, False)
+    message, = messages(5)
+
+    writer.requeue([message])
+    assert writer.queue.popleft() is message and not message.done.is_set()
+    writer.requeue([message])
+
+    assert message.done.is_set() and message.saved is False
+    assert not writer.queue
+
+
+def test_durable_mode_uses_durable_retry_limit(fake_db, rooms, monkeypatch):
+    monkeypatch.setattr(app_module.time, 'sleep', lambda seconds: None)
+    monkeypatch.setattr(app_module, 'CHAT_DURABLE_RETRIES', 3)
+    writer = app_module.MessageWriter(10, 0.01, 0, True)
+    message, = messages(5)
+
+    for _ in range(3):
+        writer.requeue([message])
+        assert writer.queue.popleft() is message
+    writer.requeue([message])
+
+    assert message.saved is False
+
+
+def test_submitted_message_survives_short_outage(fake_db, rooms):
+    failures = {'left': 2}
+
+    def handler(sql, params):
+        if sql.startswith('INSERT INTO Messages'):
+            if failures['left'] > 0:
+                failures['left'] -= 1
+                raise pymysql.err.OperationalError(2013, 'lost connection')
+            return 41
+    fake_db(handler)
+    writer = app_module.MessageWriter(10, 0.01, 3, False)
+    saved = []
+
+    message = writer.submit(5, 7, 'hello')
+    message.on_done(lambda m: saved.append(m.saved))
+
+    assert message.wait(5)
+    writer.stop()
+    assert message.saved is True and message.attempts == 1 and message.message_id == 41
+    assert saved == [True]
+
+
+def test_batch_insert_is_one_statement_and_assigns_ids(fake_db, rooms):
+    def handler(sql, params):
+        if sql.startswith('SELECT @@auto_increment_increment'):
+            return [{'step': 2}]
+        if sql.startswith('INSERT INTO Messages'):
+            return 101
+    db = fake_db(handler)
+    batch = messages(5, 6, 5)
+
+    app_module.MessageWriter(10, 0.01, 2, False).flush(batch)
+
+    inserts = db.queries('INSERT INTO Messages')
+    assert len(inserts) == 1 and inserts[0].count('(%s, %s, %s)') == 3
+    assert [m.message_id for m in batch] == [101, 103, 105]
+
+
+def test_failed_commit_leaves_no_message_id(fake_db, rooms, monkeypatch):
+    def handler(sql, params):
+        if sql.startswith('INSERT INTO Messages'):
+            return 7
+        if sql.startswith('UPDATE ChatRooms'):
+            raise pymysql.err.OperationalError(2013, 'lost connection')
+    fake_db(handler)
+    monkeypatch.setattr(app_module.time, 'sleep', lambda seconds: None)
+    batch = messages(5)
+
+    app_module.MessageWriter(10, 0.01, 2, False).flush(batch)
+
+    assert batch[0].message_id is None and not batch[0].done.is_set()
@@ -0,0 +1,107 @@
+import decimal
+import json
+
+import pytest
+
+import app as app_module
+from conftest import FakePool
+
+LAWYERS = {201, 202, 203, 204}
+MISSING = {999}
+
+
+def profile_rows(sql, params):
+    if not sql.startswith('SELECT u.UserID, u.Name, u.Email, u.Role'):
+        return []
+    return [{
+        'UserID': user_id, 'Name': f'User {user_id}', 'Email': f'{user_id}@example.com',
+        'Role': 'Lawyer' if user_id in LAWYERS else 'Client', 'Bio': 'Tax matters', 'Specializations': 'Tax',
+        'Experience': '5', 'ConsultationFee': decimal.Decimal('500.00'), 'City': 'Delhi',
+        'ReviewCount': 2, 'RatingSum': 9, 'Stars1': 0, 'Stars2': 0, 'Stars3': 0, 'Stars4': 1, 'Stars5': 1,
+    } for user_id in params if user_id not in MISSING]
+
+
+@pytest.fixture
+def documents(fake_db, monkeypatch, tmp_path):
+    replica = FakePool(profile_rows)
+    primary = fake_db(profile_rows, replica=replica)
+    documents = app_module.ProfileDocuments(100, 60, str(tmp_path / 'profiles.json'))
+    monkeypatch.setattr(app_module, 'profile_documents', documents)
+    return documents, primary, replica
+
+
+def test_public_profile_is_built_from_primary(client, documents):
+    _, primary, replica = documents
+
+    response = client.get('/api/lawyers/201')
+
+    assert response.status_code == 200
+    assert response.json['UserID'] == 201 and response.json['RatingAverage'] == 4.5
+    assert replica.log == [] and len(primary.queries('SELECT u.UserID')) == 1
+    client.get('/api/lawyers/201', headers={'Cache-Control': 'no-cache'})
+    assert len(primary.queries('SELECT u.UserID')) == 1
+
+
+@pytest.mark.parametrize('user_id', [301, 999])
+def test_non_lawyer_or_missing_user_is_404(client, documents, user_id):
+    assert client.get(f'/api/lawyers/{user_id}').status_code == 404
+
+
+def test_own_profile_is_rebuilt_on_every_read(client, documents, make_token):
+    _, primary, _ = documents
+    headers = {'Authorization': f'Bearer {make_token(202, role="Lawyer")}'}
+
+    first = client.get('/api/my-lawyer-profile', headers=headers)
+    client.get('/api/my-lawyer-profile', headers=headers)
+
+    assert first.status_code == 200 and first.json['profile']['UserID'] == 202
+    assert len(primary.queries('SELECT u.UserID')) == 2
+
+
+def test_snapshot_stores_ids_and_reloads_from_primary(documents):
+    documents, primary, _ = documents
+    documents.build_many([203, 204, 301])
+    documents.save_snapshot()
+
+    with open(documents.snapshot_path, encoding='utf-8') as f:
+        assert sorted(json.load(f)) == [203, 204]
+
+    fresh = app_module.ProfileDocuments(100, 60, documents.snapshot_path)
+    assert fresh.load_snapshot() == 2
+    assert fresh.cache.get(203)[0] is not None
+
+
+def test_missing_profiles_are_cached_until_the_user_registers(client, documents, monkeypatch):
+    documents, primary, _ = documents
+    monkeypatch.setattr(f'{__name__}.MISSING', {999, 205})
+    lookups = lambda: len(primary.queries('SELECT u.UserID'))
+
+    assert client.get('/api/lawyers/205').status_code == 404
+    assert client.get('/api/lawyers/205/availability').status_code == 404
+    assert client.get('/api/lawyers/205', headers={'Cache-Control': 'no-cache'}).status_code == 404
+    assert lookups() == 1
+    assert documents.cache.get(205) == app_module.MISSING_PROFILE
+
+    # Registration: on_lawyer_changed cached miss hata kar document bana deta hai
+    monkeypatch.setattr(f'{__name__}.MISSING', {999})
+    monkeypatch.setattr(f'{__name__}.LAWYERS', LAWYERS | {205})
+    app_module.on_lawyer_changed(205)
+    assert documents.cache.get(205)[0] is not None
+    assert client.get('/api/lawyers/205').status_code == 200
+
+
+def test_corrupt_snapshot_is_ignored(documents):
+    documents, _, _ = documents
+    with open(documents.snapshot_path, 'w', encoding='utf-8') as f:
+        f.write('{not json')
+    assert documents.load_snapshot() == 0
+
+
+def test_build_started_before_rebuild_does_not_overwrite_it(documents):
+    documents, _, _ = documents
+    token = documents.cache.fill_token()
+    documents.rebuild(204)
+    rebuilt = documents.cache.get(204)
+
+    assert not documents.cache.set_if_fresh(204, ('stale', 'stale'), token)
+    assert documents.cache.get(204) is rebuilt
@@ -0,0 +1,97 @@
+import flask
+import pymysql
+import pytest
+
+import app as app_module
+from conftest import FakePool
+
+
+def read_context(user_id=None):
+    context = app_module.app.test_request_context('/')
+    context.push()
+    flask.g.db_read_only = True
+    if user_id is not None:
+        flask.g.current_user_id = user_id
+    return context
+
+
+def run(pool):
+    connection = pool.connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            return cursor.fetchall()
+    finally:
+        connection.close()
+
+
+@pytest.fixture
+def pools():
+    primary, replica = FakePool(lambda sql, params: [{'db': 'primary'}]), FakePool(lambda sql, params: [{'db': 'replica'}])
+    return primary, replica, app_module.RoutingPool(primary, replica)
+
+
+def test_reads_go_to_replica_only_inside_read_routes(pools):
+    primary, replica, pool = pools
+    assert run(pool) == [{'db': 'primary'}]
+    context = read_context()
+    try:
+        assert run(pool) == [{'db': 'replica'}]
+    finally:
+        context.pop()
+
+
+def test_recent_writer_reads_from_primary(pools):
+    primary, replica, pool = pools
+    pool.remember_writer(5)
+    context = read_context(user_id=5)
+    try:
+        assert run(pool) == [{'db': 'primary'}]
+        assert pool.counters['sticky_reads'] == 1
+    finally:
+        context.pop()
+
+
+def test_connection_lost_after_checkout_fails_over_to_primary(pools):
+    primary, _, pool = pools
+
+    def lost(sql, params):
+        raise pymysql.err.OperationalError(2013, 'Lost connection')
+    pool.replica = FakePool(lost)
+    context = read_context()
+    try:
+        assert run(pool) == [{'db': 'primary'}]
+        assert pool.counters['replica_fallbacks'] == 1
+        assert pool.replica_down_until > 0
+        # Replica ko kuch der chhod diya jaata hai
+        assert not isinstance(pool.connection(), app_module.ReplicaConnection)
+    finally:
+        context.pop()
+
+
+def test_query_errors_on_replica_are_not_retried(pools):
+    primary, _, pool = pools
+
+    def bad_sql(sql, params):
+        raise pymysql.err.ProgrammingError(1064, 'syntax')
+    pool.replica = FakePool(bad_sql)
+    context = read_context()
+    try:
+        with pytest.raises(pymysql.err.ProgrammingError):
+            run(pool)
+        assert primary.log == [] and pool.replica_down_until == 0
+    finally:
+        context.pop()
+
+
+def test_cache_fill_after_invalidation_reads_primary(pools):
+    primary, replica, pool = pools
+    app_module.resource_versions.bump(('dashboard', 41))
+    context = read_context()
+    try:
+        app_module.fill_from_primary(('dashboard', 42))
+        assert run(pool) == [{'db': 'replica'}]
+        app_module.fill_from_primary(('dashboard', 41))
+        assert run(pool) == [{'db': 'primary'}]
+    finally:
+        context.pop()
@@ -0,0 +1,132 @@
+import datetime
+
+import pytest
+from dateutil import tz
+
+import app as app_module
+
+MONDAY = datetime.date(2030, 1, 7)
+
+
+def at(hour, minute=0, day=MONDAY):
+    return datetime.datetime.combine(day, datetime.time(hour, minute))
+
+
+@pytest.fixture
+def ist(monkeypatch):
+    monkeypatch.setattr(app_module, 'APP_TIMEZONE', tz.gettz('Asia/Kolkata'))
+
+
+@pytest.fixture
+def lawyer(monkeypatch):
+    # Default hours (Mon-Sat 10-18), koi booking nahi, "abhi" = Monday se pehle
+    monkeypatch.setattr(app_module, 'get_working_hours', lambda lawyer_id: app_module.DEFAULT_WORKING_HOURS)
+    monkeypatch.setattr(app_module, 'get_booked_starts', lambda lawyer_id: [])
+    monkeypatch.setattr(app_module, 'app_now', lambda: at(8, day=MONDAY - datetime.timedelta(days=1)))
+
+
+def test_utc_input_is_converted_to_app_time(ist):
+    assert app_module.parse_appointment_time('2030-01-07T04:30:00Z') == at(10)
+    assert app_module.parse_appointment_time('2030-01-07T10:00:00+05:30') == at(10)
+
+
+def test_naive_input_is_app_local_time(ist):
+    assert app_module.parse_appointment_time('2030-01-07T10:00:00.123') == at(10)
+
+
+def test_utc_booking_inside_ist_hours_is_accepted(ist, lawyer):
+    start = app_module.parse_appointment_time('2030-01-07T04:30:00Z')
+    assert app_module.booking_error(2, start) is None
+
+
+def test_booking_stores_app_local_time(ist, lawyer, fake_db, client, make_token):
+    def handler(sql, params):
+        if sql.startswith('SELECT UserID FROM Users'):
+            return [{'UserID': 2}]
+        if sql.startswith('INSERT INTO Appointments'):
+            return 31
+        if sql.startswith('INSERT INTO UserEventSeq'):
+            return params[1]
+        return []
+    db = fake_db(handler)
+    headers = {'Authorization': f'Bearer {make_token(7)}'}
+
+    response = client.post('/api/appointments', json={'lawyerId': 2, 'appointmentDate': '2030-01-07T04:30:00.000Z'}, headers=headers)
+
+    assert response.status_code == 201 and response.json['appointmentId'] == 31
+    insert = next(params for sql, params in db.log if sql.startswith('INSERT INTO Appointments'))
+    assert insert[2] == '2030-01-07 10:00:00'
+
+
+def test_app_now_is_wall_clock_in_app_timezone(ist):
+    utc_now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+    assert abs(app_module.app_now() - utc_now - datetime.timedelta(hours=5, minutes=30)) < datetime.timedelta(seconds=5)
+
+
+@pytest.mark.parametrize('start, taken', [
+    (at(9, 31), True), (at(10), True), (at(10, 29), True),
+    (at(9, 30), False), (at(10, 30), False), (at(11), False), (at(12), True),
+])
+def test_slot_taken_is_half_open(start, taken):
+    # Booked: 10:00-10:30 aur 12:00-12:30
+    assert app_module.slot_taken([at(10), at(12)], start) is taken
+
+
+def test_free_slots_skip_booked_and_past(lawyer, monkeypatch):
+    monkeypatch.setattr(app_module, 'get_booked_starts', lambda lawyer_id: [at(10, 30), at(11, 15)])
+    monkeypatch.setattr(app_module, 'app_now', lambda: at(9, 45))
+
+    starts = [slot['start'] for slot in app_module.free_slots(2, MONDAY, MONDAY)]
+
+    assert starts[:3] == [at(10), at(12), at(12, 30)]
+    assert starts[-1] == at(17, 30) and len(starts) == 13
+    # Sunday (weekday 6) default hours mein nahi hai
+    assert app_module.free_slots(2, MONDAY - datetime.timedelta(days=1), MONDAY - datetime.timedelta(days=1)) == []
+
+
+@pytest.mark.parametrize('start, error', [
+    (at(10), None),
+    (at(17, 30), None),
+    (at(9, 59), 'outside'),
+    (at(17, 45), 'outside'),
+    (at(10) - datetime.timedelta(days=2), 'future'),
+    (at(10) + datetime.timedelta(days=6), 'outside'),
+])
+def test_booking_error(lawyer, start, error):
+    message = app_module.booking_error(2, start)
+    assert message is None if error is None else error in message
+
+
+def test_booking_error_rejects_slot_crossing_midnight(lawyer, monkeypatch):
+    monkeypatch.setattr(app_module, 'get_working_hours', lambda lawyer_id: [(0, datetime.time(20), datetime.time(23, 59))])
+    assert app_module.booking_error(2, at(23, 30)) is not None
+    assert app_module.booking_error(2, at(23, 15)) is None
+
+
+@pytest.fixture
+def slots_cache(monkeypatch):
+    cache = app_module.TTLCache(maxsize=10, ttl=60)
+    monkeypatch.setattr(app_module, 'booked_slots_cache', cache)
+    return cache
+
+
+def test_remember_booking_inserts_into_a_copy(slots_cache):
+    cached = [at(10), at(12)]
+    slots_cache.set(2, cached)
+
+    app_module.remember_booking(2, at(11))
+
+    assert slots_cache.get(2) == [at(10), at(11), at(12)]
+    assert cached == [at(10), at(12)]
+
+
+def test_remember_booking_skips_uncached_lawyer(slots_cache):
+    app_module.remember_booking(2, at(11))
+    assert slots_cache.get(2) is None
+
+
+def test_remember_booking_rejects_fill_started_before_it(slots_cache):
+    token = slots_cache.fill_token()
+    app_module.remember_booking(2, at(11))
+    assert not slots_cache.set_if_fresh(2, [], token)
+    assert slots_cache.get(2) is None
@@ -0,0 +1,87 @@
+import time
+
+import pytest
+
+import app as app_module
+
+
+@pytest.fixture
+def room(fake_db, monkeypatch):
+    # Room 5: client 7, lawyer 2; messages turant "save" ho jaate hain
+    fake_db(lambda sql, params: [{'ClientID': 7, 'LawyerID': 2}] if 'ChatRooms' in sql else [])
+
+    def submit(room_id, sender_id, text):
+        message = app_module.PendingMessage(room_id, sender_id, text)
+        message.message_id = 900
+        message.finish(True)
+        return message
+    monkeypatch.setattr(app_module.message_writer, 'submit', submit)
+    monkeypatch.setattr(app_module.message_writer, 'durable', False)
+
+
+def connect(auth=None):
+    return app_module.socketio.test_client(app_module.app, auth=auth)
+
+
+def test_connection_without_token_is_refused():
+    assert not connect().is_connected()
+
+
+@pytest.mark.parametrize('token', ['not-a-jwt', ''])
+def test_connection_with_invalid_token_is_refused(token):
+    assert not connect({'token': token}).is_connected()
+
+
+def test_connection_with_expired_token_is_refused(make_token):
+    assert not connect({'token': make_token(7, expires_in=-10)}).is_connected()
+
+
+def test_socket_is_dropped_once_its_token_expires(room, make_token):
+    client = connect({'token': make_token(7)})
+    assert client.is_connected()
+    sid, (user_id, role, rooms, exp) = next((sid, user) for sid, user in app_module.socket_users.items() if user[0] == 7)
+    app_module.socket_users[sid] = (user_id, role, rooms, time.time() - 1)
+
+    client.emit('join_room', {'room_id': 5})
+
+    assert not client.is_connected()
+    assert sid not in app_module.socket_users
+
+
+def test_non_member_cannot_join_room(room, make_token):
+    client = connect({'token': make_token(8)})
+    client.emit('join_room', {'room_id': 5})
+    assert [m['name'] for m in client.get_received()] == ['join_error']
+    client.disconnect()
+
+
+def test_room_rate_limit_is_per_sender(room, make_token, monkeypatch):
+    monkeypatch.setattr(app_module, 'room_buckets', app_module.TokenBuckets(0.001, 2, maxsize=100))
+    monkeypatch.setattr(app_module, 'connection_buckets', app_module.TokenBuckets(0.001, 100, maxsize=100))
+    client, lawyer = connect({'token': make_token(7)}), connect({'token': make_token(2, role='Lawyer')})
+    lawyer.emit('join_room', {'room_id': 5})
+
+    for _ in range(5):
+        client.emit('send_message', {'room_id': 5, 'message': 'spam'})
+    received = [m['name'] for m in client.get_received()]
+    assert received.count('rate_limited') == 3
+
+    lawyer.get_received()
+    lawyer.emit('send_message', {'room_id': 5, 'message': 'still heard'})
+    assert [m['name'] for m in lawyer.get_received()] == ['receive_message']
+    client.disconnect()
+    lawyer.disconnect()
+
+
+def test_durable_broadcast_carries_message_id_and_only_known_fields(room, make_token, monkeypatch):
+    monkeypatch.setattr(app_module.message_writer, 'durable', True)
+    client, lawyer = connect({'token': make_token(7)}), connect({'token': make_token(2, role='Lawyer')})
+    lawyer.emit('join_room', {'room_id': 5})
+    lawyer.get_received()
+
+    client.emit('send_message', {'room_id': 5, 'message': 'hello', 'sender_id': 2, 'is_admin': True})
+
+    received = [m for m in lawyer.get_received() if m['name'] == 'receive_message']
+    assert [m['args'][0] for m in received] == [{'room_id': 5, 'sender_id': 7, 'message': 'hello', 'MessageID': 900}]
+    client.disconnect()
+    lawyer.disconnect()
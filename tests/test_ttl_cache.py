@@ -0,0 +1,71 @@
+import app as app_module
+
+
+def make(maxsize=10):
+    return app_module.TTLCache(maxsize=maxsize, ttl=60)
+
+
+def test_fill_is_cached_when_nothing_was_invalidated():
+    cache = make()
+    token = cache.fill_token()
+    assert cache.set_if_fresh('a', 1, token)
+    assert cache.get('a') == 1
+
+
+def test_invalidation_after_token_rejects_fill():
+    # pop, update aur clear teeno clock badhate hain
+    for invalidate in (lambda c: c.pop('a'), lambda c: c.update('a', lambda v: v), lambda c: c.clear()):
+        cache = make()
+        token = cache.fill_token()
+        invalidate(cache)
+        assert not cache.set_if_fresh('a', 'stale', token)
+        assert cache.get('a') is None
+        assert cache.set_if_fresh('a', 'fresh', cache.fill_token())
+
+
+def test_invalidation_of_other_key_does_not_reject_fill():
+    cache = make()
+    token = cache.fill_token()
+    cache.pop('b')
+    assert cache.set_if_fresh('a', 1, token)
+
+
+def test_forgotten_invalidations_fold_into_floor():
+    cache = make(maxsize=2)
+    token = cache.fill_token()
+    cache.pop('a')
+    cache.pop('b')
+    cache.pop('c')
+
+    # 'a' invalidated se nikal gaya, lekin floor ab bhi purane token ko rok deta hai
+    assert 'a' not in cache.invalidated and cache.floor == 1
+    assert not cache.set_if_fresh('a', 'stale', token)
+    assert not cache.set_if_fresh('d', 'stale', token)
+    assert cache.set_if_fresh('a', 'fresh', cache.fill_token())
+
+
+def test_update_keeps_expiry_and_skips_missing_keys():
+    cache = make()
+    cache.set('a', [1])
+    expires_at = cache.data['a'][1]
+
+    assert cache.update('a', lambda v: v + [2]) == [1, 2]
+    assert cache.data['a'] == ([1, 2], expires_at)
+    assert cache.update('b', lambda v: v + [2]) is None and cache.get('b') is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+
+
+def test_expired_entries_are_not_returned(monkeypatch):
+    cache = make()
+    cache.set('a', 1, ttl=5)
+    now = app_module.time.time()
+    monkeypatch.setattr(app_module.time, 'time', lambda: now + 10)
+    assert cache.get('a') is None and cache.items() == []
@@ -0,0 +1,146 @@
+import datetime
+
+import pytest
+
+import app as app_module
+
+
+class EventTables:
+    # UserEventSeq/UserEvents ka in-memory roop, sirf UserEventLog ki queries ke liye
+    def __init__(self):
+        self.seqs = {}
+        self.events = {}
+
+    def __call__(self, sql, params):
+        if sql.startswith('INSERT INTO UserEventSeq'):
+            user_id, _, count = params
+            self.seqs[user_id] = self.seqs.get(user_id, 0) + count
+            return self.seqs[user_id]
+        if sql.startswith('INSERT INTO UserEvents'):
+            self.events[params[0], params[1]] = (params[2], params[3])
+        elif sql.startswith('DELETE FROM UserEvents WHERE UserID'):
+            for key in [key for key in self.events if key[0] == params[0] and key[1] <= params[1]]:
+                del self.events[key]
+        elif sql.startswith('SELECT Seq FROM UserEventSeq'):
+            return [{'Seq': self.seqs[params[0]]}] if params[0] in self.seqs else []
+        elif sql.startswith('SELECT Seq, EventType, Payload'):
+            user_id, after, limit = params
+            rows = [{'Seq': seq, 'EventType': event_type, 'Payload': payload}
+                    for (uid, seq), (event_type, payload) in sorted(self.events.items()) if uid == user_id and seq > after]
+            return rows[:limit]
+        return []
+
+
+@pytest.fixture
+def log(fake_db):
+    fake_db(EventTables())
+    return app_module.UserEventLog(backlog=3, ttl=3600)
+
+
+def append(log, events):
+    connection = app_module.pool.primary.connection()
+    with connection.cursor() as cursor:
+        return log.append(cursor, events)
+
+
+def seqs(events):
+    return None if events is None else [event['seq'] for event in events]
+
+
+def test_new_user_has_nothing_to_replay(log):
+    assert log.current(7) == 0
+    assert log.since(7, 0) == []
+
+
+def test_negative_since_is_treated_as_zero(log):
+    assert log.since(7, -5) == []
+    append(log, [(7, 'ping', {})])
+    assert seqs(log.since(7, -5)) == [1]
+
+
+def test_replays_only_events_after_since(log):
+    append(log, [(7, 'a', {'n': 1}), (7, 'b', {'n': 2})])
+    append(log, [(7, 'c', {'n': 3})])
+
+    assert log.since(7, 1) == [{'seq': 2, 'type': 'b', 'data': {'n': 2}}, {'seq': 3, 'type': 'c', 'data': {'n': 3}}]
+    assert log.since(7, 3) == []
+
+
+def test_since_ahead_of_server_asks_for_resync(log):
+    append(log, [(7, 'a', {})])
+    assert log.since(7, 5) is None
+
+
+def test_trimmed_backlog_asks_for_resync(log):
+    append(log, [(7, 'e', {'n': n}) for n in range(5)])
+
+    assert seqs(log.since(7, 2)) == [3, 4, 5]
+    assert log.since(7, 1) is None
+    assert log.since(7, 0) is None
+
+
+def test_batch_assigns_contiguous_seqs_per_user(log):
+    appended = append(log, [(7, 'a', 1), (2, 'a', 1), (7, 'b', 2), (2, 'b', 2), (2, 'c', 3)])
+
+    by_user = {}
+    for user_id, event in appended:
+        by_user.setdefault(user_id, []).append((event['seq'], event['type']))
+    assert by_user == {2: [(1, 'a'), (2, 'b'), (3, 'c')], 7: [(1, 'a'), (2, 'b')]}
+    assert log.current(2) == 3 and log.current(7) == 2
+
+
+def test_appointment_changes_reach_both_participants(fake_db, monkeypatch):
+    fake_db(EventTables())
+    monkeypatch.setattr(app_module, 'user_events', app_module.UserEventLog(backlog=100, ttl=3600))
+    emitted = []
+    monkeypatch.setattr(app_module.socketio, 'emit', lambda name, event, to: emitted.append((to, event['type'], event['data'])))
+
+    connection = app_module.pool.primary.connection()
+    with connection.cursor() as cursor:
+        events = app_module.record_appointment_changes(cursor, [
+            (11, 2, 7, datetime.datetime(2030, 1, 1, 10), None, 'Pending'),
+            (12, 3, 7, datetime.datetime(2030, 1, 2, 10), 'Pending', 'Confirmed'),
+        ])
+    assert emitted == []
+    app_module.emit_user_events(events)
+
+    client_events = [(event_type, data.get('appointmentId')) for to, event_type, data in emitted if to == 'user_7']
+    assert client_events == [('appointment_created', 11), ('stats_delta', None), ('appointment_status', 12), ('stats_delta', None)]
+    assert {to for to, _, data in emitted if data.get('appointmentId') == 12} == {'user_7', 'user_3'}
+    assert seqs(app_module.user_events.since(7, 0)) == [1, 2, 3, 4]
+
+
+def test_status_update_writes_events_in_its_transaction(fake_db, client, make_token, monkeypatch):
+    tables = EventTables()
+
+    def handler(sql, params):
+        if sql.startswith('SELECT AppointmentID, ClientID'):
+            return [{'AppointmentID': 11, 'ClientID': 7, 'AppointmentDate': datetime.datetime(2030, 1, 1, 10), 'Status': 'Pending'}]
+        return tables(sql, params)
+    db = fake_db(handler)
+    monkeypatch.setattr(app_module, 'user_events', app_module.UserEventLog(backlog=100, ttl=3600))
+    headers = {'Authorization': f'Bearer {make_token(2, role="Lawyer")}'}
+
+    response = client.put('/api/appointments/11', json={'status': 'Confirmed'}, headers=headers)
+
+    assert response.status_code == 200
+    statements = [sql.split(' (')[0] for sql, _ in db.log]
+    assert statements.index('INSERT INTO UserEvents') < statements.index('COMMIT')
+    assert 'FOR UPDATE' in db.log[0][0]
+    assert seqs(app_module.user_events.since(7, 0)) == [1, 2]
+
+
+def test_failed_event_write_rolls_back_the_status_update(fake_db, client, make_token):
+    def handler(sql, params):
+        if sql.startswith('SELECT AppointmentID, ClientID'):
+            return [{'AppointmentID': 11, 'ClientID': 7, 'AppointmentDate': datetime.datetime(2030, 1, 1, 10), 'Status': 'Pending'}]
+        if sql.startswith('INSERT INTO UserEventSeq'):
+            raise RuntimeError('event table unavailable')
+        return []
+    db = fake_db(handler)
+    headers = {'Authorization': f'Bearer {make_token(2, role="Lawyer")}'}
+
+    response = client.put('/api/appointments/11', json={'status': 'Confirmed'}, headers=headers)
+
+    assert response.status_code == 500
+    assert db.queries('COMMIT') == [] and db.queries('ROLLBACK') == ['ROLLBACK']